@@ -1,5 +1,5 @@
 from .base import BaseAgent, AnalysisResult
-from .analyzer import StockAnalyzer, analyze_stock
+from .analyzer import StockAnalyzer, analyze_stock, get_stock_analyzer
 from .recommendation import RecommendationAgent, scan_for_opportunities
 from .fundamental import FundamentalAnalyst
 from .macro_regime import MacroRegimeAgent
@@ -19,6 +19,7 @@ __all__ = [
     "AnalysisResult", 
     "StockAnalyzer", 
     "analyze_stock",
+    "get_stock_analyzer",
     "RecommendationAgent",
     "scan_for_opportunities",
     "FundamentalAnalyst",
@@ -1,10 +1,19 @@
 """
 股票分析主类 - 整合所有Agent
+
+agent_pipeline 按 Agent 声明的 depends_on 组成有向无环图，在线程池中执行：
+互不依赖的 Agent（技术/基本面/新闻/多空研究员等各自的 LLM 调用）同时发出，
+RiskManager 等待全部上游完成；输出顺序始终按 agent_pipeline，与执行先后无关。
+batch_llm 模式下先用一次合并请求拿到各角色结论，Agent 不再各自调用 LLM。
 """
-from typing import Dict, List, Optional
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence
 from datetime import datetime
 
-from ai_stock_analyst.agents.base import AnalysisResult
+from ai_stock_analyst.agents.base import ALL_UPSTREAM, AnalysisResult
+from ai_stock_analyst.agents.llm_batch import request_role_sections
 from ai_stock_analyst.agents.technical import TechnicalAnalyst
 from ai_stock_analyst.agents.news import NewsAnalyst
 from ai_stock_analyst.agents.social import SocialMediaAnalyst
@@ -18,10 +27,25 @@ from ai_stock_analyst.agents.bear_researcher import BearResearcher
 from ai_stock_analyst.agents.risk_manager import RiskManager
 
 
+# 单只股票内并行执行的 Agent 数
+AGENT_WORKERS = 6
+
+
 class StockAnalyzer:
     """股票分析器 - 协调各Agent进行综合分析"""
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, batch_llm: Optional[bool] = None):
+        """
+        Args:
+            max_workers: 并行执行 Agent 的线程数，默认取环境变量 AGENT_WORKERS；1 表示按流水线顺序串行
+            batch_llm: 每只股票把各角色的 LLM 请求合并为一次（见 llm_batch），默认取环境变量 LLM_BATCH_MODE
+        """
+        self.max_workers = max(1, max_workers or int(os.getenv("AGENT_WORKERS", str(AGENT_WORKERS))))
+        if batch_llm is None:
+            batch_llm = os.getenv("LLM_BATCH_MODE", "false").lower() in ("1", "true", "yes")
+        self.batch_llm = batch_llm
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         self.agents = {
             "macro": MacroRegimeAgent(),
             "technical": TechnicalAnalyst(),
@@ -48,8 +72,16 @@ class StockAnalyzer:
         ]
         self.portfolio_manager = PortfolioManager()
 
-    def register_agent(self, key: str, agent, append_pipeline: bool = True) -> None:
-        """注册新Agent，便于后续扩展/测试注入。"""
+    def register_agent(
+        self,
+        key: str,
+        agent,
+        append_pipeline: bool = True,
+        depends_on: Optional[Sequence[str]] = None,
+    ) -> None:
+        """注册新Agent，便于后续扩展/测试注入；depends_on 覆盖 Agent 类上声明的依赖。"""
+        if depends_on is not None:
+            agent.depends_on = tuple(depends_on)
         self.agents[key] = agent
         if append_pipeline and key not in self.agent_pipeline:
             self.agent_pipeline.append(key)
@@ -68,25 +100,10 @@ class StockAnalyzer:
         Returns:
             Dict: 完整分析结果
         """
-        analyses = []
-        
-        risk_result = None
-        for key in self.agent_pipeline:
-            if key in {"macro", "technical", "liquidity", "anomaly", "fundamental"} and "price_data" not in data:
-                continue
-            if key in {"news", "bull", "bear"} and not data.get("news"):
-                continue
-            if key == "social" and "social_data" not in data:
-                continue
-
-            agent = self.agents.get(key)
-            if not agent:
-                continue
-            result = agent.analyze(data)
-            analyses.append(result)
-            if key == "risk":
-                risk_result = result
+        results = self._run_agents(symbol, data)
+        analyses = [results[key] for key in self.agent_pipeline if key in results]
 
+        risk_result = results.get("risk")
         if risk_result is None:
             risk_result = self.agents["risk"].analyze(data)
             analyses.append(risk_result)
@@ -126,6 +143,97 @@ class StockAnalyzer:
         }
 
 
+    def _should_run(self, key: str, data: Dict) -> bool:
+        if key in {"macro", "technical", "liquidity", "anomaly", "fundamental"} and "price_data" not in data:
+            return False
+        if key in {"news", "bull", "bear"} and not data.get("news"):
+            return False
+        if key == "social" and "social_data" not in data:
+            return False
+        return self.agents.get(key) is not None
+
+    def _dependencies(self, keys: List[str]) -> Dict[str, List[str]]:
+        """本次要执行的 Agent 的依赖；被跳过或未注册的上游视为已满足"""
+        scheduled = set(keys)
+        deps = {}
+        for position, key in enumerate(keys):
+            declared = getattr(self.agents[key], "depends_on", ()) or ()
+            if ALL_UPSTREAM in declared:
+                upstream = keys[:position]
+            else:
+                upstream = [dep for dep in declared if dep in scheduled and dep != key]
+            deps[key] = upstream
+        return deps
+
+    def _run_agents(self, symbol: str, data: Dict) -> Dict[str, AnalysisResult]:
+        """按依赖图执行 Agent，返回 {pipeline 键: 结果}"""
+        keys = [key for key in self.agent_pipeline if self._should_run(key, data)]
+        deps = self._dependencies(keys)
+        if self.batch_llm:
+            roles = [self.agents[key].llm_role for key in keys if getattr(self.agents[key], "llm_role", None)]
+            # 只有一个角色时合并没有收益，按原方式单独调用
+            if len(roles) > 1:
+                data = {**data, "llm_batch": request_role_sections(symbol, data, roles)}
+        results: Dict[str, AnalysisResult] = {}
+
+        def payload(key: str) -> Dict:
+            # 在调度线程中组装，Agent 线程不接触 results
+            if not deps[key]:
+                return data
+            return {**data, "upstream": {dep: results[dep] for dep in deps[key]}}
+
+        pending = list(keys)
+        if self.max_workers == 1:
+            while pending:
+                ready = [key for key in pending if all(dep in results for dep in deps[key])]
+                if not ready:
+                    raise ValueError(f"Agent dependency cycle among: {pending}")
+                for key in ready:
+                    results[key] = self.agents[key].analyze(payload(key))
+                    pending.remove(key)
+            return results
+
+        executor = self._get_executor()
+        running = {}
+        while pending or running:
+            ready = [key for key in pending if all(dep in results for dep in deps[key])]
+            for key in ready:
+                running[executor.submit(self.agents[key].analyze, payload(key))] = key
+                pending.remove(key)
+            if not running:
+                raise ValueError(f"Agent dependency cycle among: {pending}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+        return results
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent")
+            return self._executor
+
+
+# 全局实例（延迟初始化）
+_stock_analyzer = None
+_stock_analyzer_lock = threading.Lock()
+
+
+def get_stock_analyzer() -> StockAnalyzer:
+    """
+    获取分析器实例（单例）
+
+    各 Agent 不保存单次分析的状态，多只股票（main --workers 的各线程）共用同一个实例，
+    也就共用一个 Agent 线程池，线程数不随分析的股票数增长。
+    """
+    global _stock_analyzer
+    if _stock_analyzer is None:
+        with _stock_analyzer_lock:
+            if _stock_analyzer is None:
+                _stock_analyzer = StockAnalyzer()
+    return _stock_analyzer
+
+
 def analyze_stock(symbol: str, data: Optional[Dict] = None) -> Dict:
     """
     分析单个股票的便捷函数
@@ -137,7 +245,7 @@ def analyze_stock(symbol: str, data: Optional[Dict] = None) -> Dict:
     Returns:
         Dict: 分析结果
     """
-    analyzer = StockAnalyzer()
+    analyzer = get_stock_analyzer()
     if data is None:
         data = {"symbol": symbol}
     else:
@@ -2,9 +2,12 @@
 Agent基类
 """
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+# depends_on 中的通配符：依赖流水线中排在它前面的全部 Agent
+ALL_UPSTREAM = "*"
+
 
 @dataclass
 class AnalysisResult:
@@ -19,6 +22,12 @@ class AnalysisResult:
 
 class BaseAgent(ABC):
     """Agent基类"""
+
+    # 依赖的上游 Agent（StockAnalyzer.agent_pipeline 中的键）；没有依赖的 Agent 会并行执行，
+    # 有依赖的 Agent 在上游全部完成后执行，并通过 data["upstream"] 拿到上游结果
+    depends_on: Tuple[str, ...] = ()
+    # 多角色合并调用中的角色名（见 llm_batch.ROLE_INSTRUCTIONS）；None 表示不参与合并
+    llm_role: Optional[str] = None
     
     def __init__(self, name: str):
         self.name = name
@@ -37,3 +46,19 @@ class BaseAgent(ABC):
         
         result = get_llm_router().chat(messages)
         return result["content"]
+
+    def call_llm_role(self, data: Dict, prompt: str, system: str = "") -> Tuple[str, Optional[str]]:
+        """
+        取本角色的 LLM 结论，返回 (回复文本, 信号)
+
+        data 中有合并调用结果（data["llm_batch"]）且包含本角色段落时直接使用，信号来自 JSON；
+        合并调用整体失败时抛出异常，由调用方走规则兜底；否则单独调用 LLM，信号为 None 由调用方从文本解析。
+        """
+        batch = data.get("llm_batch")
+        if batch is not None and self.llm_role in batch.get("roles", ()):
+            if batch.get("error"):
+                raise RuntimeError(f"Batched LLM call failed: {batch['error']}")
+            section = batch.get("sections", {}).get(self.llm_role)
+            if section:
+                return section["reasoning"], section["signal"]
+        return self.call_llm(prompt, system), None
@@ -7,6 +7,8 @@ from ai_stock_analyst.agents.base import AnalysisResult, BaseAgent
 
 
 class BearResearcher(BaseAgent):
+    llm_role = "bear"
+
     def __init__(self):
         super().__init__("BearResearcher")
 
@@ -31,8 +33,8 @@ RSI14={rsi14}, ATR%={atr_pct}, Change%={change_percent}, SocialBearish={bearish_
 """
 
         try:
-            response = self.call_llm(prompt, "你是空头研究员，强调下跌与回撤风险")
-            signal = self._extract_signal(response)
+            response, signal = self.call_llm_role(data, prompt, "你是空头研究员，强调下跌与回撤风险")
+            signal = signal or self._extract_signal(response)
             confidence = 0.62
         except Exception:
             signal, confidence, response = self._fallback(rsi14, atr_pct, change_percent, bearish_pct)
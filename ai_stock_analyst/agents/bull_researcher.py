@@ -7,6 +7,8 @@ from ai_stock_analyst.agents.base import AnalysisResult, BaseAgent
 
 
 class BullResearcher(BaseAgent):
+    llm_role = "bull"
+
     def __init__(self):
         super().__init__("BullResearcher")
 
@@ -31,8 +33,8 @@ RSI14={rsi14}, MACD_HIST={macd_hist}, Trend={trend}, SocialBullish={bullish_pct}
 """
 
         try:
-            response = self.call_llm(prompt, "你是多头研究员，强调上涨催化")
-            signal = self._extract_signal(response)
+            response, signal = self.call_llm_role(data, prompt, "你是多头研究员，强调上涨催化")
+            signal = signal or self._extract_signal(response)
             confidence = 0.62
         except Exception:
             signal, confidence, response = self._fallback(rsi14, macd_hist, trend, bullish_pct)
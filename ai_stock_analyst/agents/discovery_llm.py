@@ -0,0 +1,162 @@
+"""
+候选股批量 LLM 评分
+
+全市场发现模式下，预筛后的候选（默认约 120 只）原本只用关键词与技术/财报规则打分。
+这里把候选按规则分从高到低每 10~20 只打包成一个提示词（每只一行精简指标 + 最多 2 条新闻标题），
+要求模型只输出 {代码: {score: 0-100, reason}} 的 JSON，请求数约为逐只调用的 1/15。
+各批在线程池中并发发出；按提示词长度预估 token，累计超过预算的批次不再发送（排在后面的候选保留规则分）。
+某一批失败或解析不到的代码同样只用规则分，不影响其他批次。
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from ai_stock_analyst.agents.llm_batch import _extract_json
+from ai_stock_analyst.llm.limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DISCOVER_LLM_BATCH_SIZE = 15
+DISCOVER_LLM_WORKERS = 4
+DISCOVER_LLM_TOKEN_BUDGET = 60000
+# 每只候选预留的输出 token（一个分数 + 一句理由）
+OUTPUT_TOKENS_PER_CANDIDATE = 60
+
+CANDIDATE_SYSTEM_PROMPT = "你是美股短线选股分析师，需要对一批候选股逐只独立打分，只输出 JSON。"
+
+
+def format_candidate(candidate: Dict) -> str:
+    """单只候选的精简特征行 + 新闻标题"""
+    line = (
+        f"{candidate['symbol']} | {candidate.get('company_name', '')} | {candidate.get('sector', '')} | "
+        f"趋势 {candidate.get('trend', 'NEUTRAL')} | RSI14 {float(candidate.get('rsi14', 50) or 50):.0f} | "
+        f"MACD柱 {float(candidate.get('macd_hist', 0) or 0):.2f} | ATR% {float(candidate.get('atr_pct', 0) or 0):.1f} | "
+        f"营收增速 {float(candidate.get('revenue_growth', 0) or 0):.2f} | PE {float(candidate.get('pe_ratio', 0) or 0):.0f} | "
+        f"规则分 {float(candidate.get('composite_score', 0)) * 100:.0f}"
+    )
+    headlines = [f"  - [{n.get('source', 'Unknown')}] {n.get('title', '')[:120]}" for n in candidate.get("headlines", [])[:2]]
+    return "\n".join([line, *headlines])
+
+
+def build_candidate_prompt(candidates: Sequence[Dict]) -> str:
+    symbols = [c["symbol"] for c in candidates]
+    example = {symbols[0]: {"score": 0, "reason": "一句话理由"}} if symbols else {}
+    lines = [
+        "以下候选股每行为：代码 | 公司 | 板块 | 技术指标 | 营收增速 | PE | 规则分（0-100），下方为相关新闻标题（可能没有）。",
+        "请结合技术面、基本面与新闻催化，判断每只股票未来 1~4 周的相对机会，给出 0-100 的分数（50 为中性）。",
+        "",
+        *[format_candidate(c) for c in candidates],
+        "",
+        f"必须覆盖全部 {len(symbols)} 只：{', '.join(symbols)}",
+        "只输出一个 JSON 对象，键为股票代码，格式如下：",
+        json.dumps(example, ensure_ascii=False),
+    ]
+    return "\n".join(lines)
+
+
+def parse_candidate_scores(text: str, symbols: Sequence[str]) -> Dict[str, Dict]:
+    """解析模型输出；只保留本批内、分数可转为数值的代码，分数截断到 0-100"""
+    payload = _extract_json(text)
+    if not isinstance(payload, dict):
+        return {}
+    wanted = {s.upper(): s for s in symbols}
+    out = {}
+    for key, item in payload.items():
+        symbol = wanted.get(str(key).strip().upper())
+        if symbol is None:
+            continue
+        if isinstance(item, dict):
+            raw_score, reason = item.get("score"), str(item.get("reason", "") or "").strip()
+        else:
+            raw_score, reason = item, ""
+        try:
+            score = float(raw_score)
+        except (TypeError, ValueError):
+            continue
+        out[symbol] = {"score": max(0.0, min(100.0, score)), "reason": reason}
+    return out
+
+
+def score_candidates(
+    candidates: Sequence[Dict],
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    token_budget: Optional[int] = None,
+) -> Dict:
+    """
+    分批请求 LLM 给候选打分
+
+    Args:
+        candidates: 按规则分从高到低排列的候选（需含 symbol，其余特征见 format_candidate）
+        batch_size: 每次请求的候选数，默认取环境变量 DISCOVER_LLM_BATCH_SIZE
+        workers: 并发请求数，默认取环境变量 DISCOVER_LLM_WORKERS
+        token_budget: 本次评分的预估 token 上限，默认取环境变量 DISCOVER_LLM_TOKEN_BUDGET
+
+    Returns:
+        {"scores": {symbol: {score, reason}}, "requests", "failed", "skipped", "estimated_tokens", "used_tokens"}
+    """
+    from ai_stock_analyst.llm import get_llm_router
+
+    batch_size = max(1, batch_size or int(os.getenv("DISCOVER_LLM_BATCH_SIZE", str(DISCOVER_LLM_BATCH_SIZE))))
+    workers = max(1, workers or int(os.getenv("DISCOVER_LLM_WORKERS", str(DISCOVER_LLM_WORKERS))))
+    if token_budget is None:
+        token_budget = int(os.getenv("DISCOVER_LLM_TOKEN_BUDGET", str(DISCOVER_LLM_TOKEN_BUDGET)))
+
+    # 按顺序装入预算：规则分靠前的批次优先，超出预算的批次整批跳过
+    planned: List[tuple] = []
+    skipped: List[str] = []
+    estimated = 0
+    for start in range(0, len(candidates), batch_size):
+        chunk = list(candidates[start : start + batch_size])
+        prompt = build_candidate_prompt(chunk)
+        max_tokens = OUTPUT_TOKENS_PER_CANDIDATE * len(chunk) + 100
+        cost = estimate_tokens(CANDIDATE_SYSTEM_PROMPT) + estimate_tokens(prompt) + max_tokens
+        if estimated + cost > token_budget:
+            skipped.extend(c["symbol"] for c in chunk)
+            continue
+        estimated += cost
+        planned.append((chunk, prompt, max_tokens))
+
+    router = get_llm_router()
+
+    def _request(job: tuple) -> tuple:
+        chunk, prompt, max_tokens = job
+        symbols = [c["symbol"] for c in chunk]
+        messages = [
+            {"role": "system", "content": CANDIDATE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        try:
+            result = router.chat(messages, max_tokens=max_tokens)
+        except Exception as e:
+            logger.warning(f"Candidate scoring batch {symbols[0]}..{symbols[-1]} failed: {e}")
+            return {}, 0, False
+        scores = parse_candidate_scores(result.get("content", ""), symbols)
+        missing = [s for s in symbols if s not in scores]
+        if missing:
+            logger.warning(f"Candidate scoring response missing {missing}; they keep rule-based scores")
+        usage = result.get("usage") or {}
+        return scores, int(usage.get("total_tokens", 0) or 0), True
+
+    scores: Dict[str, Dict] = {}
+    used_tokens = 0
+    failed = 0
+    if planned:
+        with ThreadPoolExecutor(max_workers=min(workers, len(planned))) as pool:
+            for batch_scores, tokens, ok in pool.map(_request, planned):
+                scores.update(batch_scores)
+                used_tokens += tokens
+                failed += 0 if ok else 1
+
+    if skipped:
+        logger.info(f"Candidate scoring token budget {token_budget} reached; {len(skipped)} candidates not sent")
+    return {
+        "scores": scores,
+        "requests": len(planned),
+        "failed": failed,
+        "skipped": skipped,
+        "estimated_tokens": estimated,
+        "used_tokens": used_tokens,
+    }
@@ -7,6 +7,8 @@ from ai_stock_analyst.agents.base import AnalysisResult, BaseAgent
 
 
 class FundamentalAnalyst(BaseAgent):
+    llm_role = "fundamental"
+
     def __init__(self):
         super().__init__("FundamentalAnalyst")
 
@@ -67,8 +69,8 @@ ROE: {return_on_equity}
 """
 
         try:
-            response = self.call_llm(prompt, "你是审慎的基本面分析师")
-            signal = self._extract_signal(response)
+            response, signal = self.call_llm_role(data, prompt, "你是审慎的基本面分析师")
+            signal = signal or self._extract_signal(response)
             confidence = max(0.55, min(0.8, quality_score / 100))
             response = (
                 f"{response}\n\n规则化财报稳定性评分: {quality_score}/100\n"
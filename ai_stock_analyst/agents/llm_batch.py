@@ -0,0 +1,131 @@
+"""
+多角色合并 LLM 调用
+
+技术面、基本面、新闻、多头、空头五个 Agent 各自的提示词里有大量重复输入（RSI/MACD/趋势、同一批新闻标题）。
+批量模式下每只股票只发一次请求：共享数据只写一遍，要求模型按角色返回一个 JSON 对象，
+解析后放进 data["llm_batch"]，各 Agent 直接取自己的段落（信号由 JSON 字段给出，不再在文本里搜 BUY/SELL）。
+某个角色段落缺失或不合法时，该 Agent 退回单独调用；整次请求失败时各 Agent 直接走规则兜底。
+"""
+import json
+import logging
+import re
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = ("BUY", "SELL", "HOLD")
+
+# 角色 -> (身份, 关注点)，与各 Agent 单独调用时的系统提示一致
+ROLE_INSTRUCTIONS = {
+    "technical": ("专业技术分析师", "基于均线、趋势、RSI、MACD、ATR 判断交易信号"),
+    "fundamental": ("审慎的基本面分析师", "基于估值、增长、利润率、ROE、负债与流动性判断"),
+    "news": ("财经新闻分析师", "判断新闻整体情绪（正面/负面/中性）与重要催化剂"),
+    "bull": ("多头研究员", "给出最强多头论据，强调上涨催化"),
+    "bear": ("空头研究员", "给出最强空头论据，强调下跌与回撤风险"),
+}
+
+BATCH_SYSTEM_PROMPT = "你是一个投研团队，需要分别以多个角色独立给出结论，只输出 JSON。"
+
+
+def build_batch_prompt(symbol: str, data: Dict, roles: Sequence[str]) -> str:
+    """共享数据写一遍，后面列出各角色的任务与 JSON 输出格式"""
+    price = data.get("price_data", {}) or {}
+    social = (data.get("social_data", {}) or {}).get("sentiment", {}) or {}
+    news_items = data.get("news", []) or []
+
+    lines = [
+        f"股票: {symbol}",
+        "",
+        "行情与技术指标:",
+        f"当前价格: ${price.get('current_price', 0)}, 涨跌: {price.get('change_percent', 0)}%",
+        f"5日均线: ${price.get('ma5', 0)}, 20日均线: ${price.get('ma20', 0)}, 趋势: {price.get('trend', 'NEUTRAL')}",
+        f"RSI14: {price.get('rsi14', 50)}, MACD: {price.get('macd', 0)} / Signal: {price.get('macd_signal', 0)} "
+        f"/ Hist: {price.get('macd_hist', 0)}, ATR占比: {price.get('atr_pct', 0)}%",
+    ]
+    if "fundamental" in roles:
+        lines += [
+            "",
+            "基本面:",
+            f"PE: {price.get('pe_ratio', 0)}, 市值: {price.get('market_cap', 0)}",
+            f"营收增速: {price.get('revenue_growth', 0)}, 利润增速: {price.get('earnings_growth', 0)}, "
+            f"净利率: {price.get('profit_margins', 0)}, ROE: {price.get('return_on_equity', 0)}",
+            f"负债权益比: {price.get('debt_to_equity', 0)}, 流动比率: {price.get('current_ratio', 0)}, "
+            f"速动比率: {price.get('quick_ratio', 0)}",
+        ]
+    if social:
+        lines += ["", f"社媒情绪: 看多 {social.get('bullish_pct', 50)}% / 看空 {social.get('bearish_pct', 50)}%"]
+    if news_items:
+        lines += ["", "新闻:"]
+        lines += [f"- [{n.get('source', 'Unknown')}] {n.get('title', '')}" for n in news_items[:10]]
+
+    lines += ["", "请分别以下列角色独立分析（每个角色只依据与其相关的数据）："]
+    for role in roles:
+        identity, focus = ROLE_INSTRUCTIONS[role]
+        lines.append(f"- {role}: 你是{identity}，{focus}")
+    example = {role: {"signal": "BUY|SELL|HOLD", "reasoning": "不超过3句理由"} for role in roles}
+    lines += [
+        "",
+        "只输出一个 JSON 对象，键为上述角色名，格式如下：",
+        json.dumps(example, ensure_ascii=False, indent=2),
+    ]
+    return "\n".join(lines)
+
+
+def parse_batch_response(text: str, roles: Sequence[str]) -> Dict[str, Dict]:
+    """解析模型输出；只返回信号合法、理由非空的角色段落"""
+    payload = _extract_json(text)
+    if not isinstance(payload, dict):
+        return {}
+
+    sections = {}
+    for role in roles:
+        section = payload.get(role)
+        if not isinstance(section, dict):
+            continue
+        signal = str(section.get("signal", "")).strip().upper()
+        reasoning = str(section.get("reasoning", "") or "").strip()
+        if signal in SIGNALS and reasoning:
+            sections[role] = {"signal": signal, "reasoning": reasoning}
+    return sections
+
+
+def request_role_sections(symbol: str, data: Dict, roles: List[str]) -> Dict:
+    """
+    一次 LLM 请求拿到全部角色的结论
+
+    Returns:
+        {"roles": [...], "sections": {role: {signal, reasoning}}}；请求失败时附带 "error"
+    """
+    from ai_stock_analyst.llm import get_llm_router
+
+    roles = [role for role in roles if role in ROLE_INSTRUCTIONS]
+    messages = [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": build_batch_prompt(symbol, data, roles)},
+    ]
+    try:
+        content = get_llm_router().chat(messages)["content"]
+    except Exception as e:
+        logger.warning(f"Batched LLM call failed for {symbol}: {e}")
+        return {"roles": roles, "sections": {}, "error": str(e)}
+
+    sections = parse_batch_response(content, roles)
+    missing = [role for role in roles if role not in sections]
+    if missing:
+        logger.warning(f"Batched LLM response for {symbol} missing roles {missing}; they will be queried separately")
+    return {"roles": roles, "sections": sections}
+
+
+def _extract_json(text: str):
+    """兼容 ```json 代码块和前后多余文字"""
+    if not text:
+        return None
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.S)
+    candidate = fenced.group(1) if fenced else text
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        return json.loads(candidate[start : end + 1])
+    except json.JSONDecodeError:
+        return None
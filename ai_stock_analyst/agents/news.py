@@ -7,6 +7,8 @@ from ai_stock_analyst.agents.base import BaseAgent, AnalysisResult
 
 class NewsAnalyst(BaseAgent):
     """新闻舆情分析Agent"""
+
+    llm_role = "news"
     
     def __init__(self):
         super().__init__("NewsAnalyst")
@@ -52,9 +54,9 @@ class NewsAnalyst(BaseAgent):
 """
         
         try:
-            response = self.call_llm(prompt, "你是财经新闻分析师")
+            response, signal = self.call_llm_role(data, prompt, "你是财经新闻分析师")
             sentiment_score = self._analyze_sentiment(response)
-            signal = self._extract_signal(response)
+            signal = signal or self._extract_signal(response)
             confidence = abs(sentiment_score - 0.5) * 2  # 0-1范围
         except Exception:
             # 使用简单关键词分析
@@ -6,7 +6,7 @@ from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 from ai_stock_analyst.agents.base import BaseAgent, AnalysisResult
-from ai_stock_analyst.data import fetch_stock_price
+from ai_stock_analyst.data import fetch_stock_prices
 
 logger = logging.getLogger(__name__)
 
@@ -114,6 +114,11 @@ class PortfolioAnalyzer(BaseAgent):
     def _update_prices(self, holdings: List[Dict]) -> List[Holding]:
         """更新持仓的实时价格"""
         updated = []
+        try:
+            prices = fetch_stock_prices([h.get("symbol", "") for h in holdings])
+        except Exception as e:
+            logger.warning(f"Failed to fetch prices for holdings: {e}")
+            prices = {}
         
         for h in holdings:
             symbol = h.get("symbol", "")
@@ -128,7 +133,7 @@ class PortfolioAnalyzer(BaseAgent):
             
             # 获取实时价格
             try:
-                price_data = fetch_stock_price(symbol)
+                price_data = prices.get(symbol, {"error": "no data"})
                 if "error" not in price_data:
                     holding.current_price = price_data.get("current_price")
                     if holding.current_price:
@@ -1,15 +1,16 @@
 """
 股票推荐Agent - 从新闻和社交媒体中发现热门股票
 """
+import os
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from ai_stock_analyst.agents.base import BaseAgent, AnalysisResult
 from ai_stock_analyst.rss import fetch_news
 from ai_stock_analyst.data import (
-    fetch_stock_price,
+    fetch_stock_prices,
     load_us_equity_universe_with_stats,
-    prefilter_universe,
+    prefilter_universe_with_stats,
 )
 
 
@@ -65,6 +66,9 @@ KNOWN_TICKERS = {
     "NTES", "TME", "IQ", "HUYA", "DOYU", "MOMO", "YY", "BEKE", "TCHP", "IQE"
 }
 
+# 开启 LLM 候选评分时，LLM 分在综合分中的权重
+DISCOVER_LLM_WEIGHT = 0.35
+
 
 class RecommendationAgent(BaseAgent):
     """股票推荐Agent - 从新闻/社媒中发现潜在机会"""
@@ -265,9 +269,10 @@ class RecommendationAgent(BaseAgent):
         candidates = sorted(
             stock_signals.items(), key=lambda x: x[1]["news_count"], reverse=True
         )[:12]
+        prices = fetch_stock_prices([symbol for symbol, _ in candidates]) if candidates else {}
 
         for symbol, data in candidates:
-            price = fetch_stock_price(symbol)
+            price = prices.get(symbol, {"error": "no data"})
             if "error" in price:
                 data["composite_score"] = max(data["bullish_score"] * 0.6, 0.0)
                 data["brief_analysis"] = "行情数据获取失败，暂按新闻情绪评估。"
@@ -433,12 +438,15 @@ def scan_for_opportunities(
     universe_size: int = 0,
     prefilter_size: int = 120,
     final_size: int = 21,
+    llm_scoring: Optional[bool] = None,
 ) -> Dict:
     """
     扫描新闻发现潜在机会股
     
     Args:
         max_news: 最大新闻数量
+        llm_scoring: 规则评分后再分批请 LLM 给全部候选打分并融合进综合分（见 discovery_llm），
+            默认取环境变量 DISCOVER_LLM_SCORING
         
     Returns:
         Dict: 包含热门股票推荐
@@ -465,8 +473,11 @@ def scan_for_opportunities(
     exchange_breakdown = universe_meta.get("exchange_breakdown", {})
     logger.info(f"候选池加载完成，共 {len(universe)} 只，交易所分布: {exchange_breakdown}")
 
-    prefiltered = prefilter_universe(universe, top_k=max(prefilter_size, 30))
-    logger.info(f"预筛完成，共 {len(prefiltered)} 只")
+    prefiltered, prefilter_stats = prefilter_universe_with_stats(universe, top_k=max(prefilter_size, 30))
+    logger.info(
+        f"预筛完成，共 {len(prefiltered)} 只，耗时 {prefilter_stats.get('seconds', 0)}s，"
+        f"分块 {len(prefilter_stats.get('chunks', []))} 个，失败 {len(prefilter_stats.get('failed_symbols', []))} 只"
+    )
 
     if not prefiltered:
         # fallback: keep legacy behavior based on news extraction.
@@ -510,6 +521,7 @@ def scan_for_opportunities(
                 "scored": len(recommendations),
                 "final_count": len(recommendations),
                 "exchange_breakdown": exchange_breakdown,
+                "prefilter": prefilter_stats,
             },
         }
 
@@ -520,9 +532,11 @@ def scan_for_opportunities(
     ]
 
     scored = []
+    llm_features = {}
+    prices = fetch_stock_prices([row["symbol"] for row in prefiltered])
     for row in prefiltered:
         symbol = row["symbol"]
-        price = fetch_stock_price(symbol)
+        price = prices.get(symbol, {"error": "no data"})
         if "error" in price:
             continue
 
@@ -596,8 +610,27 @@ def scan_for_opportunities(
                 "source_quality": round(source_quality, 2),
             }
         )
+        llm_features[symbol] = {
+            "trend": price.get("trend", "NEUTRAL"),
+            "rsi14": price.get("rsi14", 50),
+            "macd_hist": price.get("macd_hist", 0),
+            "atr_pct": atr_pct,
+            "revenue_growth": price.get("revenue_growth", 0),
+            "pe_ratio": price.get("pe_ratio", 0),
+            "headlines": symbol_news[:2],
+        }
 
     scored.sort(key=lambda x: x["composite_score"], reverse=True)
+    if llm_scoring is None:
+        llm_scoring = os.getenv("DISCOVER_LLM_SCORING", "false").lower() in ("1", "true", "yes")
+    llm_stats = None
+    if llm_scoring and scored:
+        llm_stats = _apply_llm_scores(scored, llm_features)
+        logger.info(
+            f"LLM 候选评分: {llm_stats['scored']}/{len(scored)} 只，请求 {llm_stats['requests']} 次"
+            f"（失败 {llm_stats['failed']}），超预算未评 {llm_stats['skipped']} 只，"
+            f"预估 {llm_stats['estimated_tokens']} tokens"
+        )
     final_count = min(max(final_size, 21), len(scored))
     recommendations = scored[:final_count]
     top_pick = recommendations[0] if recommendations else None
@@ -629,6 +662,8 @@ def scan_for_opportunities(
                 "",
             ]
         )
+        if "llm_score" in top_pick:
+            summary_lines.insert(-1, f"- LLM评分: {top_pick['llm_score']}/100 | 规则评分: {top_pick['rule_score']:.2f}")
 
     if watchlist:
         summary_lines.append("### 📋 20只备选")
@@ -655,10 +690,50 @@ def scan_for_opportunities(
             "scored": len(scored),
             "final_count": len(recommendations),
             "exchange_breakdown": exchange_breakdown,
+            "prefilter": prefilter_stats,
+            "llm_scoring": llm_stats,
         },
     }
 
 
+def _apply_llm_scores(scored: List[Dict], features: Dict[str, Dict], weight: Optional[float] = None) -> Dict:
+    """
+    把 LLM 分数按权重融合进综合分并重新排序（原地修改 scored）
+
+    composite = 规则分 × (1 - weight) + LLM分/100 × weight；没拿到 LLM 分的候选保持规则分。
+    """
+    from ai_stock_analyst.agents.discovery_llm import score_candidates
+
+    if weight is None:
+        weight = float(os.getenv("DISCOVER_LLM_WEIGHT", str(DISCOVER_LLM_WEIGHT)))
+    weight = max(0.0, min(1.0, weight))
+    result = score_candidates([{**item, **features.get(item["symbol"], {})} for item in scored])
+
+    for item in scored:
+        llm = result["scores"].get(item["symbol"])
+        if llm is None:
+            continue
+        composite = item["composite_score"] * (1 - weight) + llm["score"] / 100 * weight
+        composite = max(0.0, min(1.0, composite))
+        item["rule_score"] = item["composite_score"]
+        item["llm_score"] = round(llm["score"], 1)
+        item["composite_score"] = round(composite, 2)
+        item["score_100"] = round(composite * 100, 1)
+        item["signal"] = "BUY" if composite >= 0.72 else "HOLD"
+        if llm["reason"]:
+            item["recommend_reason"] = f"{item['recommend_reason']}LLM评分{llm['score']:.0f}：{llm['reason']}"
+
+    scored.sort(key=lambda x: x["composite_score"], reverse=True)
+    return {
+        "scored": len(result["scores"]),
+        "requests": result["requests"],
+        "failed": result["failed"],
+        "skipped": len(result["skipped"]),
+        "estimated_tokens": result["estimated_tokens"],
+        "used_tokens": result["used_tokens"],
+    }
+
+
 def _match_news_for_symbol(symbol: str, news_pool: List[Dict], max_items: int = 4) -> List[Dict]:
     symbol_upper = symbol.upper()
     direct = re.compile(rf"\b{re.escape(symbol_upper)}\b")
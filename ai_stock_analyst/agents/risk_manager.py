@@ -3,10 +3,12 @@
 """
 from typing import Dict, List
 
-from ai_stock_analyst.agents.base import AnalysisResult, BaseAgent
+from ai_stock_analyst.agents.base import ALL_UPSTREAM, AnalysisResult, BaseAgent
 
 
 class RiskManager(BaseAgent):
+    depends_on = (ALL_UPSTREAM,)
+
     def __init__(self):
         super().__init__("RiskManager")
 
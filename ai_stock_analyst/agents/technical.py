@@ -7,6 +7,8 @@ from ai_stock_analyst.agents.base import BaseAgent, AnalysisResult
 
 class TechnicalAnalyst(BaseAgent):
     """技术面分析Agent"""
+
+    llm_role = "technical"
     
     def __init__(self):
         super().__init__("TechnicalAnalyst")
@@ -55,8 +57,8 @@ ATR占比: {atr_pct}%
         
         # 调用LLM分析
         try:
-            response = self.call_llm(prompt, "你是专业技术分析师，擅长技术分析")
-            signal = self._extract_signal(response)
+            response, signal = self.call_llm_role(data, prompt, "你是专业技术分析师，擅长技术分析")
+            signal = signal or self._extract_signal(response)
             confidence = 0.7 if trend != "NEUTRAL" else 0.5
         except Exception:
             # LLM失败时使用规则判断
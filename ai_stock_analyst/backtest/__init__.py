@@ -0,0 +1,57 @@
+"""
+回测包初始化
+
+导出回测相关类和函数
+"""
+from .engine import (
+    BacktestMetrics,
+    BacktestResult,
+    StrategyParams,
+    backtest_from_signals,
+    max_drawdown,
+    run_vectorized_backtest,
+    signal_panel,
+)
+from .metrics import bootstrap_ci, performance_metrics, rolling_metrics, trade_stats
+from .pipeline_replay import PipelineReplay, load_news_history, replay_pipeline
+from .portfolio import PortfolioConfig, PortfolioResult, run_portfolio_backtest, write_portfolio_reports
+from .report import BacktestReportWriter
+from .result_cache import BacktestResultCache, cached_backtest, get_backtest_cache
+from .runner import run_backtests
+from .sweep import SweepRow, expand_grid, run_sweep, write_sweep_reports
+from .walkforward import WalkForwardConfig, WalkForwardResult, run_walk_forward, walk_forward, write_walkforward_reports
+
+__all__ = [
+    "BacktestMetrics",
+    "BacktestReportWriter",
+    "BacktestResult",
+    "BacktestResultCache",
+    "PipelineReplay",
+    "PortfolioConfig",
+    "PortfolioResult",
+    "StrategyParams",
+    "SweepRow",
+    "WalkForwardConfig",
+    "WalkForwardResult",
+    "backtest_from_signals",
+    "bootstrap_ci",
+    "cached_backtest",
+    "expand_grid",
+    "get_backtest_cache",
+    "load_news_history",
+    "max_drawdown",
+    "performance_metrics",
+    "replay_pipeline",
+    "rolling_metrics",
+    "run_backtests",
+    "run_portfolio_backtest",
+    "run_sweep",
+    "run_vectorized_backtest",
+    "run_walk_forward",
+    "signal_panel",
+    "trade_stats",
+    "walk_forward",
+    "write_portfolio_reports",
+    "write_sweep_reports",
+    "write_walkforward_reports",
+]
@@ -0,0 +1,194 @@
+"""
+向量化回测引擎
+
+全部指标序列只在完整历史上计算一次，信号以数组掩码求值，
+净值、回撤与胜率由累计运算得到，结果与逐日前缀重算的旧实现一致。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.features import PanelFeatures, calculate_panel_features
+
+from .metrics import performance_metrics, trade_stats
+
+WARMUP_BARS = 40
+MIN_BARS = 80
+
+
+@dataclass
+class BacktestMetrics:
+    symbol: str
+    total_return_pct: float
+    benchmark_return_pct: float
+    max_drawdown_pct: float
+    trades: int
+    hit_rate_pct: float
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """趋势+动量策略阈值（默认值与 decide_signal 一致）"""
+
+    rsi_buy_max: float = 72.0
+    rsi_sell_min: float = 78.0
+    atr_pct_max: float = 4.0
+    volatility_max: float = 3.0
+
+
+@dataclass
+class BacktestResult:
+    """逐日回测序列：第 k 个元素对应第 warmup+k 根K线收盘时的决策"""
+
+    index: Optional[pd.Index]
+    signals: np.ndarray
+    strategy_returns: np.ndarray
+    benchmark_returns: np.ndarray
+    strategy_curve: np.ndarray = field(init=False)
+    benchmark_curve: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.strategy_curve = _equity_curve(self.strategy_returns)
+        self.benchmark_curve = _equity_curve(self.benchmark_returns)
+
+    def metrics(self, symbol: str) -> BacktestMetrics:
+        trades = int(np.count_nonzero(self.signals))
+        wins = int(np.count_nonzero((self.signals != 0) & (self.strategy_returns > 0)))
+        hit_rate = (wins / trades * 100) if trades else 0.0
+        return BacktestMetrics(
+            symbol=symbol,
+            total_return_pct=round(float(self.strategy_curve[-1] - 1) * 100, 2),
+            benchmark_return_pct=round(float(self.benchmark_curve[-1] - 1) * 100, 2),
+            max_drawdown_pct=round(max_drawdown(self.strategy_curve) * 100, 2),
+            trades=trades,
+            hit_rate_pct=round(hit_rate, 2),
+        )
+
+    def performance(self) -> Dict[str, float]:
+        """Sharpe/Sortino/Calmar、暴露、换手与逐笔交易统计（见 metrics 模块），百分比口径保留两位小数"""
+        perf = performance_metrics(self.strategy_returns, self.signals)
+        trades = trade_stats(self.signals, self.strategy_returns)
+        return {
+            "cagr_pct": round(float(perf["cagr"]) * 100, 2),
+            "volatility_pct": round(float(perf["volatility"]) * 100, 2),
+            "sharpe": round(float(perf["sharpe"]), 3),
+            "sortino": round(float(perf["sortino"]), 3),
+            "calmar": round(float(perf["calmar"]), 3),
+            "exposure_pct": round(float(perf["exposure"]) * 100, 2),
+            "annual_turnover": round(float(perf["turnover"]), 2),
+            "round_trips": int(trades["round_trips"]),
+            "trade_win_rate_pct": round(float(trades["win_rate"]) * 100, 2),
+            "avg_trade_pct": round(float(trades["avg_trade_return"]) * 100, 3),
+            "avg_holding_days": round(float(trades["avg_holding_days"]), 2),
+            "profit_factor": round(float(trades["profit_factor"]), 3),
+        }
+
+
+def signal_inputs(features: PanelFeatures) -> Dict[str, np.ndarray]:
+    """按 calculate_features 的取整口径准备信号所需的指标数组。"""
+    rsi14 = np.round(features.rsi14, 2)
+    return {
+        "bullish": features.bullish,
+        # decide_signal 里 `or 50` 会把 0 当作缺省值
+        "rsi14": np.where(rsi14 == 0, 50.0, rsi14),
+        "macd": np.round(features.macd, 4),
+        "macd_signal": np.round(features.macd_signal, 4),
+        "atr_pct": np.round(features.atr_pct, 3),
+        "volatility": np.round(features.volatility_20d * 100, 3),
+    }
+
+
+def evaluate_signals(
+    inputs: Dict[str, np.ndarray],
+    rsi_buy_max,
+    rsi_sell_min,
+    atr_pct_max,
+    volatility_max,
+) -> np.ndarray:
+    """decide_signal 的数组版本；阈值可以是标量，也可以是能与指标数组广播的参数数组。"""
+    bullish = inputs["bullish"]
+    rsi14 = inputs["rsi14"]
+    macd_up = inputs["macd"] >= inputs["macd_signal"]
+
+    buy = bullish & macd_up & (rsi14 < rsi_buy_max)
+    sell = ~bullish & ((rsi14 > rsi_sell_min) | ~macd_up)
+    signals = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+
+    # Risk gate
+    gated = (signals == 1) & ((inputs["atr_pct"] >= atr_pct_max) | (inputs["volatility"] >= volatility_max))
+    signals[gated] = 0
+    return signals
+
+
+def signal_panel(features: PanelFeatures, params: StrategyParams = StrategyParams()) -> np.ndarray:
+    return evaluate_signals(
+        signal_inputs(features),
+        params.rsi_buy_max,
+        params.rsi_sell_min,
+        params.atr_pct_max,
+        params.volatility_max,
+    )
+
+
+def run_vectorized_backtest(
+    frame: pd.DataFrame,
+    params: StrategyParams = StrategyParams(),
+    warmup: int = WARMUP_BARS,
+) -> Optional[BacktestResult]:
+    """对单只股票的标准化 OHLCV 做全序列回测；数据不足时返回 None。"""
+    if frame is None or frame.empty or len(frame) < warmup + 2:
+        return None
+
+    features = frame_features(frame)
+    signals = signal_panel(features, params)[:, 0]
+    return backtest_from_signals(frame["Close"].to_numpy(dtype=float), signals, warmup=warmup, index=frame.index)
+
+
+def frame_features(frame: pd.DataFrame) -> PanelFeatures:
+    """单只股票 OHLCV 的完整指标序列（单列面板）"""
+    return calculate_panel_features(
+        frame["Close"].to_numpy(dtype=float),
+        high=_column(frame, "High"),
+        low=_column(frame, "Low"),
+        volume=_column(frame, "Volume"),
+        open_=_column(frame, "Open"),
+    )
+
+
+def backtest_from_signals(
+    close: np.ndarray,
+    signals: np.ndarray,
+    warmup: int = WARMUP_BARS,
+    index: Optional[pd.Index] = None,
+) -> BacktestResult:
+    """第 i 天收盘的信号承担第 i 天到第 i+1 天的收益。"""
+    close = np.asarray(close, dtype=float)
+    steps = slice(warmup, len(close) - 1)
+    next_ret = close[warmup + 1 :] / close[steps] - 1
+    decided = np.asarray(signals[steps], dtype=np.int8)
+    return BacktestResult(
+        index=index[steps] if index is not None else None,
+        signals=decided,
+        strategy_returns=decided * next_ret,
+        benchmark_returns=next_ret,
+    )
+
+
+def max_drawdown(curve: np.ndarray) -> float:
+    """最大回撤（负数），curve 为从 1.0 开始的净值序列"""
+    peak = np.maximum.accumulate(curve)
+    return float(min(np.min((curve - peak) / peak), 0.0))
+
+
+def _equity_curve(returns: np.ndarray) -> np.ndarray:
+    return np.concatenate([[1.0], np.cumprod(1 + returns)])
+
+
+def _column(frame: pd.DataFrame, name: str) -> Optional[np.ndarray]:
+    if name not in frame.columns:
+        return None
+    return pd.to_numeric(frame[name], errors="coerce").to_numpy(dtype=float)
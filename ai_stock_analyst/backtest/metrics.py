@@ -0,0 +1,218 @@
+"""
+扩展绩效指标
+
+所有函数都按最后一维为时间轴处理，输入可以是一条序列 (天数,) 或一批序列 (行数 × 天数)，
+例如参数扫描的 (组合数 × 天数) 收益矩阵，一次数组运算得到每行的指标，不逐行循环。
+- performance_metrics：年化收益/波动、Sharpe、Sortino、Calmar、最大回撤、持仓暴露、换手
+- rolling_metrics：滚动窗口（默认 63/252 日）收益、波动、Sharpe、Sortino，基于前缀和
+- trade_stats：把连续同向的持仓日合并为一笔交易后的逐笔统计
+- bootstrap_ci：循环分块自助法置信区间，全部重采样作为一个矩阵批量求指标
+Sharpe/Sortino 不扣无风险利率，标准差取总体口径（与 walk-forward 的 sharpe 目标一致）。
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+PERIODS_PER_YEAR = 252
+ROLLING_WINDOWS = (63, 252)
+BOOTSTRAP_METRICS = ("total_return", "cagr", "sharpe", "sortino", "max_drawdown")
+# 每批重采样的行数，限制 (重采样数 × 天数) 矩阵的内存占用
+BOOTSTRAP_CHUNK = 1000
+# 没有亏损交易时 profit_factor 的封顶值（避免 inf 写入 JSON 报告变成非法的 Infinity）
+PROFIT_FACTOR_CAP = 999.0
+
+
+def performance_metrics(
+    returns: np.ndarray,
+    signals: Optional[np.ndarray] = None,
+    periods: int = PERIODS_PER_YEAR,
+) -> Dict[str, np.ndarray]:
+    """
+    逐行绩效指标；输入一维时返回标量（0 维数组），二维时返回长度为行数的数组
+
+    Args:
+        returns: 逐日策略收益
+        signals: 逐日持仓方向（-1/0/1），给出时额外计算 exposure 与 turnover
+        periods: 每年的交易日数
+    """
+    r = np.atleast_2d(np.asarray(returns, dtype=float))
+    n = r.shape[-1]
+    years = max(n / periods, 1e-9)
+
+    curve = _curves(r)
+    peak = np.maximum.accumulate(curve, axis=-1)
+    mdd = np.minimum(((curve - peak) / peak).min(axis=-1), 0.0)
+    total = curve[:, -1] - 1
+    cagr = np.where(total > -1, np.power(np.maximum(1 + total, 1e-12), 1 / years) - 1, -1.0)
+    mean = r.mean(axis=-1) if n else np.zeros(len(r))
+    std = r.std(axis=-1) if n else np.zeros(len(r))
+    downside = np.sqrt((np.minimum(r, 0.0) ** 2).mean(axis=-1)) if n else np.zeros(len(r))
+
+    out = {
+        "total_return": total,
+        "cagr": cagr,
+        "volatility": std * np.sqrt(periods),
+        "sharpe": _ratio(mean, std) * np.sqrt(periods),
+        "sortino": _ratio(mean, downside) * np.sqrt(periods),
+        "max_drawdown": mdd,
+        "calmar": _ratio(cagr, -mdd),
+    }
+    if signals is not None:
+        s = np.atleast_2d(np.asarray(signals, dtype=float))
+        # 换手按持仓方向的变化量计（空仓→多头为 1，多头→空头为 2），起点视为空仓
+        changes = np.abs(np.diff(s, axis=-1, prepend=0.0)).sum(axis=-1)
+        out["exposure"] = (s != 0).mean(axis=-1) if n else np.zeros(len(s))
+        out["turnover"] = changes / years
+    return {key: value[0] if np.ndim(returns) == 1 else value for key, value in out.items()}
+
+
+def drawdowns(returns: np.ndarray) -> np.ndarray:
+    """逐行回撤序列（首列对应净值起点，长度为天数 + 1），值 <= 0"""
+    curve = _curves(np.atleast_2d(np.asarray(returns, dtype=float)))
+    peak = np.maximum.accumulate(curve, axis=-1)
+    return np.minimum((curve - peak) / peak, 0.0)
+
+
+def rolling_metrics(
+    returns: np.ndarray,
+    window: int,
+    periods: int = PERIODS_PER_YEAR,
+) -> Dict[str, np.ndarray]:
+    """
+    滚动窗口指标，形状与 returns 相同，前 window-1 个位置为 NaN
+
+    每个窗口的值由前缀和相减求得，与窗口长度无关，O(天数)。
+    """
+    r = np.asarray(returns, dtype=float)
+    batch = np.atleast_2d(r)
+    n = batch.shape[-1]
+    shape = batch.shape
+    out = {key: np.full(shape, np.nan) for key in ("return", "volatility", "sharpe", "sortino")}
+    if window < 2 or n < window:
+        return {key: value[0] if r.ndim == 1 else value for key, value in out.items()}
+
+    log_sum = _window_sum(np.log1p(np.maximum(batch, -0.999999)), window)
+    s1 = _window_sum(batch, window)
+    s2 = _window_sum(batch * batch, window)
+    d2 = _window_sum(np.minimum(batch, 0.0) ** 2, window)
+
+    mean = s1 / window
+    std = np.sqrt(np.maximum(s2 / window - mean * mean, 0.0))
+    downside = np.sqrt(d2 / window)
+    out["return"][:, window - 1 :] = np.expm1(log_sum)
+    out["volatility"][:, window - 1 :] = std * np.sqrt(periods)
+    out["sharpe"][:, window - 1 :] = _ratio(mean, std) * np.sqrt(periods)
+    out["sortino"][:, window - 1 :] = _ratio(mean, downside) * np.sqrt(periods)
+    return {key: value[0] if r.ndim == 1 else value for key, value in out.items()}
+
+
+def trade_stats(signals: np.ndarray, returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    逐笔交易统计：连续同向的非零信号日合并为一笔，收益按日复利
+
+    二维输入时所有行展平后一次 reduceat，行边界处强制断开。
+    profit_factor 在只有盈利交易时取 PROFIT_FACTOR_CAP，没有交易时为 0。
+    """
+    s = np.atleast_2d(np.asarray(signals)).astype(np.int8)
+    r = np.atleast_2d(np.asarray(returns, dtype=float))
+    rows, n = s.shape
+
+    flat_s = s.ravel()
+    flat_log = np.log1p(np.maximum(r.ravel(), -0.999999))
+    position = np.arange(flat_s.size)
+    new_run = np.ones(flat_s.size, dtype=bool)
+    new_run[1:] = (flat_s[1:] != flat_s[:-1]) | (position[1:] % n == 0)
+    starts = np.flatnonzero(new_run)
+    held = flat_s[starts] != 0
+    starts = starts[held]
+
+    lengths = np.diff(np.append(np.flatnonzero(new_run), flat_s.size))[held]
+    trade_ret = np.expm1(np.add.reduceat(flat_log, np.flatnonzero(new_run))[held]) if n else np.array([])
+    owner = starts // n if n else np.array([], dtype=int)
+
+    count = np.bincount(owner, minlength=rows)
+    wins = np.bincount(owner, weights=trade_ret > 0, minlength=rows)
+    gross_win = np.bincount(owner, weights=np.maximum(trade_ret, 0.0), minlength=rows)
+    gross_loss = np.bincount(owner, weights=np.maximum(-trade_ret, 0.0), minlength=rows)
+    total_ret = np.bincount(owner, weights=trade_ret, minlength=rows)
+    total_len = np.bincount(owner, weights=lengths, minlength=rows)
+
+    best = np.full(rows, np.nan)
+    worst = np.full(rows, np.nan)
+    np.fmax.at(best, owner, trade_ret)
+    np.fmin.at(worst, owner, trade_ret)
+
+    out = {
+        "round_trips": count,
+        "win_rate": _ratio(wins, count),
+        "avg_trade_return": _ratio(total_ret, count),
+        "avg_win": _ratio(gross_win, wins),
+        "avg_loss": -_ratio(gross_loss, count - wins),
+        "profit_factor": np.minimum(
+            np.divide(gross_win, gross_loss, out=np.full(rows, np.inf), where=gross_loss > 0), PROFIT_FACTOR_CAP
+        ),
+        "avg_holding_days": _ratio(total_len, count),
+        "best_trade": np.nan_to_num(best),
+        "worst_trade": np.nan_to_num(worst),
+    }
+    out["profit_factor"][gross_win + gross_loss == 0] = 0.0
+    return {key: value[0] if np.ndim(signals) == 1 else value for key, value in out.items()}
+
+
+def bootstrap_ci(
+    returns: np.ndarray,
+    n_resamples: int = 2000,
+    block: int = 21,
+    confidence: float = 0.95,
+    periods: int = PERIODS_PER_YEAR,
+    metrics: Sequence[str] = BOOTSTRAP_METRICS,
+    seed: Optional[int] = 0,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    循环分块自助法置信区间
+
+    每次重采样把长度为 block 的连续片段（首尾相接）拼到原长度，保留收益的短期自相关；
+    全部重采样组成 (重采样数 × 天数) 矩阵，交给 performance_metrics 一次求出每行指标。
+    """
+    r = np.asarray(returns, dtype=float).ravel()
+    n = len(r)
+    if n < 2 or n_resamples < 1:
+        return {name: (float("nan"), float("nan")) for name in metrics}
+    block = int(min(max(block, 1), n))
+    n_blocks = -(-n // block)
+    rng = np.random.default_rng(seed)
+    offsets = np.arange(block)
+
+    samples: Dict[str, list] = {name: [] for name in metrics}
+    for start in range(0, n_resamples, BOOTSTRAP_CHUNK):
+        size = min(BOOTSTRAP_CHUNK, n_resamples - start)
+        block_starts = rng.integers(0, n, size=(size, n_blocks))
+        idx = ((block_starts[:, :, None] + offsets) % n).reshape(size, -1)[:, :n]
+        scored = performance_metrics(r[idx], periods=periods)
+        for name in metrics:
+            samples[name].append(scored[name])
+
+    tail = (1 - confidence) / 2 * 100
+    out = {}
+    for name in metrics:
+        low, high = np.percentile(np.concatenate(samples[name]), [tail, 100 - tail])
+        out[name] = (float(low), float(high))
+    return out
+
+
+def _curves(returns: np.ndarray) -> np.ndarray:
+    # 与 BacktestResult 的净值曲线相同的累乘顺序，总收益逐位一致
+    return np.concatenate([np.ones((len(returns), 1)), np.cumprod(1 + returns, axis=-1)], axis=-1)
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    prefix = np.concatenate([np.zeros((len(values), 1)), np.cumsum(values, axis=-1)], axis=-1)
+    return prefix[:, window:] - prefix[:, :-window]
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 1e-12)
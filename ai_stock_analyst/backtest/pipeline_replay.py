@@ -0,0 +1,288 @@
+"""
+多 Agent 流程历史回放
+
+按交易日逐日调用真实的 StockAnalyzer.analyze，得到 PortfolioManager 决策的时间序列，
+而不是 decide_signal 这份简化副本。每个决策日只使用当时可得的数据：
+- 价格：截至当日收盘的约 6 个月K线（与 fetch_stock_prices 的窗口一致），特征用 calculate_features 计算
+- 市场上下文：截至当日的 QQQ/^VIX 等收盘价，经 summarize_market_context 求得
+- 新闻：news_articles 表中当日收盘（16:00 纽约时间）前 NEWS_LOOKBACK_DAYS 天内发布的条目；
+  决策按当日收盘价成交，收盘后发布的新闻（如盘后财报）只能影响下一个交易日
+- 基本面：调用方传入的快照（本地没有历史基本面，属于已知的前视偏差）
+LLM 默认换成 StubLLMRouter，各 Agent 走规则兜底；也可以传入带缓存回复的路由器。
+股票 × 日期分块后在进程池中并行回放。
+"""
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.calendar import session_close
+from ai_stock_analyst.data.features import calculate_features_batch
+
+from .engine import MIN_BARS, WARMUP_BARS, BacktestMetrics, BacktestResult, backtest_from_signals
+
+logger = logging.getLogger(__name__)
+
+HISTORY_WINDOW = pd.DateOffset(months=6)
+MARKET_WINDOW = pd.DateOffset(months=3)
+NEWS_LOOKBACK_DAYS = 3
+NEWS_PER_DAY = 10
+# 每个子任务回放的交易日数
+DAYS_PER_TASK = 64
+
+SIGNAL_VALUES = {"BUY": 1, "SELL": -1, "HOLD": 0}
+DECISION_COLUMNS = ("signal", "confidence", "score_100", "position_size", "close")
+
+
+@dataclass
+class PipelineReplay:
+    """单只股票的逐日决策与按决策持仓的回测结果"""
+
+    symbol: str
+    decisions: pd.DataFrame
+    result: Optional[BacktestResult]
+
+    def metrics(self) -> BacktestMetrics:
+        if self.result is None or not len(self.result.signals):
+            return BacktestMetrics(self.symbol, 0.0, 0.0, 0.0, 0, 0.0)
+        return self.result.metrics(self.symbol)
+
+    def signal_counts(self) -> Dict[str, int]:
+        counts = self.decisions["signal"].value_counts()
+        return {signal: int(counts.get(signal, 0)) for signal in SIGNAL_VALUES}
+
+
+def replay_pipeline(
+    histories: Mapping[str, pd.DataFrame],
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    step: int = 1,
+    workers: Optional[int] = None,
+    market: Optional[Mapping[str, pd.Series]] = None,
+    news: Optional[Mapping[str, List[Dict]]] = None,
+    fundamentals: Optional[Mapping[str, Dict]] = None,
+    llm_router=None,
+) -> List[PipelineReplay]:
+    """
+    逐日回放完整 Agent 流程
+
+    Args:
+        histories: {symbol: OHLCV}，决策日之前至少要有 WARMUP_BARS 根K线
+        start/end: 回放日期范围（含），默认为全部可回放的交易日
+        step: 每隔 step 个交易日做一次决策，中间沿用上一次的决策
+        market: {ticker: 收盘价序列}，至少包含 QQQ 才会生成市场上下文
+        news: {symbol: [{title, source, summary, link, published_at（UTC，不带时区）}]}，通常来自 load_news_history
+        fundamentals: {symbol: Ticker.info 同名字段}
+        llm_router: 子进程中安装的路由器，默认 StubLLMRouter()（全部走规则兜底）
+    """
+    from ai_stock_analyst.llm import StubLLMRouter
+
+    llm_router = llm_router if llm_router is not None else StubLLMRouter()
+    market = market or {}
+    news = news or {}
+    fundamentals = fundamentals or {}
+
+    tasks: List[Tuple[str, List[int]]] = []
+    rows_by_symbol: Dict[str, List[int]] = {}
+    for symbol, frame in histories.items():
+        if frame is None or len(frame) < MIN_BARS:
+            logger.info(f"Pipeline replay skipped {symbol}: not enough bars")
+            continue
+        rows = _decision_rows(frame.index, start, end, step)
+        if not rows:
+            continue
+        rows_by_symbol[symbol] = rows
+        tasks.extend((symbol, rows[i : i + DAYS_PER_TASK]) for i in range(0, len(rows), DAYS_PER_TASK))
+
+    replay_dates = sorted({histories[s].index[r] for s, rows in rows_by_symbol.items() for r in rows})
+    contexts = market_contexts(market, replay_dates)
+
+    decisions: Dict[str, List[Dict]] = {symbol: [] for symbol in rows_by_symbol}
+
+    def payload(symbol: str, rows: List[int]) -> Tuple:
+        frame = histories[symbol]
+        lo = int(frame.index.searchsorted(frame.index[rows[0]] - HISTORY_WINDOW))
+        # 只传窗口需要的那一段K线，行号相应平移
+        return (
+            symbol,
+            frame.iloc[lo : rows[-1] + 1],
+            [r - lo for r in rows],
+            {frame.index[r]: contexts.get(frame.index[r], {}) for r in rows},
+            news.get(symbol, []),
+            fundamentals.get(symbol, {}),
+        )
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(tasks) <= 1:
+        from ai_stock_analyst.llm import set_llm_router
+
+        previous = set_llm_router(llm_router)
+        try:
+            for symbol, rows in tasks:
+                decisions[symbol].extend(_replay_rows(*payload(symbol, rows)))
+        finally:
+            set_llm_router(previous)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)), initializer=_install_router, initargs=(llm_router,)
+        ) as pool:
+            futures = {pool.submit(_replay_rows, *payload(symbol, rows)): symbol for symbol, rows in tasks}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    decisions[symbol].extend(future.result())
+                except Exception as e:
+                    logger.warning(f"Pipeline replay task for {symbol} failed: {e}")
+
+    return [
+        _build_replay(symbol, histories[symbol], rows_by_symbol[symbol], decisions[symbol])
+        for symbol in rows_by_symbol
+    ]
+
+
+def market_contexts(market: Mapping[str, pd.Series], dates: Sequence[pd.Timestamp]) -> Dict[pd.Timestamp, Dict]:
+    """每个回放日截至当日收盘的市场上下文（所有股票共用，只算一次）"""
+    from ai_stock_analyst.data.market_context import summarize_market_context
+
+    if "QQQ" not in market:
+        return {}
+    closes = {t: pd.to_numeric(s, errors="coerce").dropna().sort_index() for t, s in market.items()}
+    out = {}
+    for date in dates:
+        window = {t: s.loc[date - MARKET_WINDOW : date] for t, s in closes.items()}
+        out[date] = summarize_market_context(window) if not window["QQQ"].empty else {}
+    return out
+
+
+def load_news_history(symbols: Sequence[str], db=None) -> Dict[str, List[Dict]]:
+    """从 news_articles 表读取新闻，按发布时间升序；published_at 为空的条目无法定位时点，跳过。"""
+    from ai_stock_analyst.database import get_db
+
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    db = db or get_db()
+    placeholders = ",".join("?" for _ in symbols)
+    rows = db.fetch_all(
+        f"""
+        SELECT symbol, title, source, summary, url, published_at FROM news_articles
+        WHERE symbol IN ({placeholders}) AND published_at IS NOT NULL
+        """,
+        tuple(symbols),
+    )
+
+    out: Dict[str, List[Dict]] = {}
+    for row in rows:
+        published = pd.to_datetime(row["published_at"], errors="coerce", utc=True)
+        if pd.isna(published):
+            continue
+        out.setdefault(row["symbol"], []).append(
+            {
+                "title": row["title"],
+                "source": row["source"] or "",
+                "summary": row["summary"] or "",
+                "link": row["url"],
+                "published_at": published.tz_localize(None),
+            }
+        )
+    for items in out.values():
+        items.sort(key=lambda item: item["published_at"])
+    return out
+
+
+def _install_router(router) -> None:
+    from ai_stock_analyst.llm import set_llm_router
+
+    set_llm_router(router)
+
+
+def _decision_rows(index: pd.Index, start: Optional[str], end: Optional[str], step: int) -> List[int]:
+    """可回放的行号：至少有 WARMUP_BARS 根历史，且保留最后一根用于计算次日收益"""
+    rows = np.arange(WARMUP_BARS, len(index) - 1)
+    if start is not None:
+        rows = rows[index[rows] >= pd.Timestamp(start)]
+    if end is not None:
+        rows = rows[index[rows] <= pd.Timestamp(end)]
+    return [int(r) for r in rows[:: max(step, 1)]]
+
+
+def _replay_rows(
+    symbol: str,
+    frame: pd.DataFrame,
+    rows: List[int],
+    contexts: Dict[pd.Timestamp, Dict],
+    news: List[Dict],
+    fundamentals: Dict,
+) -> List[Dict]:
+    """在当前进程中逐日运行 StockAnalyzer；返回每个决策日的摘要"""
+    from ai_stock_analyst.agents.analyzer import StockAnalyzer
+    from ai_stock_analyst.data.fetcher import _build_price_payload
+
+    # 回放时 LLM 为桩实现或缓存回复，没有网络等待，串行执行省去线程调度开销
+    analyzer = StockAnalyzer(max_workers=1)
+    published = np.array([item["published_at"] for item in news], dtype="datetime64[ns]")
+    close = frame["Close"]
+    windows = {}
+    for row in rows:
+        lo = int(frame.index.searchsorted(frame.index[row] - HISTORY_WINDOW))
+        windows[row] = frame.iloc[lo : row + 1]
+    # 整块任务的窗口一次性按面板计算特征，结果与逐个 calculate_features 一致
+    features = calculate_features_batch({str(row): hist for row, hist in windows.items()})
+
+    out = []
+    for row in rows:
+        date = frame.index[row]
+        info = {
+            **fundamentals,
+            "currentPrice": float(close.iloc[row]),
+            "previousClose": float(close.iloc[row - 1]) if row > 0 else float(close.iloc[row]),
+            "volume": float(frame["Volume"].iloc[row]) if "Volume" in frame else 0,
+        }
+        price_data = _build_price_payload(symbol, info, windows[row], features[str(row)], contexts.get(date, {}))
+        data = {"symbol": symbol, "price_data": price_data}
+
+        # 发布时间为 UTC；只取当日收盘前发布的新闻
+        close_at = pd.Timestamp(session_close(date.date())).tz_convert("UTC").tz_localize(None)
+        cutoff = np.datetime64(close_at)
+        start = np.datetime64(close_at - pd.Timedelta(days=NEWS_LOOKBACK_DAYS))
+        hi = int(np.searchsorted(published, cutoff, side="left"))
+        first = int(np.searchsorted(published, start, side="left"))
+        recent = news[first:hi][::-1][:NEWS_PER_DAY]
+        if recent:
+            data["news"] = [{k: item[k] for k in ("title", "source", "summary", "link")} for item in recent]
+
+        decision = analyzer.analyze(symbol, data)["decision"]
+        out.append(
+            {
+                "date": date,
+                "signal": decision["signal"],
+                "confidence": decision["confidence"],
+                "score_100": decision["score_100"],
+                "position_size": decision["position_size"],
+                "close": info["currentPrice"],
+            }
+        )
+    return out
+
+
+def _build_replay(symbol: str, frame: pd.DataFrame, rows: List[int], decisions: List[Dict]) -> PipelineReplay:
+    if not decisions:
+        return PipelineReplay(symbol, pd.DataFrame(columns=DECISION_COLUMNS), None)
+    table = pd.DataFrame(decisions).sort_values("date").set_index("date")
+    table = table[list(DECISION_COLUMNS)]
+
+    # 决策在下一个决策日之前一直有效；次日收益口径与 backtest_from_signals 相同
+    first, last = rows[0], rows[-1]
+    held = pd.Series(table["signal"].map(SIGNAL_VALUES).to_numpy(), index=table.index)
+    held = held.reindex(frame.index[first : last + 1]).ffill().fillna(0).astype(np.int8)
+    signals = np.zeros(last + 1, dtype=np.int8)
+    signals[first:] = held.to_numpy()
+    close = frame["Close"].to_numpy(dtype=float)[: last + 2]
+    result = backtest_from_signals(close, signals, warmup=first, index=frame.index[: last + 2])
+    return PipelineReplay(symbol, table, result)
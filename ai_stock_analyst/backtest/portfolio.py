@@ -0,0 +1,411 @@
+"""
+组合级多资产回测
+
+全部股票按日期并集对齐成 (dates × symbols) 面板，指标、信号、风险等级和候选打分都是整块数组运算；
+持仓股数、现金与逐股盈亏保存在以股票编号为下标的 NumPy 数组里，逐日循环内部只做向量操作。
+
+每日收盘执行顺序（与 StockAnalyzer → RiskManager → PortfolioManager 的流程对应）：
+1. 卖出信号清仓；风险等级升高后超出仓位上限的持仓减到上限
+2. 买入信号按预筛打分排序，在持仓数、仓位上限与现金约束下建仓
+   （风险闸门触发时 PortfolioManager 会把 BUY 降级为 HOLD，因此默认只在 LOW 时建仓）
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.features import PanelFeatures, calculate_panel_features
+
+from .engine import MIN_BARS, WARMUP_BARS, StrategyParams, max_drawdown, signal_panel
+from .metrics import ROLLING_WINDOWS, bootstrap_ci, performance_metrics, rolling_metrics
+
+logger = logging.getLogger(__name__)
+
+# RiskManager 的 max_position_size：LOW 10% / MEDIUM 5% / HIGH 2%
+RISK_POSITION_CAPS = np.array([0.10, 0.05, 0.02])
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+
+
+@dataclass(frozen=True)
+class PortfolioConfig:
+    initial_cash: float = 1_000_000.0
+    max_positions: int = 20
+    commission_bps: float = 5.0
+    # 持仓市值超过上限的 (1 + tolerance) 倍才减仓，避免每天来回微调
+    trim_tolerance: float = 0.25
+    # 与 PortfolioManager 一致：风险闸门触发时不新开仓
+    block_triggered_entries: bool = True
+    # 与 prefilter_universe 默认值一致的候选门槛
+    min_price: float = 3.0
+    min_dollar_volume: float = 20_000_000.0
+    params: StrategyParams = StrategyParams()
+    warmup: int = WARMUP_BARS
+
+
+@dataclass
+class PortfolioPanel:
+    """按日期并集对齐的面板；close 已前向填充用于估值，tradable 标记当日是否有真实成交价"""
+
+    symbols: List[str]
+    index: pd.DatetimeIndex
+    close: np.ndarray
+    tradable: np.ndarray
+    features: PanelFeatures
+    volume: np.ndarray
+
+
+@dataclass
+class PortfolioResult:
+    """逐日组合序列（对应 index）与逐股汇总（对应 symbols）"""
+
+    symbols: List[str]
+    index: pd.DatetimeIndex
+    equity: np.ndarray
+    cash: np.ndarray
+    exposure: np.ndarray
+    positions: np.ndarray
+    turnover: np.ndarray
+    benchmark: np.ndarray
+    trades: int
+    pnl: np.ndarray
+    shares: np.ndarray
+    config: PortfolioConfig = field(repr=False, default_factory=PortfolioConfig)
+
+    @property
+    def daily_returns(self) -> np.ndarray:
+        """逐日组合收益，首日相对初始资金"""
+        prev = np.concatenate([[self.config.initial_cash], self.equity[:-1]])
+        return self.equity / prev - 1
+
+    def metrics(self) -> Dict:
+        years = max(len(self.equity) / 252, 1e-9)
+        perf = performance_metrics(self.daily_returns)
+        return {
+            "symbols": len(self.symbols),
+            "days": len(self.equity),
+            "start": str(self.index[0].date()) if len(self.index) else "",
+            "end": str(self.index[-1].date()) if len(self.index) else "",
+            "final_equity": round(float(self.equity[-1]), 2),
+            "total_return_pct": round(float(self.equity[-1] / self.config.initial_cash - 1) * 100, 2),
+            "benchmark_return_pct": round(float(self.benchmark[-1] - 1) * 100, 2),
+            "max_drawdown_pct": round(max_drawdown(self.equity / self.config.initial_cash) * 100, 2),
+            "trades": self.trades,
+            "avg_positions": round(float(self.positions.mean()), 2),
+            "avg_exposure_pct": round(float(self.exposure.mean()) * 100, 2),
+            "annual_turnover": round(float(self.turnover.sum()) / years, 2),
+            "cagr_pct": round(float(perf["cagr"]) * 100, 2),
+            "volatility_pct": round(float(perf["volatility"]) * 100, 2),
+            "sharpe": round(float(perf["sharpe"]), 3),
+            "sortino": round(float(perf["sortino"]), 3),
+            "calmar": round(float(perf["calmar"]), 3),
+        }
+
+    def contributors(self, top: int = 10) -> List[Dict]:
+        """按累计盈亏排序的前/后各 top 只股票"""
+        order = np.argsort(-self.pnl)
+        picks = list(order[:top]) + [j for j in order[::-1][:top] if j not in order[:top]]
+        return [{"symbol": self.symbols[j], "pnl": round(float(self.pnl[j]), 2)} for j in picks if self.pnl[j] != 0]
+
+
+def build_portfolio_panel(histories: Mapping[str, pd.DataFrame]) -> PortfolioPanel:
+    """{symbol: OHLCV} 按日期并集对齐；上市前留 NaN，停牌缺口用上一收盘价填充"""
+    histories = {s: h for s, h in histories.items() if h is not None and len(h) >= MIN_BARS and "Close" in h}
+    symbols = list(histories)
+    # 日期并集与每只股票的行号都用 numpy 求，避免上千次 Index.union/reindex
+    dates = [pd.DatetimeIndex(h.index).values.astype("datetime64[D]") for h in histories.values()]
+    all_dates = np.unique(np.concatenate(dates)) if dates else np.array([], dtype="datetime64[D]")
+    rows = [np.searchsorted(all_dates, d) for d in dates]
+    index = pd.DatetimeIndex(all_dates.astype("datetime64[ns]"))
+
+    def field_panel(name: str) -> Optional[np.ndarray]:
+        if not all(name in h.columns for h in histories.values()):
+            return None
+        out = np.full((len(all_dates), len(symbols)), np.nan)
+        for j, h in enumerate(histories.values()):
+            column = h[name]
+            if not pd.api.types.is_numeric_dtype(column):
+                column = pd.to_numeric(column, errors="coerce")
+            out[rows[j], j] = column.to_numpy(dtype=float, na_value=np.nan)
+        return out
+
+    raw_close = field_panel("Close")
+    if raw_close is None:
+        raw_close = np.empty((0, 0))
+    close = pd.DataFrame(raw_close).ffill().to_numpy()
+    high, low, open_, volume = (field_panel(n) for n in ("High", "Low", "Open", "Volume"))
+    # 指标按前向填充后的价格计算，缺口日的 High/Low 用收盘价代替
+    if high is not None:
+        high = np.where(np.isnan(high), close, high)
+    if low is not None:
+        low = np.where(np.isnan(low), close, low)
+
+    features = calculate_panel_features(close, high=high, low=low, volume=volume, open_=open_, symbols=symbols)
+    features.index = index
+    return PortfolioPanel(
+        symbols=symbols,
+        index=index,
+        close=close,
+        tradable=~np.isnan(raw_close),
+        features=features,
+        volume=volume if volume is not None else np.full_like(close, np.nan),
+    )
+
+
+def discovery_scores(close: np.ndarray, volume: np.ndarray, min_price: float, min_dollar_volume: float) -> np.ndarray:
+    """prefilter_universe 打分公式的全序列版本，不满足价格/流动性门槛处为 NaN"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret20 = close / _shift(close, 20) - 1
+        ret5 = close / _shift(close, 5) - 1
+        daily = close / _shift(close, 1) - 1
+        dollar_volume = pd.DataFrame(close * volume).rolling(20, min_periods=1).mean().to_numpy()
+        vol20 = pd.DataFrame(daily).rolling(20).std().to_numpy() * 100
+
+    score = (
+        ret20 * 100 * 0.55
+        + ret5 * 100 * 0.25
+        + np.minimum(dollar_volume / 100_000_000, 10) * 0.20
+        - np.maximum(vol20 - 4.5, 0) * 0.6
+    )
+    eligible = (close >= min_price) & (dollar_volume >= min_dollar_volume) & np.isfinite(score)
+    return np.where(eligible, score, np.nan)
+
+
+def risk_levels(features: PanelFeatures, market: Optional[Mapping[str, pd.Series]] = None) -> np.ndarray:
+    """RiskManager 价格类闸门的面板版本：0=LOW, 1=MEDIUM, 2=HIGH（不含新闻/社媒触发项）"""
+    close = features.close
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change_pct = np.abs(close / _shift(close, 1) - 1) * 100
+    triggers = (
+        (np.round(features.atr_pct, 3) >= 4.0).astype(np.int8)
+        + (np.round(features.volatility_20d * 100, 3) >= 3.0)
+        + (np.nan_to_num(change_pct) >= 6.0)
+        + (features.data_quality < 0.7)
+    )
+    if market and features.index is not None:
+        triggers = triggers + _market_triggers(market, features.index)[:, None]
+    return np.where(triggers >= 3, 2, np.where(triggers >= 1, 1, 0)).astype(np.int8)
+
+
+def run_portfolio_backtest(
+    histories: Mapping[str, pd.DataFrame],
+    config: PortfolioConfig = PortfolioConfig(),
+    market: Optional[Mapping[str, pd.Series]] = None,
+    scores: Optional[np.ndarray] = None,
+) -> Optional[PortfolioResult]:
+    """组合回测；scores 可传入自定义的 (dates × symbols) 候选打分替代预筛公式。"""
+    panel = build_portfolio_panel(histories)
+    if not panel.symbols or len(panel.index) < config.warmup + 2:
+        return None
+
+    feats = panel.features
+    signals = signal_panel(feats, config.params)
+    levels = risk_levels(feats, market)
+    caps = RISK_POSITION_CAPS[levels]
+    if scores is None:
+        scores = discovery_scores(panel.close, panel.volume, config.min_price, config.min_dollar_volume)
+    entry_ok = (signals == 1) & panel.tradable & np.isfinite(scores)
+    if config.block_triggered_entries:
+        entry_ok &= levels == 0
+
+    return _simulate(panel, signals, caps, entry_ok, scores, config)
+
+
+def write_portfolio_reports(
+    result: PortfolioResult,
+    output_dir: Path,
+    timestamp: Optional[str] = None,
+    bootstrap: int = 0,
+) -> Path:
+    """写出 portfolio_<ts>.md（汇总与盈亏贡献）和 portfolio_<ts>.json（含逐日净值与滚动指标）；
+    bootstrap > 0 时附带该重采样次数的分块自助法 95% 置信区间。"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ts = timestamp or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    md_path = output_dir / f"portfolio_{ts}.md"
+    json_path = output_dir / f"portfolio_{ts}.json"
+    m = result.metrics()
+
+    lines = [
+        "# Portfolio Backtest Report",
+        "",
+        f"Generated at (UTC): {datetime.utcnow().isoformat()}",
+        "",
+        "| Metric | Value |",
+        "|---|---:|",
+        *[f"| {key} | {value} |" for key, value in m.items()],
+        "",
+        "## Contributors",
+        "",
+        "| Symbol | P&L |",
+        "|---|---:|",
+        *[f"| {c['symbol']} | {c['pnl']:.2f} |" for c in result.contributors()],
+    ]
+    returns = result.daily_returns
+    intervals = _round_intervals(bootstrap_ci(returns, n_resamples=bootstrap)) if bootstrap > 0 else {}
+    if intervals:
+        lines += [
+            "",
+            f"## Bootstrap 95% CI ({bootstrap} resamples)",
+            "",
+            "| Metric | Low | High |",
+            "|---|---:|---:|",
+            *[f"| {name} | {low} | {high} |" for name, (low, high) in intervals.items()],
+        ]
+    rolling = {
+        str(window): {
+            name: [None if np.isnan(v) else round(float(v), 4) for v in values]
+            for name, values in rolling_metrics(returns, window).items()
+        }
+        for window in ROLLING_WINDOWS
+    }
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    json_path.write_text(
+        json.dumps(
+            {
+                "metrics": m,
+                "config": {**asdict(result.config), "params": asdict(result.config.params)},
+                "contributors": result.contributors(),
+                "bootstrap_ci": intervals,
+                "rolling": rolling,
+                "dates": [str(d.date()) for d in result.index],
+                "equity": [round(float(v), 2) for v in result.equity],
+                "benchmark_curve": [round(float(v), 6) for v in result.benchmark],
+            },
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    return md_path
+
+
+def _round_intervals(intervals: Dict) -> Dict:
+    return {name: [round(low, 4), round(high, 4)] for name, (low, high) in intervals.items()}
+
+
+def _simulate(
+    panel: PortfolioPanel,
+    signals: np.ndarray,
+    caps: np.ndarray,
+    entry_ok: np.ndarray,
+    scores: np.ndarray,
+    config: PortfolioConfig,
+) -> PortfolioResult:
+    n_days, n_symbols = panel.close.shape
+    fee = config.commission_bps / 10_000
+    price_panel = np.nan_to_num(panel.close)
+
+    shares = np.zeros(n_symbols)
+    pnl = np.zeros(n_symbols)
+    cash = float(config.initial_cash)
+    trades = 0
+
+    days = range(config.warmup, n_days)
+    equity_out = np.empty(len(days))
+    cash_out = np.empty(len(days))
+    exposure_out = np.empty(len(days))
+    positions_out = np.empty(len(days), dtype=int)
+    turnover_out = np.empty(len(days))
+
+    prev_price = price_panel[config.warmup]
+    for k, t in enumerate(days):
+        price = price_panel[t]
+        tradable = panel.tradable[t]
+        pnl += shares * (price - prev_price)
+        prev_price = price
+
+        value = shares * price
+        equity = cash + value.sum()
+        limit = caps[t] * equity
+
+        # 1) 卖出信号清仓，超限持仓减到上限
+        held = shares > 0
+        exit_mask = held & tradable & (signals[t] == -1)
+        trim_mask = held & tradable & ~exit_mask & (value > limit * (1 + config.trim_tolerance))
+        sell_value = np.where(exit_mask, value, np.where(trim_mask, value - limit, 0.0))
+        sold = sell_value.sum()
+        if sold:
+            shares -= np.divide(sell_value, price, out=np.zeros(n_symbols), where=price > 0)
+            shares[exit_mask] = 0.0
+            pnl -= sell_value * fee
+            cash += sold * (1 - fee)
+            trades += int(exit_mask.sum() + trim_mask.sum())
+
+        # 2) 按打分建仓：持仓数、仓位上限与现金都满足才买入
+        bought = 0.0
+        slots = config.max_positions - int(np.count_nonzero(shares))
+        candidates = np.flatnonzero(entry_ok[t] & (shares == 0))
+        if slots > 0 and candidates.size and cash > 0:
+            if candidates.size > slots:
+                top = np.argpartition(-scores[t, candidates], slots - 1)[:slots]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[t, candidates], kind="stable")]
+            target = limit[candidates]
+            affordable = np.cumsum(target * (1 + fee)) <= cash
+            candidates, target = candidates[affordable], target[affordable]
+            if candidates.size:
+                shares[candidates] = target / price[candidates]
+                bought = float(target.sum())
+                pnl[candidates] -= target * fee
+                cash -= bought * (1 + fee)
+                trades += int(candidates.size)
+
+        value_after = shares * price
+        equity_out[k] = cash + value_after.sum()
+        cash_out[k] = cash
+        exposure_out[k] = value_after.sum() / equity_out[k] if equity_out[k] > 0 else 0.0
+        positions_out[k] = int(np.count_nonzero(shares))
+        turnover_out[k] = (sold + bought) / equity if equity > 0 else 0.0
+
+    return PortfolioResult(
+        symbols=panel.symbols,
+        index=panel.index[config.warmup :],
+        equity=equity_out,
+        cash=cash_out,
+        exposure=exposure_out,
+        positions=positions_out,
+        turnover=turnover_out,
+        benchmark=_equal_weight_curve(panel.close[config.warmup :], panel.tradable[config.warmup :]),
+        trades=trades,
+        pnl=pnl,
+        shares=shares,
+        config=config,
+    )
+
+
+def _equal_weight_curve(close: np.ndarray, tradable: np.ndarray) -> np.ndarray:
+    """每日等权持有全部可交易股票的净值"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = close[1:] / close[:-1] - 1
+    daily = np.where(tradable[1:] & tradable[:-1], daily, np.nan)
+    valid = np.isfinite(daily)
+    mean = np.divide(np.where(valid, daily, 0).sum(axis=1), valid.sum(axis=1), out=np.zeros(len(daily)), where=valid.any(axis=1))
+    return np.concatenate([[1.0], np.cumprod(1 + mean)])
+
+
+def _market_triggers(market: Mapping[str, pd.Series], index: pd.DatetimeIndex) -> np.ndarray:
+    """summarize_market_context 中 QQQ/VIX 风险状态的逐日版本，返回每日触发数"""
+    out = np.zeros(len(index), dtype=np.int8)
+    qqq = market.get("QQQ")
+    if qqq is not None and len(qqq):
+        qqq = pd.to_numeric(qqq, errors="coerce").reindex(index).ffill()
+        ma20 = qqq.rolling(20).mean()
+        ret5 = (qqq / qqq.shift(5) - 1) * 100
+        out += ((qqq < ma20) | (ret5 < -1)).to_numpy(dtype=np.int8)
+    vix = market.get("^VIX")
+    if vix is not None and len(vix):
+        vix = pd.to_numeric(vix, errors="coerce").reindex(index).ffill()
+        out += (vix >= 20).to_numpy(dtype=np.int8)
+    return out
+
+
+def _shift(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[n:] = x[:-n]
+    return out
@@ -0,0 +1,63 @@
+"""
+回测报告输出
+
+Markdown 与 JSON 报告逐条追加写入，多股票回测时结果一完成就落盘。
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .engine import BacktestMetrics
+
+
+class BacktestReportWriter:
+    """流式写出 backtest_<ts>.md / backtest_<ts>.json"""
+
+    def __init__(self, output_dir: Path, timestamp: Optional[str] = None):
+        output_dir.mkdir(parents=True, exist_ok=True)
+        ts = timestamp or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        self.md_path = output_dir / f"backtest_{ts}.md"
+        self.json_path = output_dir / f"backtest_{ts}.json"
+        self.count = 0
+        self._md = open(self.md_path, "w", encoding="utf-8")
+        self._json = open(self.json_path, "w", encoding="utf-8")
+        self._md.write(
+            "\n".join(
+                [
+                    "# Backtest Report",
+                    "",
+                    f"Generated at (UTC): {datetime.utcnow().isoformat()}",
+                    "",
+                    "| Symbol | Strategy Return | Benchmark Return | Max Drawdown | Trades | Hit Rate |",
+                    "|---|---:|---:|---:|---:|---:|",
+                ]
+            )
+        )
+        self._json.write("[")
+
+    def add(self, m: BacktestMetrics) -> None:
+        self._md.write(
+            f"\n| {m.symbol} | {m.total_return_pct:.2f}% | {m.benchmark_return_pct:.2f}% | "
+            f"{m.max_drawdown_pct:.2f}% | {m.trades} | {m.hit_rate_pct:.2f}% |"
+        )
+        entry = json.dumps(m.__dict__, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self._json.write(("," if self.count else "") + "\n  " + entry)
+        self._md.flush()
+        self._json.flush()
+        self.count += 1
+
+    def close(self) -> Path:
+        if not self._json.closed:
+            self._json.write("\n]" if self.count else "]")
+            self._json.close()
+            self._md.close()
+        return self.md_path
+
+    def __enter__(self) -> "BacktestReportWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
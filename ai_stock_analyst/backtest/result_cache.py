@@ -0,0 +1,223 @@
+"""
+回测结果缓存
+
+键由三部分组成：输入K线的内容哈希、策略参数、回测代码版本（相关源码文件的哈希），
+任一部分变化都会得到新键，不需要手动失效。每个条目是一个 .npz 文件：
+- backtest：单只股票完整回测的逐日信号/收益序列（净值曲线由此重建）
+- sweep：单只股票的参数扫描单元表，按参数组合逐行累积，改动一个参数只补算新增的组合
+命中时更新文件 mtime，按最久未使用/总大小淘汰。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.config import get_cache_dir
+from ai_stock_analyst.data.bar_store import FIELDS
+
+from .engine import WARMUP_BARS, BacktestResult, StrategyParams, run_vectorized_backtest
+
+logger = logging.getLogger(__name__)
+
+_META_KEY = "__meta__"
+
+
+def frame_hash(frame: pd.DataFrame) -> str:
+    """OHLCV 内容哈希（日期 + 各字段数值）；全为 NaN 的字段视同缺失，共享内存还原的K线与原始K线哈希相同"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.DatetimeIndex(frame.index).values.astype("datetime64[D]").astype(np.int64).tobytes())
+    for field in FIELDS:
+        if field not in frame.columns:
+            continue
+        values = np.ascontiguousarray(frame[field].to_numpy(dtype=float, na_value=np.nan))
+        if np.isnan(values).all():
+            continue
+        digest.update(field.encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+_code_version: Optional[str] = None
+
+
+def code_version() -> str:
+    """回测相关源码的哈希：指标、信号、扫描逻辑改动后旧缓存自动失效"""
+    global _code_version
+    if _code_version is None:
+        from ai_stock_analyst.data import features
+
+        from . import engine, metrics, sweep
+
+        digest = hashlib.blake2b(digest_size=8)
+        for module in (features, engine, metrics, sweep):
+            digest.update(Path(module.__file__).read_bytes())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+class BacktestResultCache:
+    """基于文件的回测结果缓存"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root) if root else get_cache_dir("backtests")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    def __getstate__(self) -> Dict:
+        # 传给进程池子进程时只带目录，子进程从零计数，由父进程用 merge_counters 汇总
+        return {"root": str(self.root)}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state["root"])
+
+    def counters(self) -> Dict[str, int]:
+        """本实例的命中/未命中/写入计数"""
+        with self._lock:
+            return dict(self._stats)
+
+    def merge_counters(self, counters: Dict[str, int]) -> None:
+        """累加子进程中缓存副本的计数"""
+        with self._lock:
+            for key, value in counters.items():
+                self._stats[key] += value
+
+    def key(self, kind: str, data_hash: str, **params) -> str:
+        payload = json.dumps({"kind": kind, "data": data_hash, "code": code_version(), **params}, sort_keys=True)
+        return f"{kind}-{hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files if name != _META_KEY}
+        except (FileNotFoundError, OSError, ValueError):
+            self._count("misses")
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return arrays
+
+    def put(self, key: str, arrays: Dict[str, np.ndarray], meta: Optional[Dict] = None) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as fh:
+                meta_json = json.dumps({"created_at": time.time(), **(meta or {})}, ensure_ascii=False)
+                np.savez(fh, **arrays, **{_META_KEY: np.array(meta_json)})
+            os.replace(tmp, path)
+            self._count("writes")
+        except OSError as e:
+            logger.warning(f"Backtest cache write failed for {key}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def entries(self) -> List[Dict]:
+        """全部条目（含 meta），按最近使用时间倒序"""
+        out = []
+        for path in self.root.glob("*.npz"):
+            try:
+                stat = path.stat()
+                with np.load(path, allow_pickle=False) as data:
+                    meta = json.loads(str(data[_META_KEY])) if _META_KEY in data.files else {}
+            except (OSError, ValueError):
+                continue
+            out.append({"key": path.stem, "bytes": stat.st_size, "last_used": stat.st_mtime, **meta})
+        return sorted(out, key=lambda e: e["last_used"], reverse=True)
+
+    def stats(self) -> Dict[str, float]:
+        files = list(self.root.glob("*.npz"))
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["entries"] = len(files)
+        stats["bytes"] = sum(p.stat().st_size for p in files if p.exists())
+        return stats
+
+    def evict(self, max_age_days: Optional[float] = None, max_bytes: Optional[int] = None) -> int:
+        """删除超过 max_age_days 未使用的条目，再按最久未使用删到总大小不超过 max_bytes；返回删除数"""
+        files = sorted(((p.stat().st_mtime, p.stat().st_size, p) for p in self.root.glob("*.npz")), reverse=True)
+        removed = 0
+        keep_bytes = 0
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        for mtime, size, path in files:
+            too_old = cutoff is not None and mtime < cutoff
+            too_big = max_bytes is not None and keep_bytes + size > max_bytes
+            if too_old or too_big:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                keep_bytes += size
+        return removed
+
+    def clear(self) -> int:
+        return self.evict(max_bytes=0)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+def cached_backtest(
+    symbol: str,
+    frame: pd.DataFrame,
+    params: StrategyParams = StrategyParams(),
+    warmup: int = WARMUP_BARS,
+    cache: Optional[BacktestResultCache] = None,
+) -> Optional[BacktestResult]:
+    """run_vectorized_backtest 的缓存版本；cache 为 None 时直接计算"""
+    if cache is None:
+        return run_vectorized_backtest(frame, params=params, warmup=warmup)
+
+    key = cache.key("backtest", frame_hash(frame), params=asdict(params), warmup=warmup)
+    hit = cache.get(key)
+    if hit is not None:
+        return BacktestResult(
+            index=pd.DatetimeIndex(hit["dates"].astype("datetime64[D]")),
+            signals=hit["signals"],
+            strategy_returns=hit["strategy_returns"],
+            benchmark_returns=hit["benchmark_returns"],
+        )
+
+    result = run_vectorized_backtest(frame, params=params, warmup=warmup)
+    if result is None:
+        return None
+    cache.put(
+        key,
+        {
+            "dates": pd.DatetimeIndex(result.index).values.astype("datetime64[D]").astype(np.int64),
+            "signals": result.signals,
+            "strategy_returns": result.strategy_returns,
+            "benchmark_returns": result.benchmark_returns,
+        },
+        {"kind": "backtest", "symbol": symbol, "params": asdict(params), "bars": len(frame)},
+    )
+    return result
+
+
+# 全局实例（延迟初始化）
+_backtest_cache = None
+
+
+def get_backtest_cache() -> BacktestResultCache:
+    """获取回测结果缓存实例（单例）"""
+    global _backtest_cache
+    if _backtest_cache is None:
+        _backtest_cache = BacktestResultCache()
+    return _backtest_cache
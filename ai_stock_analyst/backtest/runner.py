@@ -0,0 +1,161 @@
+"""
+多股票并行回测
+
+先一次性批量加载全部K线，打包进一块共享内存；子进程按偏移量直接映射数组，
+不再序列化 DataFrame。结果按完成顺序回调，便于流式写报告。
+"""
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.bar_store import FIELDS, get_bar_store
+
+from .engine import MIN_BARS, BacktestMetrics, StrategyParams
+from .result_cache import BacktestResultCache, cached_backtest
+
+logger = logging.getLogger(__name__)
+
+# 每个子任务处理的股票数，摊薄进程间调度开销
+TASK_BATCH = 8
+
+
+@dataclass(frozen=True)
+class PackedPanel:
+    """共享内存中的 (fields × total_bars) 数组及每只股票的 [start, end) 区间"""
+
+    name: str
+    total_bars: int
+    spans: Dict[str, Tuple[int, int]]
+
+
+def empty_metrics(symbol: str) -> BacktestMetrics:
+    return BacktestMetrics(symbol, 0.0, 0.0, 0.0, 0, 0.0)
+
+
+def backtest_frame(
+    symbol: str,
+    frame: pd.DataFrame,
+    params: StrategyParams = StrategyParams(),
+    cache: Optional[BacktestResultCache] = None,
+) -> BacktestMetrics:
+    """单只股票回测（数据不足时返回全零指标）"""
+    if frame is None or len(frame) < MIN_BARS:
+        return empty_metrics(symbol)
+    result = cached_backtest(symbol, frame, params=params, cache=cache)
+    return result.metrics(symbol) if result is not None else empty_metrics(symbol)
+
+
+def run_backtests(
+    symbols: List[str],
+    period: str = "2y",
+    workers: Optional[int] = None,
+    params: StrategyParams = StrategyParams(),
+    on_result: Optional[Callable[[BacktestMetrics], None]] = None,
+    histories: Optional[Dict[str, pd.DataFrame]] = None,
+    cache: Optional[BacktestResultCache] = None,
+) -> List[BacktestMetrics]:
+    """批量加载后并行回测，返回顺序与 symbols 一致；on_result 按完成顺序调用。"""
+    symbols = list(dict.fromkeys(symbols))
+    if histories is None:
+        histories = get_bar_store().load(symbols, period=period)
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    results: Dict[str, BacktestMetrics] = {}
+
+    def emit(metrics: BacktestMetrics) -> None:
+        results[metrics.symbol] = metrics
+        if on_result:
+            on_result(metrics)
+
+    runnable = [s for s in symbols if s in histories and len(histories[s]) >= MIN_BARS]
+    for symbol in symbols:
+        if symbol not in runnable:
+            emit(empty_metrics(symbol))
+
+    if workers == 1 or len(runnable) <= 1:
+        for symbol in runnable:
+            emit(backtest_frame(symbol, histories[symbol], params, cache))
+        return [results[s] for s in symbols]
+
+    shm, panel = pack_histories({s: histories[s] for s in runnable})
+    try:
+        batches = [runnable[i : i + TASK_BATCH] for i in range(0, len(runnable), TASK_BATCH)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            futures = {pool.submit(_run_packed_batch, panel, batch, params, cache): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    batch_results, counters = future.result()
+                except Exception as e:
+                    logger.warning(f"Backtest batch {futures[future]} failed: {e}")
+                    batch_results, counters = [empty_metrics(s) for s in futures[future]], None
+                if cache is not None and counters:
+                    cache.merge_counters(counters)
+                for metrics in batch_results:
+                    emit(metrics)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return [results[s] for s in symbols]
+
+
+def pack_histories(histories: Dict[str, pd.DataFrame]) -> Tuple[shared_memory.SharedMemory, PackedPanel]:
+    """把 OHLCV 首尾拼接写入共享内存，调用方负责 close/unlink。"""
+    spans: Dict[str, Tuple[int, int]] = {}
+    cursor = 0
+    for symbol, frame in histories.items():
+        spans[symbol] = (cursor, cursor + len(frame))
+        cursor += len(frame)
+
+    shape = (len(FIELDS) + 1, max(cursor, 1))
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    for symbol, frame in histories.items():
+        start, end = spans[symbol]
+        for row, field in enumerate(FIELDS):
+            if field in frame.columns:
+                data[row, start:end] = pd.to_numeric(frame[field], errors="coerce").to_numpy(dtype=float)
+            else:
+                data[row, start:end] = np.nan
+        # 最后一行存日期（datetime64[D] 的整数值），报告与逐日序列需要时可还原
+        data[-1, start:end] = pd.DatetimeIndex(frame.index).values.astype("datetime64[D]").astype(np.int64)
+    del data
+    return shm, PackedPanel(name=shm.name, total_bars=shape[1], spans=spans)
+
+
+def unpack_frame(data: np.ndarray, span: Tuple[int, int]) -> pd.DataFrame:
+    start, end = span
+    index = pd.DatetimeIndex(data[-1, start:end].astype(np.int64).astype("datetime64[D]"))
+    return pd.DataFrame({field: data[row, start:end] for row, field in enumerate(FIELDS)}, index=index)
+
+
+def attach_panel(panel: PackedPanel) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    """子进程映射父进程创建的共享内存（只读使用，由父进程负责 unlink）"""
+    # 进程池子进程与父进程共用同一个 resource tracker，重复注册无副作用
+    shm = shared_memory.SharedMemory(name=panel.name)
+    data = np.ndarray((len(FIELDS) + 1, panel.total_bars), dtype=np.float64, buffer=shm.buf)
+    return shm, data
+
+
+def _run_packed_batch(
+    panel: PackedPanel,
+    symbols: List[str],
+    params: StrategyParams,
+    cache: Optional[BacktestResultCache] = None,
+) -> Tuple[List[BacktestMetrics], Optional[Dict[str, int]]]:
+    """子进程执行一批回测，连同本批的缓存计数一起返回（子进程内的计数不会自动回到父进程）"""
+    shm, data = attach_panel(panel)
+    try:
+        metrics = [backtest_frame(symbol, unpack_frame(data, panel.spans[symbol]), params, cache) for symbol in symbols]
+        return metrics, cache.counters() if cache is not None else None
+    finally:
+        del data
+        shm.close()
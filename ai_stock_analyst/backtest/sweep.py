@@ -0,0 +1,264 @@
+"""
+策略阈值参数扫描
+
+每只股票的指标序列只计算一次；全部参数组合的阈值作为 (组合数 × 1) 的列向量，
+与 (1 × 天数) 的指标行广播，一次得到 (组合数 × 天数) 的信号矩阵，
+净值、回撤、交易次数按行累计求得，不再逐组合重跑回测。
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .engine import MIN_BARS, WARMUP_BARS, StrategyParams, evaluate_signals, frame_features, signal_inputs
+from .metrics import performance_metrics
+
+if TYPE_CHECKING:
+    from .result_cache import BacktestResultCache
+
+logger = logging.getLogger(__name__)
+
+SWEEP_PARAMS = tuple(f.name for f in fields(StrategyParams))
+RANK_KEYS = (
+    "mean_return_pct",
+    "median_return_pct",
+    "mean_max_drawdown_pct",
+    "hit_rate_pct",
+    "mean_sharpe",
+    "mean_sortino",
+    "mean_calmar",
+)
+
+# 单次广播的最大组合数，限制 (组合数 × 天数) 矩阵的内存占用
+COMBO_CHUNK = 512
+
+
+@dataclass
+class SweepRow:
+    """一个参数组合在全部股票上的汇总"""
+
+    params: StrategyParams
+    symbols: int
+    mean_return_pct: float
+    median_return_pct: float
+    mean_benchmark_pct: float
+    mean_max_drawdown_pct: float
+    worst_drawdown_pct: float
+    trades: int
+    hit_rate_pct: float
+    mean_sharpe: float = 0.0
+    mean_sortino: float = 0.0
+    mean_calmar: float = 0.0
+    mean_exposure_pct: float = 0.0
+    mean_turnover: float = 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.update(data.pop("params"))
+        return data
+
+
+def expand_grid(grid: Mapping[str, Sequence[float]], base: StrategyParams = StrategyParams()) -> List[StrategyParams]:
+    """笛卡尔积展开参数网格；未给出的参数沿用 base。"""
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)} (expected {SWEEP_PARAMS})")
+    names = [name for name in SWEEP_PARAMS if grid.get(name)]
+    values = [sorted({float(v) for v in grid[name]}) for name in names]
+    return [replace(base, **dict(zip(names, combo))) for combo in itertools.product(*values)]
+
+
+def sweep_symbol(
+    frame: pd.DataFrame,
+    combos: Sequence[StrategyParams],
+    warmup: int = WARMUP_BARS,
+    cache: Optional["BacktestResultCache"] = None,
+    symbol: str = "",
+) -> Optional[Dict[str, np.ndarray]]:
+    """单只股票在全部组合上的回测指标（每个数组长度为组合数）；数据不足时返回 None。
+
+    取整口径与 BacktestResult.metrics 一致，任一行都等于对应参数的 run_vectorized_backtest。
+    给出 cache 时只计算缓存中没有的组合。
+    """
+    if frame is None or frame.empty or len(frame) < warmup + 2 or not combos:
+        return None
+    if cache is not None:
+        return _cached_sweep_cells(frame, combos, warmup, cache, symbol)
+    return _sweep_cells(frame, combos, warmup)
+
+
+def _sweep_cells(frame: pd.DataFrame, combos: Sequence[StrategyParams], warmup: int) -> Dict[str, np.ndarray]:
+    inputs = sweep_inputs(frame)
+    close = frame["Close"].to_numpy(dtype=float)
+    next_ret = close[warmup + 1 :] / close[warmup:-1] - 1
+
+    parts = [
+        _score_signals(combo_signals(inputs, combos[start : start + COMBO_CHUNK], warmup), next_ret)
+        for start in range(0, len(combos), COMBO_CHUNK)
+    ]
+
+    out = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    benchmark = np.cumprod(1 + next_ret)[-1] - 1
+    out["benchmark_pct"] = np.full(len(combos), round(float(benchmark) * 100, 2))
+    return out
+
+
+def _cached_sweep_cells(
+    frame: pd.DataFrame,
+    combos: Sequence[StrategyParams],
+    warmup: int,
+    cache: "BacktestResultCache",
+    symbol: str,
+) -> Dict[str, np.ndarray]:
+    """每只股票一张单元表（参数组合 × 指标），新组合算完后并入同一条目"""
+    from .result_cache import frame_hash
+
+    key = cache.key("sweep", frame_hash(frame), warmup=warmup)
+    table = cache.get(key) or {"params": np.empty((0, len(SWEEP_PARAMS)))}
+    known = {tuple(float(v) for v in row): i for i, row in enumerate(table["params"])}
+
+    wanted = [tuple(float(getattr(p, name)) for name in SWEEP_PARAMS) for p in combos]
+    missing = list(dict.fromkeys(w for w in wanted if w not in known))
+    if missing:
+        fresh = _sweep_cells(frame, [StrategyParams(**dict(zip(SWEEP_PARAMS, w))) for w in missing], warmup)
+        fresh["params"] = np.array(missing, dtype=float)
+        table = {k: np.concatenate([table[k], fresh[k]]) if k in table else fresh[k] for k in fresh}
+        for w in missing:
+            known[w] = len(known)
+        cache.put(key, table, {"kind": "sweep", "symbol": symbol, "cells": len(known), "bars": len(frame)})
+
+    rows = [known[w] for w in wanted]
+    return {k: v[rows] for k, v in table.items() if k != "params"}
+
+
+def sweep_inputs(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """单只股票的信号输入，整理成 (1 × 天数) 的行向量以便与参数列向量广播"""
+    return {key: value[:, 0][None, :] for key, value in signal_inputs(frame_features(frame)).items()}
+
+
+def combo_signals(
+    inputs: Dict[str, np.ndarray],
+    combos: Sequence[StrategyParams],
+    warmup: int = WARMUP_BARS,
+) -> np.ndarray:
+    """(组合数 × 决策日数) 的信号矩阵，第 k 列对应第 warmup+k 根K线收盘时的决策"""
+    thresholds = {name: np.array([getattr(p, name) for p in combos])[:, None] for name in SWEEP_PARAMS}
+    return evaluate_signals(inputs, **thresholds)[:, warmup:-1]
+
+
+def run_sweep(
+    histories: Mapping[str, pd.DataFrame],
+    combos: Sequence[StrategyParams],
+    rank_by: str = "mean_return_pct",
+    warmup: int = WARMUP_BARS,
+    cache: Optional["BacktestResultCache"] = None,
+) -> List[SweepRow]:
+    """对全部股票扫描参数组合，按 rank_by 从高到低排序（并列时保持组合顺序）。"""
+    if rank_by not in RANK_KEYS:
+        raise ValueError(f"Unknown rank key: {rank_by} (expected one of {RANK_KEYS})")
+
+    per_symbol = []
+    for symbol, frame in histories.items():
+        if frame is None or len(frame) < MIN_BARS:
+            logger.info(f"Sweep skipped {symbol}: not enough bars")
+            continue
+        scored = sweep_symbol(frame, combos, warmup=warmup, cache=cache, symbol=symbol)
+        if scored is not None:
+            per_symbol.append(scored)
+    if not per_symbol:
+        return []
+
+    stacked = {key: np.stack([s[key] for s in per_symbol]) for key in per_symbol[0]}
+    trades = stacked["trades"].sum(axis=0)
+    wins = stacked["wins"].sum(axis=0)
+    hit_rate = np.divide(wins * 100.0, trades, out=np.zeros(len(combos)), where=trades > 0)
+
+    rows = [
+        SweepRow(
+            params=params,
+            symbols=len(per_symbol),
+            mean_return_pct=round(float(stacked["return_pct"][:, i].mean()), 2),
+            median_return_pct=round(float(np.median(stacked["return_pct"][:, i])), 2),
+            mean_benchmark_pct=round(float(stacked["benchmark_pct"][:, i].mean()), 2),
+            mean_max_drawdown_pct=round(float(stacked["max_drawdown_pct"][:, i].mean()), 2),
+            worst_drawdown_pct=round(float(stacked["max_drawdown_pct"][:, i].min()), 2),
+            trades=int(trades[i]),
+            hit_rate_pct=round(float(hit_rate[i]), 2),
+            mean_sharpe=round(float(stacked["sharpe"][:, i].mean()), 3),
+            mean_sortino=round(float(stacked["sortino"][:, i].mean()), 3),
+            mean_calmar=round(float(stacked["calmar"][:, i].mean()), 3),
+            mean_exposure_pct=round(float(stacked["exposure_pct"][:, i].mean()), 2),
+            mean_turnover=round(float(stacked["turnover"][:, i].mean()), 2),
+        )
+        for i, params in enumerate(combos)
+    ]
+    return sorted(rows, key=lambda row: getattr(row, rank_by), reverse=True)
+
+
+def write_sweep_reports(
+    rows: List[SweepRow],
+    output_dir: Path,
+    rank_by: str = "mean_return_pct",
+    timestamp: Optional[str] = None,
+) -> Tuple[Path, Path]:
+    """写出 sweep_<ts>.md / sweep_<ts>.json（按排名顺序）"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ts = timestamp or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    md_path = output_dir / f"sweep_{ts}.md"
+    json_path = output_dir / f"sweep_{ts}.json"
+
+    lines = [
+        "# Parameter Sweep Report",
+        "",
+        f"Generated at (UTC): {datetime.utcnow().isoformat()}",
+        f"Ranked by: {rank_by}",
+        "",
+        "| Rank | RSI Buy Max | RSI Sell Min | ATR% Max | Vol% Max | Mean Return | Median Return | "
+        "Benchmark | Mean MDD | Worst MDD | Trades | Hit Rate | Sharpe | Sortino | Calmar |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for rank, row in enumerate(rows, 1):
+        p = row.params
+        lines.append(
+            f"| {rank} | {p.rsi_buy_max:g} | {p.rsi_sell_min:g} | {p.atr_pct_max:g} | {p.volatility_max:g} | "
+            f"{row.mean_return_pct:.2f}% | {row.median_return_pct:.2f}% | {row.mean_benchmark_pct:.2f}% | "
+            f"{row.mean_max_drawdown_pct:.2f}% | {row.worst_drawdown_pct:.2f}% | {row.trades} | "
+            f"{row.hit_rate_pct:.2f}% | {row.mean_sharpe:.2f} | {row.mean_sortino:.2f} | {row.mean_calmar:.2f} |"
+        )
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    json_path.write_text(
+        json.dumps([{"rank": rank, **row.to_dict()} for rank, row in enumerate(rows, 1)], ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    return md_path, json_path
+
+
+def _score_signals(signals: np.ndarray, next_ret: np.ndarray) -> Dict[str, np.ndarray]:
+    """(组合数 × 天数) 信号矩阵的逐行回测指标"""
+    strategy_returns = signals * next_ret
+    perf = performance_metrics(strategy_returns, signals)
+    active = signals != 0
+    return {
+        "return_pct": _round_pct(perf["total_return"]),
+        "max_drawdown_pct": _round_pct(perf["max_drawdown"]),
+        "trades": active.sum(axis=1),
+        "wins": (active & (strategy_returns > 0)).sum(axis=1),
+        "sharpe": perf["sharpe"],
+        "sortino": perf["sortino"],
+        "calmar": perf["calmar"],
+        "exposure_pct": perf["exposure"] * 100,
+        "turnover": perf["turnover"],
+    }
+
+
+def _round_pct(values: np.ndarray) -> np.ndarray:
+    # 逐个用内置 round，与 BacktestMetrics 的取整结果逐位一致
+    return np.array([round(float(v) * 100, 2) for v in values])
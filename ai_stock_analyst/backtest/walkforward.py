@@ -0,0 +1,239 @@
+"""
+滚动样本外（Walk-forward）评估
+
+指标只因果地依赖过去的K线，因此每只股票在完整历史上计算一次即可供所有窗口复用；
+全部参数组合的逐日策略收益只求一次，再做对数收益/收益平方的前缀和，
+任意训练窗口的样本内得分都是两次前缀和相减，几百个折叠也不会重复计算共享历史。
+每个测试窗口使用上一训练窗口选出的参数，拼接成样本外净值曲线。
+"""
+from __future__ import annotations
+
+import json
+import logging
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .engine import MIN_BARS, WARMUP_BARS, BacktestMetrics, BacktestResult, StrategyParams
+from .metrics import bootstrap_ci
+from .sweep import COMBO_CHUNK, combo_signals, sweep_inputs
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVES = ("return", "sharpe")
+
+
+@dataclass(frozen=True)
+class WalkForwardConfig:
+    """窗口长度以决策日计；anchored=True 时训练窗口从头累积（扩张窗口）"""
+
+    train_bars: int = 252
+    test_bars: int = 63
+    anchored: bool = False
+    objective: str = "return"
+
+    def __post_init__(self):
+        if self.train_bars < 2 or self.test_bars < 1:
+            raise ValueError("train_bars must be >= 2 and test_bars >= 1")
+        if self.objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {self.objective} (expected one of {OBJECTIVES})")
+
+
+@dataclass
+class Fold:
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+    params: StrategyParams
+    in_sample_pct: float
+    out_of_sample_pct: float
+
+
+@dataclass
+class WalkForwardResult:
+    """拼接后的样本外序列；result 的逐日字段与 BacktestResult 相同"""
+
+    symbol: str
+    result: BacktestResult
+    folds: List[Fold] = field(default_factory=list)
+
+    def metrics(self) -> BacktestMetrics:
+        return self.result.metrics(self.symbol)
+
+    def summary(self) -> Dict:
+        chosen = Counter(f.params for f in self.folds).most_common(1)
+        return {
+            **asdict(self.metrics()),
+            **self.result.performance(),
+            "folds": len(self.folds),
+            "mean_in_sample_pct": round(float(np.mean([f.in_sample_pct for f in self.folds])), 2),
+            "mean_out_of_sample_pct": round(float(np.mean([f.out_of_sample_pct for f in self.folds])), 2),
+            "most_chosen_params": asdict(chosen[0][0]) if chosen else None,
+        }
+
+
+def fold_windows(n_steps: int, config: WalkForwardConfig) -> np.ndarray:
+    """(折叠数 × 4) 的 [train_start, train_end, test_start, test_end)；测试窗口首尾相接，最后一个可以不满"""
+    test_starts = np.arange(config.train_bars, n_steps, config.test_bars)
+    test_ends = np.minimum(test_starts + config.test_bars, n_steps)
+    train_starts = np.zeros_like(test_starts) if config.anchored else test_starts - config.train_bars
+    return np.stack([train_starts, test_starts, test_starts, test_ends], axis=1).reshape(-1, 4)
+
+
+def walk_forward(
+    symbol: str,
+    frame: pd.DataFrame,
+    combos: Sequence[StrategyParams],
+    config: WalkForwardConfig = WalkForwardConfig(),
+    warmup: int = WARMUP_BARS,
+) -> Optional[WalkForwardResult]:
+    """单只股票的滚动样本外回测；历史不足一个训练窗口加一个测试窗口时返回 None。"""
+    if frame is None or len(frame) < warmup + config.train_bars + 2 or not combos:
+        return None
+
+    close = frame["Close"].to_numpy(dtype=float)
+    next_ret = close[warmup + 1 :] / close[warmup:-1] - 1
+    inputs = sweep_inputs(frame)
+    signals = np.concatenate(
+        [combo_signals(inputs, combos[start : start + COMBO_CHUNK], warmup) for start in range(0, len(combos), COMBO_CHUNK)]
+    )
+    returns = signals * next_ret
+
+    windows = fold_windows(len(next_ret), config)
+    if not len(windows):
+        return None
+
+    log_prefix = _prefix(np.log1p(np.maximum(returns, -0.999999)))
+    scores = _window_scores(returns, log_prefix, windows[:, 0], windows[:, 1], config.objective)
+    best = np.argmax(scores, axis=0)
+
+    first, last = int(windows[0, 2]), int(windows[-1, 3])
+    lengths = windows[:, 3] - windows[:, 2]
+    choice = np.repeat(best, lengths)
+    cols = np.arange(first, last)
+
+    in_sample = np.expm1(log_prefix[best, windows[:, 1]] - log_prefix[best, windows[:, 0]])
+    out_sample = np.expm1(log_prefix[best, windows[:, 3]] - log_prefix[best, windows[:, 2]])
+    folds = [
+        Fold(
+            train_start=int(w[0]),
+            train_end=int(w[1]),
+            test_start=int(w[2]),
+            test_end=int(w[3]),
+            params=combos[int(b)],
+            in_sample_pct=round(float(i) * 100, 2),
+            out_of_sample_pct=round(float(o) * 100, 2),
+        )
+        for w, b, i, o in zip(windows, best, in_sample, out_sample)
+    ]
+
+    index = frame.index[warmup + first : warmup + last]
+    result = BacktestResult(
+        index=index,
+        signals=signals[choice, cols],
+        strategy_returns=returns[choice, cols],
+        benchmark_returns=next_ret[first:last],
+    )
+    return WalkForwardResult(symbol=symbol, result=result, folds=folds)
+
+
+def run_walk_forward(
+    histories: Mapping[str, pd.DataFrame],
+    combos: Sequence[StrategyParams],
+    config: WalkForwardConfig = WalkForwardConfig(),
+) -> List[WalkForwardResult]:
+    results = []
+    for symbol, frame in histories.items():
+        if frame is None or len(frame) < MIN_BARS:
+            logger.info(f"Walk-forward skipped {symbol}: not enough bars")
+            continue
+        wf = walk_forward(symbol, frame, combos, config)
+        if wf is None:
+            logger.info(f"Walk-forward skipped {symbol}: history shorter than one train+test window")
+            continue
+        results.append(wf)
+    return results
+
+
+def write_walkforward_reports(
+    results: List[WalkForwardResult],
+    output_dir: Path,
+    config: WalkForwardConfig,
+    timestamp: Optional[str] = None,
+    bootstrap: int = 0,
+) -> Path:
+    """写出 walkforward_<ts>.md（汇总表）与 walkforward_<ts>.json（含折叠明细和拼接净值）；
+    bootstrap > 0 时 JSON 附带样本外收益的分块自助法 95% 置信区间。"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ts = timestamp or datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    md_path = output_dir / f"walkforward_{ts}.md"
+    json_path = output_dir / f"walkforward_{ts}.json"
+
+    lines = [
+        "# Walk-forward Report",
+        "",
+        f"Generated at (UTC): {datetime.utcnow().isoformat()}",
+        f"Train/Test bars: {config.train_bars}/{config.test_bars} "
+        f"({'anchored' if config.anchored else 'rolling'}), objective: {config.objective}",
+        "",
+        "| Symbol | OOS Return | Benchmark Return | Max Drawdown | Trades | Hit Rate | Sharpe | Folds | Mean IS | Mean OOS |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    payload = []
+    for wf in results:
+        s = wf.summary()
+        lines.append(
+            f"| {s['symbol']} | {s['total_return_pct']:.2f}% | {s['benchmark_return_pct']:.2f}% | "
+            f"{s['max_drawdown_pct']:.2f}% | {s['trades']} | {s['hit_rate_pct']:.2f}% | {s['sharpe']:.2f} | {s['folds']} | "
+            f"{s['mean_in_sample_pct']:.2f}% | {s['mean_out_of_sample_pct']:.2f}% |"
+        )
+        # 拼接曲线的第一个点是首个测试窗口开始前的 1.0
+        dates = [str(d.date()) for d in wf.result.index]
+        if bootstrap > 0:
+            intervals = bootstrap_ci(wf.result.strategy_returns, n_resamples=bootstrap)
+            s["bootstrap_ci"] = {name: [round(low, 4), round(high, 4)] for name, (low, high) in intervals.items()}
+        payload.append(
+            {
+                **s,
+                "folds_detail": [
+                    {**asdict(f), "test_from": dates[f.test_start - wf.folds[0].test_start]} for f in wf.folds
+                ],
+                "equity_curve": [round(float(v), 6) for v in wf.result.strategy_curve],
+                "benchmark_curve": [round(float(v), 6) for v in wf.result.benchmark_curve],
+                "dates": dates,
+            }
+        )
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return md_path
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """按行的前缀和，首列补 0：窗口 [a, b) 的和为 p[:, b] - p[:, a]"""
+    return np.concatenate([np.zeros((len(values), 1)), np.cumsum(values, axis=1)], axis=1)
+
+
+def _window_scores(
+    returns: np.ndarray,
+    log_prefix: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    objective: str,
+) -> np.ndarray:
+    """(组合数 × 折叠数) 的样本内得分"""
+    if objective == "return":
+        return log_prefix[:, ends] - log_prefix[:, starts]
+
+    s1 = _prefix(returns)
+    s2 = _prefix(returns * returns)
+    n = (ends - starts).astype(float)
+    mean = (s1[:, ends] - s1[:, starts]) / n
+    var = np.maximum((s2[:, ends] - s2[:, starts]) / n - mean * mean, 0.0)
+    std = np.sqrt(var)
+    return np.divide(mean, std, out=np.zeros_like(mean), where=std > 1e-12) * np.sqrt(252)
@@ -3,6 +3,6 @@
 
 导出配置相关类和函数
 """
-from .settings import Settings, get_settings
+from .settings import Settings, get_settings, get_cache_dir
 
-__all__ = ["Settings", "get_settings"]
+__all__ = ["Settings", "get_settings", "get_cache_dir"]
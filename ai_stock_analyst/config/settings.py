@@ -1,6 +1,7 @@
 """
 配置管理模块
 """
+from pathlib import Path
 from typing import List
 from pydantic_settings import BaseSettings
 
@@ -37,6 +38,9 @@ class Settings(BaseSettings):
     
     # 数据保留天数
     DATA_RETENTION_DAYS: int = 30
+
+    # 本地缓存目录（K线存储等）
+    DATA_CACHE_DIR: str = "./data/cache"
     
     # Web配置
     WEB_HOST: str = "0.0.0.0"
@@ -73,3 +77,11 @@ def get_settings() -> Settings:
     if _settings is None:
         _settings = Settings()
     return _settings
+
+
+def get_cache_dir(*parts: str) -> Path:
+    """返回本地缓存目录（DATA_CACHE_DIR 下的子目录），不存在时自动创建。"""
+    root = Path(get_settings().DATA_CACHE_DIR)
+    path = root.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
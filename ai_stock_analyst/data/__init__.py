@@ -3,16 +3,40 @@
 
 导出数据相关函数
 """
-from .fetcher import fetch_stock_price
-from .fetcher import fetch_market_context
-from .features import calculate_features
-from .universe import load_us_equity_universe, load_us_equity_universe_with_stats, prefilter_universe
+from .providers import MarketDataProvider, ReplayProvider, get_market_data_provider
+from .bar_store import BarStore, get_bar_store
+from .fetcher import fetch_stock_price, fetch_stock_prices
+from .market_context import fetch_market_context, summarize_market_context
+from .features import calculate_features, calculate_features_batch, calculate_panel_features
+from .fundamentals_cache import FundamentalsCache, get_fundamentals_cache
+from .indicator_state import IndicatorEngine, IndicatorState, get_indicator_engine
+from .universe import (
+    load_us_equity_universe,
+    load_us_equity_universe_with_stats,
+    prefilter_universe,
+    prefilter_universe_with_stats,
+)
 
 __all__ = [
+    "MarketDataProvider",
+    "ReplayProvider",
+    "get_market_data_provider",
+    "BarStore",
+    "get_bar_store",
     "fetch_stock_price",
+    "fetch_stock_prices",
     "fetch_market_context",
+    "summarize_market_context",
     "calculate_features",
+    "calculate_features_batch",
+    "calculate_panel_features",
+    "FundamentalsCache",
+    "get_fundamentals_cache",
+    "IndicatorEngine",
+    "IndicatorState",
+    "get_indicator_engine",
     "load_us_equity_universe",
     "load_us_equity_universe_with_stats",
     "prefilter_universe",
+    "prefilter_universe_with_stats",
 ]
@@ -0,0 +1,270 @@
+"""
+本地日线K线存储
+
+每只股票一个结构化 .npy 文件（可 mmap 读取）+ 一个覆盖区间元数据 .json。
+读取时只拉取最后一根已存K线之后的增量数据，避免每次运行重复下载整段历史。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.providers import get_market_data_provider, provider_cache_dir
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+BAR_DTYPE = np.dtype([("date", "datetime64[D]")] + [(field.lower(), "f8") for field in FIELDS])
+PERIOD_UNITS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+# 增量拉取时与已存数据重叠的K线根数，用于发现拆股/复权导致的历史价格变化。
+OVERLAP_BARS = 3
+ADJUST_TOLERANCE = 0.005
+
+Downloader = Callable[..., Dict[str, pd.DataFrame]]
+
+
+def period_to_days(period: str) -> Optional[int]:
+    """把 yfinance 风格的 period（5d/6mo/2y/max）换算为自然日，max 返回 None。"""
+    period = (period or "").strip().lower()
+    if period in {"", "max"}:
+        return None
+    if period == "ytd":
+        today = date.today()
+        return (today - date(today.year, 1, 1)).days + 1
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    return int(match.group(1)) * PERIOD_UNITS[match.group(2)]
+
+
+def period_start(period: str, today: Optional[date] = None) -> Optional[date]:
+    days = period_to_days(period)
+    if days is None:
+        return None
+    return (today or date.today()) - timedelta(days=days)
+
+
+class BarStore:
+    """日线K线存储，负责增量补齐与读取。"""
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        downloader: Optional[Downloader] = None,
+        refresh_seconds: int = 900,
+    ):
+        self.root = Path(root) if root else provider_cache_dir("bars")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.downloader = downloader or _provider_download
+        self.refresh_seconds = refresh_seconds
+
+    def load(self, symbols: List[str], period: str = "6mo", strict: bool = False) -> Dict[str, pd.DataFrame]:
+        """补齐后返回 {symbol: OHLCV DataFrame}。strict=False 时下载失败退化为已存数据。"""
+        try:
+            self.update(symbols, period=period)
+        except Exception as e:
+            if strict:
+                raise
+            logger.warning(f"Bar store update failed, serving stored bars: {e}")
+
+        start = period_start(period)
+        out: Dict[str, pd.DataFrame] = {}
+        for symbol in dict.fromkeys(symbols):
+            frame = self.read(symbol, start=start)
+            if not frame.empty:
+                out[symbol] = frame
+        return out
+
+    def update(self, symbols: List[str], period: str = "6mo") -> Dict[str, int]:
+        """按需全量回填或增量拉取，下载异常直接抛出。"""
+        start = period_start(period)
+        now = time.time()
+        full: List[str] = []
+        delta: Dict[date, List[str]] = {}
+        fresh = 0
+
+        for symbol in dict.fromkeys(symbols):
+            meta = self._read_meta(symbol)
+            bars = self._read_array(symbol)
+            if bars is None or len(bars) == 0 or not _covers(meta, start):
+                full.append(symbol)
+                continue
+            if now - float(meta.get("updated_at", 0)) < self.refresh_seconds:
+                fresh += 1
+                continue
+            fetch_from = bars["date"][max(len(bars) - OVERLAP_BARS, 0)].astype(object)
+            delta.setdefault(fetch_from, []).append(symbol)
+
+        refetch: List[str] = []
+        for fetch_from, group in delta.items():
+            frames = self.downloader(group, start=fetch_from)
+            for symbol in group:
+                if not self._merge_delta(symbol, frames.get(symbol)):
+                    refetch.append(symbol)
+
+        if refetch:
+            logger.info(f"Bar store detected adjusted history, refetching: {refetch}")
+        for group in (full, refetch):
+            if group:
+                frames = self.downloader(group, start=start)
+                for symbol in group:
+                    self.write(symbol, frames.get(symbol), covered_from=start)
+
+        return {"full": len(full), "delta": sum(len(g) for g in delta.values()), "fresh": fresh, "refetched": len(refetch)}
+
+    def read(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        bars = self._read_array(symbol)
+        if bars is None or len(bars) == 0:
+            return pd.DataFrame(columns=list(FIELDS))
+        if start is not None:
+            bars = bars[bars["date"] >= np.datetime64(start, "D")]
+        return _to_frame(bars)
+
+    def last_date(self, symbol: str) -> Optional[date]:
+        bars = self._read_array(symbol)
+        if bars is None or len(bars) == 0:
+            return None
+        return bars["date"][-1].astype(object)
+
+    def write(self, symbol: str, frame: Optional[pd.DataFrame], covered_from: Optional[date] = None) -> None:
+        """整体替换某只股票的已存K线。"""
+        records = _to_records(frame)
+        _atomic_save(self._array_path(symbol), records)
+        self._write_meta(symbol, covered_from.isoformat() if covered_from else "max")
+
+    def _merge_delta(self, symbol: str, frame: Optional[pd.DataFrame]) -> bool:
+        """合并增量数据；重叠区间价格不一致（复权变化）时返回 False。"""
+        meta = self._read_meta(symbol)
+        new = _to_records(frame)
+        if len(new) == 0:
+            self._write_meta(symbol, meta.get("covered_from", "max"))
+            return True
+
+        stored = np.array(self._read_array(symbol))
+        # 最后一根可能是盘中未完成K线，不参与一致性校验。
+        settled = stored[:-1]
+        _, old_idx, new_idx = np.intersect1d(settled["date"], new["date"], return_indices=True)
+        if len(old_idx):
+            old_close = settled["close"][old_idx]
+            new_close = new["close"][new_idx]
+            drift = np.abs(new_close / np.where(old_close == 0, np.nan, old_close) - 1)
+            if np.nanmax(drift, initial=0.0) > ADJUST_TOLERANCE:
+                return False
+
+        merged = np.concatenate([stored[stored["date"] < new["date"][0]], new])
+        _atomic_save(self._array_path(symbol), merged)
+        self._write_meta(symbol, meta.get("covered_from", "max"))
+        return True
+
+    def _array_path(self, symbol: str) -> Path:
+        return self.root / f"{_safe_name(symbol)}.npy"
+
+    def _meta_path(self, symbol: str) -> Path:
+        return self.root / f"{_safe_name(symbol)}.json"
+
+    def _read_array(self, symbol: str) -> Optional[np.ndarray]:
+        path = self._array_path(symbol)
+        if not path.exists():
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            # 空数组无法 mmap
+            return np.load(path)
+        except Exception as e:
+            logger.warning(f"Corrupted bar file for {symbol}, ignoring: {e}")
+            return None
+
+    def _read_meta(self, symbol: str) -> Dict:
+        path = self._meta_path(symbol)
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+
+    def _write_meta(self, symbol: str, covered_from: str) -> None:
+        payload = json.dumps({"covered_from": covered_from, "updated_at": time.time()})
+        tmp = self._meta_path(symbol).with_suffix(f".json.{_tmp_tag()}.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, self._meta_path(symbol))
+
+
+def _provider_download(symbols: List[str], start: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+    return get_market_data_provider().history(symbols, start=start)
+
+
+def _covers(meta: Dict, start: Optional[date]) -> bool:
+    covered_from = meta.get("covered_from")
+    if not covered_from:
+        return False
+    if covered_from == "max":
+        return True
+    if start is None:
+        return False
+    return date.fromisoformat(covered_from) <= start
+
+
+def _to_records(frame: Optional[pd.DataFrame]) -> np.ndarray:
+    if frame is None or frame.empty or "Close" not in frame.columns:
+        return np.empty(0, dtype=BAR_DTYPE)
+
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data = pd.DataFrame(index=index.normalize())
+    for field in FIELDS:
+        values = np.asarray(frame[field]) if field in frame.columns else np.full(len(frame), np.nan)
+        data[field] = pd.to_numeric(pd.Series(values, index=data.index), errors="coerce")
+    data = data.dropna(subset=["Close"])
+    data = data[~data.index.duplicated(keep="last")].sort_index()
+
+    records = np.empty(len(data), dtype=BAR_DTYPE)
+    records["date"] = data.index.values.astype("datetime64[D]")
+    for field in FIELDS:
+        records[field.lower()] = data[field].to_numpy(dtype=float, na_value=np.nan)
+    return records
+
+
+def _to_frame(bars: np.ndarray) -> pd.DataFrame:
+    index = pd.DatetimeIndex(np.asarray(bars["date"]).astype("datetime64[ns]"), name="Date")
+    return pd.DataFrame({field: np.array(bars[field.lower()], dtype=float) for field in FIELDS}, index=index)
+
+
+def _atomic_save(path: Path, records: np.ndarray) -> None:
+    tmp = path.with_suffix(f".npy.{_tmp_tag()}.tmp")
+    with open(tmp, "wb") as fh:
+        np.save(fh, records)
+    os.replace(tmp, path)
+
+
+def _tmp_tag() -> str:
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def _safe_name(symbol: str) -> str:
+    return re.sub(r"[^A-Za-z0-9.\-]", "_", symbol.strip().upper()) or "_"
+
+
+# 全局实例（延迟初始化）
+_bar_store = None
+
+
+def get_bar_store() -> BarStore:
+    """获取K线存储实例（单例）"""
+    global _bar_store
+    if _bar_store is None:
+        _bar_store = BarStore()
+    return _bar_store
@@ -0,0 +1,63 @@
+"""
+美股交易日工具
+
+只按纽约时间与周末判断交易日，不含节假日表；用于缓存按交易日失效。
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+NY_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+
+def market_now() -> datetime:
+    return datetime.now(NY_TZ)
+
+
+def session_date(now: Optional[datetime] = None) -> date:
+    """当前所属交易日（纽约日期，周末归到上一个周五）。"""
+    now = (now or market_now()).astimezone(NY_TZ)
+    day = now.date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def next_session_open(now: Optional[datetime] = None) -> datetime:
+    """下一次开盘时间（纽约时区）。"""
+    now = (now or market_now()).astimezone(NY_TZ)
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=NY_TZ)
+
+
+def session_close(day: date) -> datetime:
+    """某个交易日的收盘时间（纽约时区）。"""
+    return datetime.combine(day, MARKET_CLOSE, tzinfo=NY_TZ)
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    now = (now or market_now()).astimezone(NY_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def session_expiry(now: Optional[datetime] = None, intraday_minutes: int = 20) -> datetime:
+    """按交易时段计算缓存失效时间。
+
+    盘中按从开盘起对齐的 intraday_minutes 分钟整点失效（不超过收盘），盘后/休市则保持到下一次开盘。
+    """
+    now = (now or market_now()).astimezone(NY_TZ)
+    if not is_market_open(now):
+        return next_session_open(now)
+    open_at = datetime.combine(now.date(), MARKET_OPEN, tzinfo=NY_TZ)
+    close_at = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=NY_TZ)
+    step = timedelta(minutes=max(intraday_minutes, 1))
+    elapsed = (now - open_at) // step + 1
+    return min(open_at + elapsed * step, close_at)
@@ -3,8 +3,10 @@
 """
 from __future__ import annotations
 
-from typing import Dict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -128,3 +130,236 @@ def calculate_features(history: pd.DataFrame) -> Dict[str, float | str]:
         "volatility_20d": volatility_20d,
         "data_quality": data_quality,
     }
+
+
+PANEL_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+@dataclass
+class PanelFeatures:
+    """面板特征：每个指标都是 (dates × symbols) 的完整序列。
+
+    第 t 行的取值与对前 t+1 根K线调用 calculate_features 的结果一致（未做四舍五入）。
+    """
+
+    symbols: List[str]
+    index: Optional[pd.Index]
+    nobs: np.ndarray
+    close: np.ndarray
+    ma5: np.ndarray
+    ma20: np.ndarray
+    rsi14: np.ndarray
+    macd: np.ndarray
+    macd_signal: np.ndarray
+    macd_hist: np.ndarray
+    atr14: np.ndarray
+    atr_pct: np.ndarray
+    volatility_20d: np.ndarray
+    data_quality: np.ndarray
+
+    @property
+    def bullish(self) -> np.ndarray:
+        return self.ma5 > self.ma20
+
+    def snapshot(self, row: int = -1) -> Dict[str, Dict[str, float | str]]:
+        """取某一行（默认最新）的特征快照，字段与取整方式与 calculate_features 相同。"""
+        out: Dict[str, Dict[str, float | str]] = {}
+        for j, symbol in enumerate(self.symbols):
+            if self.nobs[row, j] <= 0:
+                out[symbol] = calculate_features(None)
+                continue
+            ma5 = float(self.ma5[row, j])
+            ma20 = float(self.ma20[row, j])
+            atr14 = round(float(self.atr14[row, j]), 4)
+            price = float(self.close[row, j])
+            out[symbol] = {
+                "ma5": round(ma5, 2),
+                "ma20": round(ma20, 2),
+                "trend": "BULLISH" if ma5 > ma20 else "BEARISH",
+                "rsi14": round(float(self.rsi14[row, j]), 2),
+                "macd": round(float(self.macd[row, j]), 4),
+                "macd_signal": round(float(self.macd_signal[row, j]), 4),
+                "macd_hist": round(float(self.macd_hist[row, j]), 4),
+                "atr14": atr14,
+                "atr_pct": round((atr14 / price) * 100, 3) if price > 0 else 0.0,
+                "volatility_20d": round(float(self.volatility_20d[row, j]) * 100, 3),
+                "data_quality": round(float(self.data_quality[row, j]), 3),
+            }
+        return out
+
+    def latest(self) -> Dict[str, Dict[str, float | str]]:
+        return self.snapshot(-1)
+
+
+def calculate_panel_features(
+    close,
+    high=None,
+    low=None,
+    volume=None,
+    open_=None,
+    symbols: Optional[List[str]] = None,
+) -> PanelFeatures:
+    """
+    面板模式特征计算
+
+    输入为 (dates × symbols) 的二维数组或 DataFrame，缺失值用 NaN 表示
+    （上市较晚的股票在前部留 NaN）。一次性计算全部股票、全部日期的指标。
+    """
+    index = close.index if isinstance(close, pd.DataFrame) else None
+    if symbols is None:
+        symbols = [str(c) for c in close.columns] if isinstance(close, pd.DataFrame) else []
+    close = _as_panel(close)
+    if not symbols:
+        symbols = [str(j) for j in range(close.shape[1])]
+    high = _as_panel(high) if high is not None else None
+    low = _as_panel(low) if low is not None else None
+
+    nobs = np.cumsum(~np.isnan(close), axis=0)
+
+    # MA5/MA20：不足窗口时退化为全部历史均值
+    expanding = np.nancumsum(close, axis=0) / np.where(nobs > 0, nobs, np.nan)
+    ma5 = np.where(nobs >= 5, _rolling_mean(close, 5), expanding)
+    ma20 = np.where(nobs >= 20, _rolling_mean(close, 20), expanding)
+
+    # RSI14（简单均值口径）
+    delta = _diff(close)
+    avg_gain = _rolling_mean(np.clip(delta, 0, None), 14)
+    avg_loss = _rolling_mean(-np.clip(delta, None, 0), 14)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+    rsi14 = np.where(nobs >= 15, rsi, 50.0)
+
+    # MACD(12, 26, 9)
+    macd_line = _ema(close, 12) - _ema(close, 26)
+    signal_line = _ema(macd_line, 9)
+    enough = nobs >= 35
+    macd = np.where(enough, macd_line, 0.0)
+    macd_signal = np.where(enough, signal_line, 0.0)
+    macd_hist = np.where(enough, macd_line - signal_line, 0.0)
+
+    # ATR14
+    if high is not None and low is not None:
+        prev_close = _shift(close)
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+        atr14 = np.where(nobs >= 15, _rolling_mean(tr, 14), 0.0)
+    else:
+        atr14 = np.zeros_like(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = np.where(close > 0, np.round(atr14, 4) / close * 100, 0.0)
+
+    # 20日收益率标准差（样本标准差）
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = close / _shift(close) - 1
+    volatility_20d = np.where(nobs >= 21, _rolling_std(returns, 20), 0.0)
+
+    provided = [open_, high, low, close, volume]
+    completeness = sum(1 for arr in provided if arr is not None) / len(PANEL_FIELDS)
+    freshness = np.minimum(nobs / 20, 1.0)
+    data_quality = np.where(nobs > 0, completeness * 0.6 + freshness * 0.4, 0.0)
+
+    return PanelFeatures(
+        symbols=list(symbols),
+        index=index,
+        nobs=nobs,
+        close=close,
+        ma5=ma5,
+        ma20=ma20,
+        rsi14=rsi14,
+        macd=macd,
+        macd_signal=macd_signal,
+        macd_hist=macd_hist,
+        atr14=atr14,
+        atr_pct=atr_pct,
+        volatility_20d=volatility_20d,
+        data_quality=data_quality,
+    )
+
+
+def stack_histories(
+    histories: Dict[str, pd.DataFrame], length: Optional[int] = None
+) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """把 {symbol: OHLCV} 按“最新一根对齐”堆叠成 (bars × symbols) 面板，前部不足处填 NaN。"""
+    symbols = [s for s, h in histories.items() if h is not None and not h.empty and "Close" in h.columns]
+    rows = max((len(histories[s]) for s in symbols), default=0)
+    if length is not None:
+        rows = min(rows, length)
+
+    panel = {field: np.full((rows, len(symbols)), np.nan) for field in PANEL_FIELDS}
+    for j, symbol in enumerate(symbols):
+        hist = histories[symbol].tail(rows)
+        n = len(hist)
+        for field in PANEL_FIELDS:
+            if field in hist.columns:
+                panel[field][rows - n :, j] = pd.to_numeric(hist[field], errors="coerce").to_numpy(dtype=float)
+    return symbols, panel
+
+
+def calculate_features_batch(histories: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, float | str]]:
+    """批量计算最新特征快照，结果与逐只调用 calculate_features 一致。"""
+    symbols, panel = stack_histories(histories)
+    out = {symbol: calculate_features(None) for symbol in histories}
+    if symbols:
+        features = calculate_panel_features(
+            panel["Close"],
+            high=panel["High"],
+            low=panel["Low"],
+            volume=panel["Volume"],
+            open_=panel["Open"],
+            symbols=symbols,
+        )
+        out.update(features.latest())
+    return out
+
+
+def _as_panel(values) -> np.ndarray:
+    arr = np.asarray(values, dtype=float)
+    if arr.ndim == 1:
+        arr = arr[:, None]
+    return arr
+
+
+def _shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[n:] = x[:-n]
+    return out
+
+
+def _diff(x: np.ndarray) -> np.ndarray:
+    return x - _shift(x)
+
+
+def _window_view(x: np.ndarray, window: int) -> Optional[np.ndarray]:
+    if x.shape[0] < window:
+        return None
+    return np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """窗口内任一值为 NaN 则结果为 NaN（等价于 pandas rolling 的默认 min_periods）。"""
+    out = np.full_like(x, np.nan)
+    view = _window_view(x, window)
+    if view is not None:
+        out[window - 1 :] = view.mean(axis=-1)
+    return out
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    view = _window_view(x, window)
+    if view is not None:
+        out[window - 1 :] = view.std(axis=-1, ddof=1)
+    return out
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    """ewm(span, adjust=False)：从每列首个有效值开始递推，NaN 处沿用上一值。"""
+    alpha = 2 / (span + 1)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[1], np.nan)
+    for t in range(x.shape[0]):
+        cur = x[t]
+        blended = (1 - alpha) * prev + alpha * cur
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, blended))
+        out[t] = prev
+    return out
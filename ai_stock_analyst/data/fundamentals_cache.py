@@ -0,0 +1,179 @@
+"""
+基本面数据缓存
+
+yf.Ticker.info 是最慢、最容易被限流的接口，而其中的公司资料和财务比率变化很慢。
+按字段分级缓存到 SQLite：公司资料长 TTL，财务比率按天，行情字段不缓存（命中时单独请求行情补齐）。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from ai_stock_analyst.data.providers import get_market_data_provider, provider_cache_dir
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TTL = 30 * 86400
+RATIO_TTL = 86400
+
+PROFILE_FIELDS = ("longName", "sector", "industry", "longBusinessSummary")
+RATIO_FIELDS = (
+    "trailingPE",
+    "marketCap",
+    "trailingEps",
+    "forwardEps",
+    "revenueGrowth",
+    "earningsGrowth",
+    "profitMargins",
+    "operatingMargins",
+    "returnOnEquity",
+    "debtToEquity",
+    "currentRatio",
+    "quickRatio",
+    "freeCashflow",
+    "totalCash",
+    "totalDebt",
+)
+# 这些字段全部缺失说明接口返回了空数据或被限流，不写入缓存
+CORE_FIELDS = ("longName", "marketCap", "trailingPE")
+FIELD_TTLS = {**{f: PROFILE_TTL for f in PROFILE_FIELDS}, **{f: RATIO_TTL for f in RATIO_FIELDS}}
+
+InfoFetcher = Callable[[str], Dict]
+
+
+class FundamentalsCache:
+    """按字段 TTL 缓存的基本面数据。"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        info_fetcher: Optional[InfoFetcher] = None,
+        quote_fetcher: Optional[InfoFetcher] = None,
+        force_refresh: bool = False,
+    ):
+        self.path = Path(path) if path else provider_cache_dir() / "fundamentals.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.info_fetcher = info_fetcher or _provider_info
+        self.quote_fetcher = quote_fetcher or _provider_quote
+        self.force_refresh = force_refresh
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "quote_fallbacks": 0}
+        self._init_db()
+
+    def get(self, symbol: str, force_refresh: bool = False) -> Dict:
+        """返回与 Ticker.info 同名字段的字典；缓存全部有效时只请求行情字段。"""
+        symbol = symbol.strip().upper()
+        if force_refresh or self.force_refresh:
+            self._count("refreshes")
+            return self._refresh(symbol)
+
+        cached = self._read_fresh(symbol)
+        if cached is None:
+            self._count("misses")
+            return self._refresh(symbol)
+
+        try:
+            quote = self.quote_fetcher(symbol)
+        except Exception as e:
+            logger.warning(f"Quote lookup failed for {symbol}, refetching full info: {e}")
+            self._count("quote_fallbacks")
+            return self._refresh(symbol)
+
+        self._count("hits")
+        return {**cached, **quote}
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        with self._connect() as conn:
+            if symbol:
+                conn.execute("DELETE FROM fundamentals WHERE symbol = ?", (symbol.strip().upper(),))
+            else:
+                conn.execute("DELETE FROM fundamentals")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _refresh(self, symbol: str) -> Dict:
+        info = self.info_fetcher(symbol) or {}
+        if all(info.get(field) is None for field in CORE_FIELDS):
+            logger.warning(f"Fundamentals for {symbol} missing core fields, not caching")
+            return info
+        now = time.time()
+        rows = [(symbol, field, json.dumps(info.get(field)), now) for field in FIELD_TTLS]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (symbol, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return info
+
+    def _read_fresh(self, symbol: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT field, value, fetched_at FROM fundamentals WHERE symbol = ?", (symbol,)
+            ).fetchall()
+
+        now = time.time()
+        cached: Dict = {}
+        for field, value, fetched_at in rows:
+            ttl = FIELD_TTLS.get(field)
+            if ttl is None or now - fetched_at > ttl:
+                continue
+            cached[field] = json.loads(value)
+        if len(cached) < len(FIELD_TTLS):
+            return None
+        return {k: v for k, v in cached.items() if v is not None}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    symbol TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, field)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def _provider_info(symbol: str) -> Dict:
+    return get_market_data_provider().fundamentals(symbol)
+
+
+def _provider_quote(symbol: str) -> Dict:
+    return get_market_data_provider().quote(symbol)
+
+
+# 全局实例（延迟初始化）
+_fundamentals_cache = None
+
+
+def get_fundamentals_cache() -> FundamentalsCache:
+    """获取基本面缓存实例（单例）"""
+    global _fundamentals_cache
+    if _fundamentals_cache is None:
+        _fundamentals_cache = FundamentalsCache()
+    return _fundamentals_cache
@@ -0,0 +1,289 @@
+"""
+流式技术指标状态
+
+为每只股票保存 MA/RSI/MACD/ATR/波动率所需的 EMA 与滑动窗口状态，
+每来一根新K线以常数时间推进，结果与 calculate_features 对同一段历史的计算一致。
+状态可序列化到数据库，日常运行（fetch_stock_prices）只需推进新增的K线；同一引擎也可用于盘中按K线监控。
+已推进过的K线被修订（复权调整、盘中未收盘的K线收盘后变化）时从头重建。
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Optional
+
+import pandas as pd
+
+from ai_stock_analyst.data.features import calculate_features
+from ai_stock_analyst.data.providers import provider_cache_dir
+
+logger = logging.getLogger(__name__)
+
+MA_SHORT = 5
+MA_LONG = 20
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+VOL_WINDOW = 20
+MACD_MIN_BARS = 35
+OHLCV_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def _alpha(span: int) -> float:
+    return 2 / (span + 1)
+
+
+@dataclass
+class IndicatorState:
+    """单只股票的增量指标状态。"""
+
+    symbol: str
+    last_date: Optional[str] = None
+    bars: int = 0
+    close_total: float = 0.0
+    prev_close: Optional[float] = None
+    ema12: Optional[float] = None
+    ema26: Optional[float] = None
+    macd_signal: Optional[float] = None
+    completeness: float = 1.0
+    closes: Deque[float] = field(default_factory=lambda: deque(maxlen=MA_LONG))
+    gains: Deque[float] = field(default_factory=lambda: deque(maxlen=RSI_PERIOD))
+    losses: Deque[float] = field(default_factory=lambda: deque(maxlen=RSI_PERIOD))
+    true_ranges: Deque[float] = field(default_factory=lambda: deque(maxlen=ATR_PERIOD))
+    returns: Deque[float] = field(default_factory=lambda: deque(maxlen=VOL_WINDOW))
+
+    def update(self, bar: Dict, bar_date: Optional[str] = None) -> None:
+        """推进一根K线（bar 至少包含 Close，可选 Open/High/Low/Volume）。"""
+        close = float(bar["Close"])
+        high = _optional_float(bar.get("High"))
+        low = _optional_float(bar.get("Low"))
+
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            self.gains.append(max(delta, 0.0))
+            self.losses.append(max(-delta, 0.0))
+            self.returns.append(close / self.prev_close - 1 if self.prev_close else math.nan)
+
+        if high is not None and low is not None:
+            tr = high - low
+            if self.prev_close is not None:
+                tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+            self.true_ranges.append(tr)
+
+        self.ema12 = close if self.ema12 is None else (1 - _alpha(12)) * self.ema12 + _alpha(12) * close
+        self.ema26 = close if self.ema26 is None else (1 - _alpha(26)) * self.ema26 + _alpha(26) * close
+        macd_line = self.ema12 - self.ema26
+        self.macd_signal = (
+            macd_line if self.macd_signal is None else (1 - _alpha(9)) * self.macd_signal + _alpha(9) * macd_line
+        )
+
+        self.closes.append(close)
+        self.close_total += close
+        self.prev_close = close
+        self.bars += 1
+        self.completeness = sum(1 for f in OHLCV_FIELDS if f in bar) / len(OHLCV_FIELDS)
+        if bar_date is not None:
+            self.last_date = str(bar_date)
+
+    def snapshot(self) -> Dict[str, float | str]:
+        """当前特征快照，字段与取整方式与 calculate_features 相同。"""
+        if self.bars == 0:
+            return calculate_features(None)
+
+        closes = list(self.closes)
+        expanding = self.close_total / self.bars
+        ma5 = _mean(closes[-MA_SHORT:]) if self.bars >= MA_SHORT else expanding
+        ma20 = _mean(closes) if self.bars >= MA_LONG else expanding
+
+        rsi14 = 50.0
+        if self.bars >= RSI_PERIOD + 1:
+            avg_gain = _mean(self.gains)
+            avg_loss = _mean(self.losses)
+            if avg_loss == 0:
+                rsi14 = 100.0 if avg_gain > 0 else 50.0
+            else:
+                rsi14 = round(100 - 100 / (1 + avg_gain / avg_loss), 2)
+
+        macd = macd_signal = macd_hist = 0.0
+        if self.bars >= MACD_MIN_BARS:
+            macd_line = self.ema12 - self.ema26
+            macd = round(macd_line, 4)
+            macd_signal = round(self.macd_signal, 4)
+            macd_hist = round(macd_line - self.macd_signal, 4)
+
+        atr14 = 0.0
+        if self.bars >= ATR_PERIOD + 1 and len(self.true_ranges) == ATR_PERIOD:
+            atr14 = round(_mean(self.true_ranges), 4)
+        price = self.prev_close or 0.0
+        atr_pct = round((atr14 / price) * 100, 3) if price > 0 else 0.0
+
+        volatility_20d = 0.0
+        if len(self.returns) >= VOL_WINDOW:
+            volatility_20d = round(_stdev(self.returns) * 100, 3)
+
+        freshness = 1.0 if self.bars >= 20 else min(self.bars / 20, 1.0)
+        return {
+            "ma5": round(ma5, 2),
+            "ma20": round(ma20, 2),
+            "trend": "BULLISH" if ma5 > ma20 else "BEARISH",
+            "rsi14": rsi14,
+            "macd": macd,
+            "macd_signal": macd_signal,
+            "macd_hist": macd_hist,
+            "atr14": atr14,
+            "atr_pct": atr_pct,
+            "volatility_20d": volatility_20d,
+            "data_quality": round(self.completeness * 0.6 + freshness * 0.4, 3),
+        }
+
+    def to_dict(self) -> Dict:
+        payload = {k: v for k, v in self.__dict__.items()}
+        for key in ("closes", "gains", "losses", "true_ranges", "returns"):
+            payload[key] = list(payload[key])
+        return payload
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "IndicatorState":
+        state = cls(symbol=payload["symbol"])
+        for key, value in payload.items():
+            if key in {"closes", "gains", "losses", "true_ranges", "returns"}:
+                getattr(state, key).extend(value)
+            elif hasattr(state, key):
+                setattr(state, key, value)
+        return state
+
+
+class IndicatorEngine:
+    """多股票增量指标引擎。"""
+
+    def __init__(self, states: Optional[Dict[str, IndicatorState]] = None, db=None):
+        self.states: Dict[str, IndicatorState] = states or {}
+        self.db = db
+
+    def update(self, symbol: str, bar: Dict, bar_date: Optional[str] = None) -> Dict[str, float | str]:
+        state = self.states.setdefault(symbol, IndicatorState(symbol=symbol))
+        state.update(bar, bar_date)
+        return state.snapshot()
+
+    def preview(self, symbol: str, bar: Dict) -> Dict[str, float | str]:
+        """用一根未收盘的K线试算指标，不改变已保存状态（盘中监控）。"""
+        state = copy.deepcopy(self.states.get(symbol) or IndicatorState(symbol=symbol))
+        state.update(bar)
+        return state.snapshot()
+
+    def sync(self, symbol: str, history: pd.DataFrame) -> Dict[str, float | str]:
+        """只推进 history 中晚于 last_date 的K线；状态缺失或与历史断档时从头重建。"""
+        if history is None or history.empty:
+            state = self.states.get(symbol)
+            return state.snapshot() if state else calculate_features(None)
+
+        dates = [_date_key(idx) for idx in history.index]
+        state = self.states.get(symbol)
+        start = 0
+        if state is not None and state.last_date is not None and state.last_date >= dates[0]:
+            start = next((i for i, d in enumerate(dates) if d > state.last_date), len(dates))
+            last = start - 1
+            if dates[last] != state.last_date or not _same_price(history["Close"].iloc[last], state.prev_close):
+                start = 0
+        if start == 0:
+            state = self.states[symbol] = IndicatorState(symbol=symbol)
+
+        for bar_date, bar in zip(dates[start:], history.iloc[start:].to_dict("records")):
+            state.update(bar, bar_date)
+        return state.snapshot()
+
+    def snapshot(self, symbol: str) -> Dict[str, float | str]:
+        state = self.states.get(symbol)
+        return state.snapshot() if state else calculate_features(None)
+
+    def save(self, db=None, symbols: Optional[Iterable[str]] = None) -> int:
+        """序列化状态（默认全部，给出 symbols 时只写这些）到数据库 indicator_states 表。"""
+        db = db or self.db
+        if db is None:
+            from ai_stock_analyst.database import get_db
+
+            db = get_db()
+        wanted = self.states if symbols is None else [s for s in symbols if s in self.states]
+        rows = [(symbol, self.states[symbol].last_date, json.dumps(self.states[symbol].to_dict())) for symbol in wanted]
+        with db.get_cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT INTO indicator_states (symbol, last_date, state, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    last_date = excluded.last_date,
+                    state = excluded.state,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+        return len(rows)
+
+    @classmethod
+    def load(cls, symbols: Optional[Iterable[str]] = None, db=None) -> "IndicatorEngine":
+        if db is None:
+            from ai_stock_analyst.database import get_db
+
+            db = get_db()
+        rows = db.fetch_all("SELECT symbol, state FROM indicator_states")
+        wanted = set(symbols) if symbols is not None else None
+        states: Dict[str, IndicatorState] = {}
+        for row in rows:
+            if wanted is not None and row["symbol"] not in wanted:
+                continue
+            try:
+                states[row["symbol"]] = IndicatorState.from_dict(json.loads(row["state"]))
+            except Exception as e:
+                logger.warning(f"Discarding unreadable indicator state for {row['symbol']}: {e}")
+        return cls(states, db=db)
+
+
+def _optional_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def _same_price(value, stored: Optional[float]) -> bool:
+    return stored is not None and math.isclose(float(value), stored, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def _mean(values: Iterable[float]) -> float:
+    values = list(values)
+    return sum(values) / len(values) if values else 0.0
+
+
+def _stdev(values: Iterable[float]) -> float:
+    values = list(values)
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+
+
+def _date_key(value) -> str:
+    if hasattr(value, "date"):
+        return value.date().isoformat()
+    return str(value)
+
+
+# 全局实例（延迟初始化）
+_indicator_engine = None
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """获取指标引擎实例（单例）；状态存放在当前数据源的缓存目录下，不同数据源的K线互不混用"""
+    global _indicator_engine
+    if _indicator_engine is None:
+        from ai_stock_analyst.database import Database
+
+        db = Database(f"sqlite:///{provider_cache_dir() / 'indicators.db'}")
+        _indicator_engine = IndicatorEngine.load(db=db)
+    return _indicator_engine
@@ -0,0 +1,204 @@
+"""
+市场风险上下文
+
+QQQ、VIX 及其他环境指标一次批量下载（走本地K线存储），结果按交易时段写入磁盘缓存，
+同一时段内的并发进程/线程共享同一份结果。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from ai_stock_analyst.data.bar_store import get_bar_store
+from ai_stock_analyst.data.calendar import session_expiry
+from ai_stock_analyst.data.providers import get_market_data_provider, provider_cache_dir
+
+logger = logging.getLogger(__name__)
+
+CORE_TICKERS = ("QQQ", "^VIX")
+LEASE_SECONDS = 60
+LEASE_WAIT_SECONDS = 20
+
+_lock = threading.Lock()
+_memory_cache: Dict = {"expires_at": 0.0, "tickers": (), "value": {}}
+
+
+def regime_tickers() -> List[str]:
+    """核心指标 + MARKET_REGIME_TICKERS 中配置的额外指标（如 IWM,TLT,XLK）。"""
+    extra = [t.strip().upper() for t in os.getenv("MARKET_REGIME_TICKERS", "").split(",") if t.strip()]
+    return list(dict.fromkeys([*CORE_TICKERS, *extra]))
+
+
+def fetch_market_context() -> Dict:
+    """获取市场风险上下文（QQQ + VIX + 额外环境指标），按交易时段缓存。"""
+    try:
+        tickers = tuple(regime_tickers())
+        provider = get_market_data_provider().name
+        with _lock:
+            now = time.time()
+            if (
+                _memory_cache["value"]
+                and _memory_cache["tickers"] == tickers
+                and _memory_cache.get("provider") == provider
+                and now < _memory_cache["expires_at"]
+            ):
+                return _memory_cache["value"]
+
+            cached = _read_cache(tickers)
+            if cached is None:
+                cached = _refresh_shared(tickers)
+            _memory_cache.update(cached, tickers=tickers, provider=provider)
+            return cached["value"]
+    except Exception as e:
+        logger.warning(f"Failed to fetch market context: {e}")
+        return {}
+
+
+def summarize_market_context(closes: Dict[str, pd.Series]) -> Dict:
+    """由各指标收盘价序列计算风险上下文（纯函数）。"""
+    qqq_close = _clean(closes.get("QQQ"))
+    vix_close = _clean(closes.get("^VIX"))
+
+    qqq_price = float(qqq_close.iloc[-1]) if not qqq_close.empty else 0.0
+    qqq_ma20 = float(qqq_close.tail(20).mean()) if len(qqq_close) >= 20 else 0.0
+    qqq_ret_5d = _return_pct(qqq_close, 5)
+    vix_level = float(vix_close.iloc[-1]) if not vix_close.empty else 0.0
+
+    qqq_risk = "LOW"
+    if qqq_price and qqq_ma20 and qqq_price < qqq_ma20 and qqq_ret_5d < -2:
+        qqq_risk = "HIGH"
+    elif qqq_price and qqq_ma20 and (qqq_price < qqq_ma20 or qqq_ret_5d < -1):
+        qqq_risk = "MEDIUM"
+
+    vix_risk = "LOW"
+    if vix_level >= 24:
+        vix_risk = "HIGH"
+    elif vix_level >= 20:
+        vix_risk = "MEDIUM"
+
+    context = {
+        "qqq_price": round(qqq_price, 2),
+        "qqq_ma20": round(qqq_ma20, 2),
+        "qqq_ret_5d": round(qqq_ret_5d, 2),
+        "qqq_risk": qqq_risk,
+        "vix_level": round(vix_level, 2),
+        "vix_risk": vix_risk,
+    }
+
+    regime_inputs = {}
+    for ticker, series in closes.items():
+        if ticker in CORE_TICKERS:
+            continue
+        series = _clean(series)
+        if series.empty:
+            continue
+        price = float(series.iloc[-1])
+        ma20 = float(series.tail(20).mean()) if len(series) >= 20 else 0.0
+        regime_inputs[ticker] = {
+            "price": round(price, 2),
+            "ma20": round(ma20, 2),
+            "ret_5d": round(_return_pct(series, 5), 2),
+            "ret_20d": round(_return_pct(series, 20), 2),
+            "above_ma20": bool(ma20 and price > ma20),
+        }
+    if regime_inputs:
+        context["regime_inputs"] = regime_inputs
+    return context
+
+
+def _download_context(tickers: tuple) -> Dict:
+    histories = get_bar_store().load(list(tickers), period="3mo")
+    closes = {t: histories[t]["Close"] for t in tickers if t in histories}
+    if "QQQ" not in closes:
+        raise RuntimeError("no QQQ bars available")
+    return summarize_market_context(closes)
+
+
+def _refresh_shared(tickers: tuple) -> Dict:
+    """持有租约的进程负责下载；其他进程等待其写入缓存，超时后自行下载。"""
+    lease = _cache_path().with_suffix(".lease")
+    deadline = time.monotonic() + LEASE_WAIT_SECONDS
+    while not _acquire_lease(lease):
+        time.sleep(0.2)
+        cached = _read_cache(tickers)
+        if cached is not None:
+            return cached
+        if time.monotonic() > deadline:
+            logger.warning("Market context lease wait timed out, fetching directly")
+            return _write_cache(tickers, _download_context(tickers))
+
+    try:
+        cached = _read_cache(tickers)
+        if cached is not None:
+            return cached
+        return _write_cache(tickers, _download_context(tickers))
+    finally:
+        lease.unlink(missing_ok=True)
+
+
+def _acquire_lease(path: Path) -> bool:
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            if time.time() - path.stat().st_mtime > LEASE_SECONDS:
+                # 持有者异常退出留下的过期租约
+                path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        return False
+    with os.fdopen(fd, "w") as fh:
+        fh.write(str(os.getpid()))
+    return True
+
+
+def _cache_path() -> Path:
+    return provider_cache_dir("market") / "context.json"
+
+
+def _read_cache(tickers: tuple) -> Optional[Dict]:
+    path = _cache_path()
+    if not path.exists():
+        return None
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if tuple(payload.get("tickers", ())) != tickers or time.time() >= float(payload.get("expires_at", 0)):
+        return None
+    return {"expires_at": float(payload["expires_at"]), "value": payload.get("value", {})}
+
+
+def _write_cache(tickers: tuple, value: Dict) -> Dict:
+    expires_at = session_expiry(intraday_minutes=int(os.getenv("MARKET_CONTEXT_INTRADAY_MINUTES", "20")))
+    payload = {
+        "tickers": list(tickers),
+        "expires_at": expires_at.timestamp(),
+        "generated_at": datetime.utcnow().isoformat(),
+        "value": value,
+    }
+    path = _cache_path()
+    tmp = path.with_suffix(f".json.{os.getpid()}-{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp, path)
+    return {"expires_at": payload["expires_at"], "value": value}
+
+
+def _clean(series: Optional[pd.Series]) -> pd.Series:
+    if series is None:
+        return pd.Series(dtype=float)
+    return series.dropna()
+
+
+def _return_pct(series: pd.Series, bars: int) -> float:
+    if len(series) < bars + 1:
+        return 0.0
+    return (float(series.iloc[-1]) / float(series.iloc[-bars - 1]) - 1) * 100
@@ -0,0 +1,81 @@
+"""
+行情数据源
+
+MARKET_DATA_PROVIDER 选择数据源：yfinance（默认）或 replay（离线回放/合成数据）。
+"""
+import os
+import threading
+from datetime import date
+from pathlib import Path
+
+from ai_stock_analyst.config import get_cache_dir
+
+from .base import ListingFile, MarketDataProvider, ProviderError
+from .replay import ReplayProvider
+from .yfinance_provider import YFinanceProvider
+
+
+def create_market_data_provider(name: str = None) -> MarketDataProvider:
+    """按名称创建数据源，replay 的参数读取 REPLAY_* 环境变量"""
+    name = (name or os.getenv("MARKET_DATA_PROVIDER", "yfinance")).strip().lower()
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "replay":
+        end_date = os.getenv("REPLAY_END_DATE", "")
+        return ReplayProvider(
+            root=os.getenv("REPLAY_DATA_DIR") or None,
+            synthetic=os.getenv("REPLAY_SYNTHETIC", "true").lower() != "false",
+            synthetic_symbols=int(os.getenv("REPLAY_SYNTHETIC_SYMBOLS", "500")),
+            end_date=date.fromisoformat(end_date) if end_date else None,
+            latency_ms=float(os.getenv("REPLAY_LATENCY_MS", "0")),
+            latency_jitter_ms=float(os.getenv("REPLAY_LATENCY_JITTER_MS", "0")),
+            error_rate=float(os.getenv("REPLAY_ERROR_RATE", "0")),
+            slow_rate=float(os.getenv("REPLAY_SLOW_RATE", "0")),
+            slow_ms=float(os.getenv("REPLAY_SLOW_MS", "0")),
+            seed=int(os.getenv("REPLAY_SEED", "0")),
+        )
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+# 全局实例（延迟初始化）
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_market_data_provider() -> MarketDataProvider:
+    """获取行情数据源实例（单例）"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_market_data_provider()
+    return _provider
+
+
+def set_market_data_provider(provider: MarketDataProvider) -> None:
+    """替换全局数据源（基准测试/离线运行）"""
+    global _provider
+    _provider = provider
+
+
+def provider_cache_dir(*parts: str) -> Path:
+    """
+    当前数据源专用的缓存目录（DATA_CACHE_DIR/<数据源名>/...）
+
+    K线、基本面、候选池快照、市场上下文都按数据源分目录存放，
+    用 replay 跑过一次不会让之后的 yfinance 运行读到合成数据。
+    """
+    return get_cache_dir(get_market_data_provider().name, *parts)
+
+
+__all__ = [
+    "ListingFile",
+    "MarketDataProvider",
+    "ProviderError",
+    "ReplayProvider",
+    "YFinanceProvider",
+    "create_market_data_provider",
+    "get_market_data_provider",
+    "provider_cache_dir",
+    "set_market_data_provider",
+]
@@ -0,0 +1,47 @@
+"""
+行情数据源基类定义
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+class ProviderError(Exception):
+    """数据源请求失败"""
+
+
+@dataclass
+class ListingFile:
+    """证券列表文件内容及其 HTTP 校验头（ETag / Last-Modified）"""
+
+    text: str
+    validators: Dict[str, str] = field(default_factory=dict)
+
+
+class MarketDataProvider(ABC):
+    """行情数据源基类 - 定义通用接口"""
+
+    name = "base"
+
+    @abstractmethod
+    def history(self, symbols: List[str], start: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+        """批量获取日线 OHLCV，start 为 None 时返回全部历史"""
+        pass
+
+    @abstractmethod
+    def quote(self, symbol: str) -> Dict:
+        """获取实时行情字段（currentPrice / previousClose / volume）"""
+        pass
+
+    @abstractmethod
+    def fundamentals(self, symbol: str) -> Dict:
+        """获取与 Ticker.info 同名字段的基本面数据"""
+        pass
+
+    @abstractmethod
+    def fetch_listing(self, url: str, validators: Optional[Dict[str, str]] = None) -> Optional[ListingFile]:
+        """获取 NASDAQ Trader 证券列表文件；内容未变化时返回 None"""
+        pass
@@ -0,0 +1,233 @@
+"""
+本地回放数据源
+
+从目录读取录制好的数据，缺失时按股票代码生成确定性的合成数据；
+可注入延迟与随机错误，用于离线 CI、压测和尾延迟分析。
+
+目录结构（均可选）：
+    history/<SYMBOL>.csv        Date,Open,High,Low,Close,Volume
+    fundamentals/<SYMBOL>.json  Ticker.info 同名字段
+    listings/<文件名>            如 nasdaqlisted.txt / otherlisted.txt
+"""
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .base import ListingFile, MarketDataProvider, ProviderError
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_BARS = 760
+SYNTHETIC_SECTORS = ("Technology", "Healthcare", "Financial Services", "Energy", "Industrials", "Consumer Cyclical")
+
+
+class ReplayProvider(MarketDataProvider):
+    """录制/合成数据回放"""
+
+    name = "replay"
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        synthetic: bool = True,
+        synthetic_symbols: int = 500,
+        end_date: Optional[date] = None,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.root = Path(root) if root else None
+        self.synthetic = synthetic
+        self.synthetic_symbols = synthetic_symbols
+        self.end_date = end_date
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.calls: Dict[str, int] = {"history": 0, "quote": 0, "fundamentals": 0, "listing": 0, "errors": 0}
+
+    def history(self, symbols: List[str], start: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+        self._simulate("history")
+        out: Dict[str, pd.DataFrame] = {}
+        for symbol in symbols:
+            frame = self._history_frame(symbol)
+            if frame is None:
+                continue
+            if start is not None:
+                frame = frame[frame.index >= pd.Timestamp(start)]
+            if not frame.empty:
+                out[symbol] = frame
+        return out
+
+    def quote(self, symbol: str) -> Dict:
+        self._simulate("quote")
+        return self._quote_fields(symbol)
+
+    def _quote_fields(self, symbol: str) -> Dict:
+        frame = self._history_frame(symbol)
+        if frame is None or frame.empty:
+            raise ProviderError(f"no replay data for {symbol}")
+        close = frame["Close"]
+        price = float(close.iloc[-1])
+        previous = float(close.iloc[-2]) if len(close) > 1 else price
+        return {
+            "currentPrice": price,
+            "regularMarketPrice": price,
+            "previousClose": previous,
+            "volume": float(frame["Volume"].iloc[-1]),
+        }
+
+    def fundamentals(self, symbol: str) -> Dict:
+        self._simulate("fundamentals")
+        recorded = self._read_json("fundamentals", symbol)
+        if recorded is not None:
+            return recorded
+        if not self.synthetic:
+            raise ProviderError(f"no replay fundamentals for {symbol}")
+
+        rng = np.random.default_rng(self._symbol_seed(symbol))
+        quote = self._quote_fields(symbol)
+        shares = float(rng.uniform(5e7, 5e9))
+        return {
+            **quote,
+            "longName": f"{symbol} Synthetic Corp",
+            "sector": SYNTHETIC_SECTORS[int(rng.integers(len(SYNTHETIC_SECTORS)))],
+            "industry": "Synthetic",
+            "longBusinessSummary": f"Synthetic replay company for {symbol}.",
+            "trailingPE": round(float(rng.uniform(8, 60)), 2),
+            "marketCap": int(shares * quote["currentPrice"]),
+            "trailingEps": round(float(rng.uniform(-2, 12)), 2),
+            "forwardEps": round(float(rng.uniform(-1, 14)), 2),
+            "revenueGrowth": round(float(rng.normal(0.08, 0.15)), 4),
+            "earningsGrowth": round(float(rng.normal(0.1, 0.3)), 4),
+            "profitMargins": round(float(rng.uniform(-0.1, 0.35)), 4),
+            "operatingMargins": round(float(rng.uniform(-0.05, 0.4)), 4),
+            "returnOnEquity": round(float(rng.uniform(-0.1, 0.45)), 4),
+            "debtToEquity": round(float(rng.uniform(0, 250)), 2),
+            "currentRatio": round(float(rng.uniform(0.5, 4)), 2),
+            "quickRatio": round(float(rng.uniform(0.3, 3)), 2),
+            "freeCashflow": int(rng.uniform(-1e8, 1e10)),
+            "totalCash": int(rng.uniform(1e7, 5e10)),
+            "totalDebt": int(rng.uniform(0, 5e10)),
+        }
+
+    def fetch_listing(self, url: str, validators: Optional[Dict[str, str]] = None) -> Optional[ListingFile]:
+        self._simulate("listing")
+        filename = url.rstrip("/").rsplit("/", 1)[-1]
+        path = self.root / "listings" / filename if self.root else None
+        if path is not None and path.exists():
+            text = path.read_text(encoding="utf-8")
+        elif self.synthetic:
+            text = self._synthetic_listing(filename)
+        else:
+            raise ProviderError(f"no replay listing for {filename}")
+
+        etag = f'"{zlib.crc32(text.encode()):08x}"'
+        if validators and validators.get("etag") == etag:
+            return None
+        return ListingFile(text=text, validators={"etag": etag, "last_modified": ""})
+
+    def record_history(self, histories: Dict[str, pd.DataFrame]) -> None:
+        """把其他数据源取得的K线写入回放目录，供之后离线重放。"""
+        if self.root is None:
+            raise ValueError("ReplayProvider.record_history requires a root directory")
+        folder = self.root / "history"
+        folder.mkdir(parents=True, exist_ok=True)
+        for symbol, frame in histories.items():
+            frame.to_csv(folder / f"{symbol.upper()}.csv", index_label="Date")
+
+    def _history_frame(self, symbol: str) -> Optional[pd.DataFrame]:
+        path = self.root / "history" / f"{symbol.upper()}.csv" if self.root else None
+        if path is not None and path.exists():
+            return pd.read_csv(path, index_col="Date", parse_dates=True)
+        if not self.synthetic:
+            return None
+        return self._synthetic_history(symbol)
+
+    def _synthetic_history(self, symbol: str) -> pd.DataFrame:
+        rng = np.random.default_rng(self._symbol_seed(symbol))
+        end = pd.Timestamp(self.end_date or date.today())
+        index = pd.bdate_range(end=end, periods=SYNTHETIC_BARS, name="Date")
+        drift = rng.normal(0.0004, 0.0006)
+        sigma = rng.uniform(0.01, 0.035)
+        close = float(rng.uniform(5, 400)) * np.exp(np.cumsum(rng.normal(drift, sigma, len(index))))
+        spread = np.abs(rng.normal(0, sigma, len(index))) * close
+        open_ = close * (1 + rng.normal(0, sigma / 3, len(index)))
+        return pd.DataFrame(
+            {
+                "Open": open_,
+                "High": np.maximum(open_, close) + spread,
+                "Low": np.maximum(np.minimum(open_, close) - spread, 0.01),
+                "Close": close,
+                "Adj Close": close,
+                "Volume": np.round(rng.lognormal(14, 1.2) * rng.uniform(0.5, 1.5, len(index))),
+            },
+            index=index,
+        )
+
+    def _synthetic_listing(self, filename: str) -> str:
+        if "other" in filename:
+            header = "ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Round Lot Size|Test Issue|NASDAQ Symbol"
+            exchanges = "NAP"
+            rows = [
+                f"{s}|{s} Synthetic Corp|{exchanges[i % 3]}|{s}|N|100|N|{s}"
+                for i, s in enumerate(self._synthetic_universe()[1::2])
+            ]
+        else:
+            header = "Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares"
+            rows = [f"{s}|{s} Synthetic Inc|Q|N|N|100|N|N" for s in self._synthetic_universe()[0::2]]
+        return "\n".join([header, *rows, "File Creation Time: replay|||||||"]) + "\n"
+
+    def _synthetic_universe(self) -> List[str]:
+        letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        symbols = []
+        for i in range(self.synthetic_symbols):
+            a, rest = divmod(i, 26 * 26)
+            b, c = divmod(rest, 26)
+            symbols.append(f"Z{letters[a % 26]}{letters[b]}{letters[c]}")
+        return symbols
+
+    def _read_json(self, folder: str, symbol: str) -> Optional[Dict]:
+        if self.root is None:
+            return None
+        path = self.root / folder / f"{symbol.upper()}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _symbol_seed(self, symbol: str) -> int:
+        return zlib.crc32(f"{self.seed}:{symbol.upper()}".encode())
+
+    def _simulate(self, kind: str) -> None:
+        """按配置注入延迟与错误"""
+        with self._rng_lock:
+            self.calls[kind] += 1
+            delay = max(self.latency_ms + self._rng.uniform(-1, 1) * self.latency_jitter_ms, 0.0)
+            if self._rng.random() < self.slow_rate:
+                # 长尾请求
+                delay += self.slow_ms
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.calls["errors"] += 1
+        if delay:
+            time.sleep(delay / 1000)
+        if fail:
+            raise ProviderError(f"injected replay failure ({kind})")
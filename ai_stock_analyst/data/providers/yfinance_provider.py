@@ -0,0 +1,102 @@
+"""
+yfinance 数据源（证券列表来自 NASDAQ Trader）
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+import requests
+
+from .base import ListingFile, MarketDataProvider, ProviderError
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance 实时数据源"""
+
+    name = "yfinance"
+
+    def history(self, symbols: List[str], start: Optional[date] = None) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+
+        window = {"start": start.isoformat()} if start else {"period": "max"}
+        raw = yf.download(
+            tickers=" ".join(to_yf_symbol(s) for s in symbols),
+            interval="1d",
+            auto_adjust=False,
+            group_by="ticker",
+            progress=False,
+            threads=True,
+            **window,
+        )
+        return split_download(raw, symbols)
+
+    def quote(self, symbol: str) -> Dict:
+        import yfinance as yf
+
+        fast = yf.Ticker(symbol).fast_info
+        price = fast["last_price"]
+        if not price:
+            raise ProviderError(f"empty quote for {symbol}")
+        return {
+            "currentPrice": price,
+            "regularMarketPrice": price,
+            "previousClose": fast["previous_close"],
+            "volume": fast["last_volume"],
+        }
+
+    def fundamentals(self, symbol: str) -> Dict:
+        import yfinance as yf
+
+        return yf.Ticker(symbol).info or {}
+
+    def fetch_listing(self, url: str, validators: Optional[Dict[str, str]] = None) -> Optional[ListingFile]:
+        validators = validators or {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        resp = requests.get(url, timeout=15, headers=headers)
+        if resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+        return ListingFile(
+            text=resp.text,
+            validators={
+                "etag": resp.headers.get("ETag", ""),
+                "last_modified": resp.headers.get("Last-Modified", ""),
+            },
+        )
+
+
+def split_download(raw: Optional[pd.DataFrame], symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    """把 yf.download(group_by="ticker") 的宽表拆成 {symbol: OHLCV}。"""
+    if raw is None or getattr(raw, "empty", True):
+        return {}
+
+    out: Dict[str, pd.DataFrame] = {}
+    if isinstance(raw.columns, pd.MultiIndex):
+        level0 = set(raw.columns.get_level_values(0))
+        for symbol in symbols:
+            ysym = to_yf_symbol(symbol)
+            if ysym not in level0:
+                continue
+            frame = raw[ysym]
+            if "Close" in frame.columns:
+                frame = frame.dropna(subset=["Close"])
+                if not frame.empty:
+                    out[symbol] = frame
+        return out
+
+    if len(symbols) == 1 and "Close" in raw.columns:
+        frame = raw.dropna(subset=["Close"])
+        if not frame.empty:
+            out[symbols[0]] = frame
+    return out
+
+
+def to_yf_symbol(symbol: str) -> str:
+    return symbol.replace(".", "-").upper()
@@ -3,12 +3,23 @@
 """
 from __future__ import annotations
 
+import json
 import logging
+import os
 import re
-from typing import Any, Dict, List, Tuple
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-import yfinance as yf
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.bar_store import get_bar_store
+from ai_stock_analyst.data.calendar import session_date
+from ai_stock_analyst.data.providers import get_market_data_provider, provider_cache_dir
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +35,22 @@ EXCHANGE_LABELS = {
     "V": "IEX",
 }
 
+# 预筛下载：并发数、目标单块耗时与分块大小范围
+PREFILTER_WORKERS = 4
+PREFILTER_TARGET_SECONDS = 8.0
+PREFILTER_MIN_CHUNK = 8
+PREFILTER_MAX_CHUNK = 400
+PREFILTER_MAX_ATTEMPTS = 2
+PREFILTER_MIN_BARS = 25
+PREFILTER_LOOKBACK = 21
+PREFILTER_METRICS = ("symbol", "price", "avg_dollar_volume_20", "ret20", "ret5", "vol20", "score")
+
+SNAPSHOT_ARRAYS = ("symbols", "exchange", "etf", "source")
+SNAPSHOT_SYMBOL_DTYPE = "U8"
+
+# 本次下载拿到的 HTTP 校验头，写快照时一并落盘
+_fresh_validators: Dict[str, Dict[str, str]] = {}
+
 # Fallback universe in case network source is unavailable.
 FALLBACK_UNIVERSE = [
     "AAPL", "MSFT", "NVDA", "AMZN", "META", "GOOGL", "TSLA", "AVGO", "AMD", "NFLX",
@@ -40,56 +67,189 @@ def load_us_equity_universe(max_symbols: int = 1800, include_etf: bool = False)
 
 
 def load_us_equity_universe_with_stats(max_symbols: int = 1800, include_etf: bool = False) -> Tuple[List[str], Dict[str, Any]]:
-    """加载美股候选池并返回统计信息。max_symbols<=0 表示不截断。"""
-    rows = _load_nasdaq_listed_rows() + _load_other_listed_rows()
-    deduped: Dict[str, Dict[str, str]] = {}
-
-    for row in rows:
-        symbol = _normalize_symbol(str(row.get("symbol", "")))
-        if not _is_valid_symbol(symbol):
-            continue
-        etf_flag = str(row.get("etf", "N")).upper() == "Y"
-        if etf_flag and not include_etf:
-            continue
-
-        exchange = str(row.get("exchange", "Q")).upper() or "Q"
-        if symbol not in deduped:
-            deduped[symbol] = {
-                "exchange": exchange,
-                "etf": "Y" if etf_flag else "N",
-            }
-
-    if not deduped:
-        logger.warning("Failed to load NASDAQ Trader universe. Using fallback universe.")
-        fallback = sorted(FALLBACK_UNIVERSE)
-        if max_symbols > 0:
-            fallback = fallback[:max_symbols]
-        return fallback, {
-            "raw_rows": 0,
-            "selected_universe": len(fallback),
-            "include_etf": include_etf,
-            "exchange_breakdown": {"Fallback Mixed": len(fallback)},
-        }
+    """加载美股候选池并返回统计信息。max_symbols<=0 表示不截断。
+
+    解析结果以数组快照缓存，同一交易日内直接复用；跨日时用 ETag/If-Modified-Since 重新校验。
+    """
+    snapshot = _read_universe_snapshot()
+    session = session_date().isoformat()
+
+    if snapshot is not None and snapshot["meta"].get("session") == session:
+        source = "snapshot"
+    else:
+        _fresh_validators.clear()
+        loaded = [_load_nasdaq_listed_rows(), _load_other_listed_rows()]
+        table, raw_counts = _build_universe_table(loaded, snapshot)
+        if len(table["symbols"]) == 0:
+            return _fallback_universe(max_symbols, include_etf)
+        failed = any(rows == [] for rows in loaded)
+        if failed and snapshot is not None and not any(loaded):
+            source = "stale"
+        else:
+            source = "network" if any(loaded) else "revalidated"
+            # 有数据源下载失败时不标记交易日，下次调用继续重试
+            snapshot = _write_universe_snapshot(
+                table, raw_counts, "" if failed else session, previous=snapshot
+            )
 
-    symbols = sorted(deduped.keys())
+    table = snapshot["table"]
+    mask = np.ones(len(table["symbols"]), dtype=bool) if include_etf else ~table["etf"]
+    symbols = table["symbols"][mask].tolist()
+    exchanges = table["exchange"][mask]
     if max_symbols > 0:
         symbols = symbols[:max_symbols]
+        exchanges = exchanges[:max_symbols]
 
+    codes, counts = np.unique(exchanges, return_counts=True)
     exchange_breakdown: Dict[str, int] = {}
-    for symbol in symbols:
-        code = deduped.get(symbol, {}).get("exchange", "")
+    for code, count in zip(codes.tolist(), counts.tolist()):
         label = EXCHANGE_LABELS.get(code, f"Exchange-{code or 'Unknown'}")
-        exchange_breakdown[label] = exchange_breakdown.get(label, 0) + 1
+        exchange_breakdown[label] = exchange_breakdown.get(label, 0) + count
 
+    meta = snapshot["meta"]
     stats = {
-        "raw_rows": len(rows),
+        "raw_rows": int(sum(meta.get("raw_rows", {}).values())),
         "selected_universe": len(symbols),
         "include_etf": include_etf,
         "exchange_breakdown": exchange_breakdown,
+        "source": source,
+        "session": meta.get("session"),
+        "listing_changes": meta.get("listing_changes", {"added": [], "removed": []}),
     }
     return symbols, stats
 
 
+def _fallback_universe(max_symbols: int, include_etf: bool) -> Tuple[List[str], Dict[str, Any]]:
+    logger.warning("Failed to load NASDAQ Trader universe. Using fallback universe.")
+    fallback = sorted(FALLBACK_UNIVERSE)
+    if max_symbols > 0:
+        fallback = fallback[:max_symbols]
+    return fallback, {
+        "raw_rows": 0,
+        "selected_universe": len(fallback),
+        "include_etf": include_etf,
+        "exchange_breakdown": {"Fallback Mixed": len(fallback)},
+    }
+
+
+def _build_universe_table(
+    loaded: List[Optional[List[Dict[str, str]]]],
+    snapshot: Optional[Dict[str, Any]],
+) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    """合并各数据源的行；未变化（None）或下载失败（空）的数据源沿用上一份快照。"""
+    previous_raw = snapshot["meta"].get("raw_rows", {}) if snapshot else {}
+    parts: List[Dict[str, np.ndarray]] = []
+    raw_counts: Dict[str, int] = {}
+
+    for source_id, rows in enumerate(loaded):
+        key = str(source_id)
+        if not rows:
+            if snapshot is not None:
+                table = snapshot["table"]
+                keep = table["source"] == source_id
+                parts.append({name: values[keep] for name, values in table.items()})
+                raw_counts[key] = int(previous_raw.get(key, 0))
+            continue
+
+        raw_counts[key] = len(rows)
+        symbols: List[str] = []
+        exchanges: List[str] = []
+        etfs: List[bool] = []
+        for row in rows:
+            symbol = _normalize_symbol(str(row.get("symbol", "")))
+            if not _is_valid_symbol(symbol):
+                continue
+            symbols.append(symbol)
+            exchanges.append(str(row.get("exchange", "Q")).upper() or "Q")
+            etfs.append(str(row.get("etf", "N")).upper() == "Y")
+        parts.append(
+            {
+                "symbols": np.array(symbols, dtype=SNAPSHOT_SYMBOL_DTYPE),
+                "exchange": np.array(exchanges, dtype="U2"),
+                "etf": np.array(etfs, dtype=bool),
+                "source": np.full(len(symbols), source_id, dtype=np.int8),
+            }
+        )
+
+    if not parts:
+        return {name: np.empty(0) for name in SNAPSHOT_ARRAYS}, raw_counts
+
+    merged = {name: np.concatenate([part[name] for part in parts]) for name in SNAPSHOT_ARRAYS}
+    # np.unique 返回每个代码首次出现的位置，保持"先出现的数据源优先"，同时按代码排序
+    _, first = np.unique(merged["symbols"], return_index=True)
+    return {name: values[first] for name, values in merged.items()}, raw_counts
+
+
+def _snapshot_paths() -> Tuple[Path, Path]:
+    root = provider_cache_dir("universe")
+    return root / "universe.npz", root / "universe.json"
+
+
+def _read_universe_meta() -> Dict[str, Any]:
+    """快照元数据；没有可用的数组快照时返回空字典（此时也不能发条件请求）。"""
+    array_path, meta_path = _snapshot_paths()
+    if not array_path.exists() or not meta_path.exists():
+        return {}
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _read_universe_snapshot() -> Optional[Dict[str, Any]]:
+    meta = _read_universe_meta()
+    if not meta:
+        return None
+    array_path, _ = _snapshot_paths()
+    try:
+        with np.load(array_path) as data:
+            table = {name: data[name] for name in SNAPSHOT_ARRAYS}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable universe snapshot: {e}")
+        return None
+    return {"table": table, "meta": meta}
+
+
+def _write_universe_snapshot(
+    table: Dict[str, np.ndarray],
+    raw_counts: Dict[str, int],
+    session: str,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    validators = dict(previous["meta"].get("validators", {})) if previous else {}
+    validators.update(_fresh_validators)
+    changes = {"added": [], "removed": []}
+    if previous is not None:
+        old = previous["table"]["symbols"]
+        changes = {
+            "added": np.setdiff1d(table["symbols"], old).tolist(),
+            "removed": np.setdiff1d(old, table["symbols"]).tolist(),
+        }
+        if changes["added"] or changes["removed"]:
+            logger.info(
+                f"Universe listings changed: +{len(changes['added'])} -{len(changes['removed'])}"
+            )
+
+    meta = {
+        "session": session,
+        "updated_at": time.time(),
+        "raw_rows": raw_counts,
+        "validators": validators,
+        "listing_changes": changes,
+    }
+    array_path, meta_path = _snapshot_paths()
+    tag = f"{os.getpid()}-{threading.get_ident()}"
+    tmp_array = array_path.with_suffix(f".npz.{tag}.tmp")
+    with open(tmp_array, "wb") as fh:
+        np.savez(fh, **table)
+    os.replace(tmp_array, array_path)
+    tmp_meta = meta_path.with_suffix(f".json.{tag}.tmp")
+    tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp_meta, meta_path)
+    _fresh_validators.clear()
+    return {"table": table, "meta": meta}
+
+
 def prefilter_universe(
     symbols: List[str],
     top_k: int = 120,
@@ -97,77 +257,196 @@ def prefilter_universe(
     min_dollar_volume: float = 20_000_000,
 ) -> List[Dict]:
     """对候选池做轻量预筛（价格/流动性/动量）。"""
-    if not symbols:
-        return []
+    prefiltered, _ = prefilter_universe_with_stats(
+        symbols, top_k=top_k, min_price=min_price, min_dollar_volume=min_dollar_volume
+    )
+    return prefiltered
 
-    chunk_size = 120
-    prefiltered: List[Dict] = []
-
-    for i in range(0, len(symbols), chunk_size):
-        chunk = symbols[i : i + chunk_size]
-        yf_symbols = [_to_yf_symbol(s) for s in chunk]
-        try:
-            raw = yf.download(
-                tickers=" ".join(yf_symbols),
-                period="3mo",
-                interval="1d",
-                auto_adjust=False,
-                group_by="ticker",
-                progress=False,
-                threads=True,
-            )
-        except Exception as e:
-            logger.warning(f"Prefilter download failed for chunk {i // chunk_size + 1}: {e}")
-            continue
 
-        for symbol in chunk:
-            ysym = _to_yf_symbol(symbol)
-            hist = _extract_hist(raw, ysym)
-            if hist is None or hist.empty or len(hist) < 25:
-                continue
-
-            close = hist.get("Close")
-            volume = hist.get("Volume")
-            if close is None or volume is None:
-                continue
-            close = close.dropna()
-            volume = volume.dropna()
-            if close.empty or volume.empty or len(close) < 25 or len(volume) < 25:
-                continue
+def prefilter_universe_with_stats(
+    symbols: List[str],
+    top_k: int = 120,
+    min_price: float = 3.0,
+    min_dollar_volume: float = 20_000_000,
+    chunk_size: int = 120,
+    max_workers: Optional[int] = None,
+) -> Tuple[List[Dict], Dict[str, Any]]:
+    """并发分块下载并预筛，返回 (结果, 扫描统计)。
+
+    分块大小按实际耗时与失败情况自适应；失败的分块对半拆分后重试。
+    """
+    started = time.perf_counter()
+    stats: Dict[str, Any] = {"chunks": [], "failed_symbols": [], "seconds": 0.0}
+    if not symbols:
+        return [], stats
+
+    workers = max_workers or int(os.getenv("PREFILTER_WORKERS", str(PREFILTER_WORKERS)))
+    sizer = _ChunkSizer(chunk_size)
+    store = get_bar_store()
+    retries: deque = deque()
+    cursor = 0
+    in_flight: Dict[Any, Tuple[List[str], int]] = {}
+    scored: List[Dict[str, np.ndarray]] = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while cursor < len(symbols) or retries or in_flight:
+            while len(in_flight) < workers and (retries or cursor < len(symbols)):
+                if retries:
+                    chunk, attempt = retries.popleft()
+                else:
+                    chunk = symbols[cursor : cursor + sizer.size]
+                    cursor += len(chunk)
+                    attempt = 0
+                in_flight[pool.submit(_timed_load, store, chunk)] = (chunk, attempt)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk, attempt = in_flight.pop(future)
+                histories, seconds, error = future.result()
+                if error is None and not histories and len(chunk) >= PREFILTER_MIN_CHUNK:
+                    error = "empty download"
+                stats["chunks"].append(
+                    {"size": len(chunk), "attempt": attempt, "seconds": round(seconds, 3), "ok": error is None}
+                )
+
+                if error is not None:
+                    sizer.record_failure()
+                    logger.warning(f"Prefilter chunk of {len(chunk)} failed (attempt {attempt + 1}): {error}")
+                    if len(chunk) > PREFILTER_MIN_CHUNK:
+                        middle = len(chunk) // 2
+                        retries.extend([(chunk[:middle], attempt + 1), (chunk[middle:], attempt + 1)])
+                    elif attempt < PREFILTER_MAX_ATTEMPTS:
+                        retries.append((chunk, attempt + 1))
+                    else:
+                        stats["failed_symbols"].extend(chunk)
+                    continue
+
+                sizer.record_success(len(chunk), seconds)
+                scored.append(_score_prefilter_panel(histories, min_price, min_dollar_volume))
+
+    # 分块并发完成顺序不定，按代码排序打破同分，与原先按候选池顺序扫描的结果一致
+    prefiltered = _select_top_prefiltered(scored, top_k)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["final_chunk_size"] = sizer.size
+    return prefiltered, stats
+
+
+class _ChunkSizer:
+    """根据单块耗时与失败率调整分块大小。"""
+
+    def __init__(self, initial: int):
+        self.size = min(max(initial, PREFILTER_MIN_CHUNK), PREFILTER_MAX_CHUNK)
+
+    def record_success(self, chunk_len: int, seconds: float) -> None:
+        if chunk_len < self.size:
+            return
+        ratio = PREFILTER_TARGET_SECONDS / max(seconds, 1e-3)
+        ratio = min(max(ratio, 0.5), 1.5)
+        self.size = int(min(max(self.size * ratio, PREFILTER_MIN_CHUNK), PREFILTER_MAX_CHUNK))
+
+    def record_failure(self) -> None:
+        self.size = max(self.size // 2, PREFILTER_MIN_CHUNK)
+
+
+def _timed_load(store, chunk: List[str]) -> Tuple[Dict, float, Optional[str]]:
+    started = time.perf_counter()
+    try:
+        histories = store.load(chunk, period="3mo", strict=True)
+        return histories, time.perf_counter() - started, None
+    except Exception as e:
+        return {}, time.perf_counter() - started, str(e)
 
-            price = float(close.iloc[-1])
-            avg_dollar_volume_20 = float((close.tail(20) * volume.tail(20)).mean())
-            if price < min_price or avg_dollar_volume_20 < min_dollar_volume:
-                continue
 
-            ret20 = (float(close.iloc[-1]) / float(close.iloc[-21]) - 1) if len(close) >= 21 else 0.0
-            ret5 = (float(close.iloc[-1]) / float(close.iloc[-6]) - 1) if len(close) >= 6 else 0.0
-            vol20 = float(close.pct_change().dropna().tail(20).std() * 100) if len(close) >= 21 else 0.0
+def _score_prefilter_panel(
+    histories: Dict[str, pd.DataFrame], min_price: float, min_dollar_volume: float
+) -> Dict[str, np.ndarray]:
+    """对一块K线做整体向量化打分，返回通过价格/流动性过滤的股票及其指标数组。"""
+    histories = {
+        s: h for s, h in histories.items()
+        if h is not None and len(h) >= PREFILTER_MIN_BARS and "Close" in h.columns and "Volume" in h.columns
+    }
+    if not histories:
+        return {name: np.empty(0) for name in PREFILTER_METRICS}
+
+    # 只取打分需要的最近 21 根收盘价/成交量，按最新一根右对齐成 (bars × symbols) 面板
+    symbols = list(histories)
+    close = np.full((PREFILTER_LOOKBACK, len(symbols)), np.nan)
+    volume = np.full((PREFILTER_LOOKBACK, len(symbols)), np.nan)
+    bar_counts = np.zeros(len(symbols), dtype=int)
+    for j, symbol in enumerate(symbols):
+        c = histories[symbol]["Close"].to_numpy(dtype=float, na_value=np.nan)
+        v = histories[symbol]["Volume"].to_numpy(dtype=float, na_value=np.nan)
+        bar_counts[j] = min(np.count_nonzero(~np.isnan(c)), np.count_nonzero(~np.isnan(v)))
+        close[:, j] = c[-PREFILTER_LOOKBACK:]
+        volume[:, j] = v[-PREFILTER_LOOKBACK:]
+
+    price = close[-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_dollar_volume_20 = np.nanmean(close[-20:] * volume[-20:], axis=0)
+        ret20 = close[-1] / close[-21] - 1
+        ret5 = close[-1] / close[-6] - 1
+        vol20 = np.std(close[1:] / close[:-1] - 1, axis=0, ddof=1) * 100
+
+    mask = (
+        (bar_counts >= PREFILTER_MIN_BARS)
+        & (price >= min_price)
+        & (avg_dollar_volume_20 >= min_dollar_volume)
+        & np.isfinite(ret20)
+        & np.isfinite(ret5)
+        & np.isfinite(vol20)
+    )
+    score = (
+        ret20 * 100 * 0.55
+        + ret5 * 100 * 0.25
+        + np.minimum(avg_dollar_volume_20 / 100_000_000, 10) * 0.20
+        - np.maximum(vol20 - 4.5, 0) * 0.6
+    )
+    metrics = {
+        "symbol": np.array(symbols, dtype=object),
+        "price": price,
+        "avg_dollar_volume_20": avg_dollar_volume_20,
+        "ret20": ret20,
+        "ret5": ret5,
+        "vol20": vol20,
+        "score": score,
+    }
+    return {name: values[mask] for name, values in metrics.items()}
 
-            score = (
-                ret20 * 100 * 0.55
-                + ret5 * 100 * 0.25
-                + min(avg_dollar_volume_20 / 100_000_000, 10) * 0.20
-                - max(vol20 - 4.5, 0) * 0.6
-            )
 
-            prefiltered.append(
-                {
-                    "symbol": symbol,
-                    "price": round(price, 2),
-                    "avg_dollar_volume_20": round(avg_dollar_volume_20, 2),
-                    "ret20_pct": round(ret20 * 100, 2),
-                    "ret5_pct": round(ret5 * 100, 2),
-                    "vol20_pct": round(vol20, 2),
-                    "prefilter_score": round(score, 4),
-                }
-            )
+def _select_top_prefiltered(parts: List[Dict[str, np.ndarray]], top_k: int) -> List[Dict]:
+    """合并各块打分结果，用 argpartition 取前 top_k，同分按代码排序。"""
+    if not parts:
+        return []
+    merged = {name: np.concatenate([part[name] for part in parts]) for name in PREFILTER_METRICS}
+    count = len(merged["score"])
+    if count == 0 or top_k <= 0:
+        return []
 
-    prefiltered.sort(key=lambda x: x["prefilter_score"], reverse=True)
-    return prefiltered[:top_k]
+    rounded = np.round(merged["score"], 4)
+    if top_k < count:
+        chosen = np.argpartition(-rounded, top_k - 1)[:top_k]
+        # 第 k 名处可能有并列，把并列项全部纳入后再按代码排序截断
+        cutoff = rounded[chosen].min()
+        chosen = np.flatnonzero(rounded >= cutoff)
+    else:
+        chosen = np.arange(count)
+    order = chosen[np.lexsort((merged["symbol"][chosen].astype(str), -rounded[chosen]))][:top_k]
+
+    return [
+        {
+            "symbol": str(merged["symbol"][i]),
+            "price": round(float(merged["price"][i]), 2),
+            "avg_dollar_volume_20": round(float(merged["avg_dollar_volume_20"][i]), 2),
+            "ret20_pct": round(float(merged["ret20"][i]) * 100, 2),
+            "ret5_pct": round(float(merged["ret5"][i]) * 100, 2),
+            "vol20_pct": round(float(merged["vol20"][i]), 2),
+            "prefilter_score": round(float(merged["score"][i]), 4),
+        }
+        for i in order
+    ]
 
 
-def _load_nasdaq_listed_rows() -> List[Dict[str, str]]:
+def _load_nasdaq_listed_rows() -> Optional[List[Dict[str, str]]]:
     return _load_pipe_text_rows(
         NASDAQ_LISTED_URL,
         symbol_keys=("Symbol",),
@@ -177,7 +456,7 @@ def _load_nasdaq_listed_rows() -> List[Dict[str, str]]:
     )
 
 
-def _load_other_listed_rows() -> List[Dict[str, str]]:
+def _load_other_listed_rows() -> Optional[List[Dict[str, str]]]:
     return _load_pipe_text_rows(
         OTHER_LISTED_URL,
         symbol_keys=("NASDAQ Symbol", "CQS Symbol", "ACT Symbol"),
@@ -193,15 +472,19 @@ def _load_pipe_text_rows(
     exchange_keys: Tuple[str, ...],
     extra_filter=None,
     default_exchange: str = "",
-) -> List[Dict[str, str]]:
+) -> Optional[List[Dict[str, str]]]:
+    """下载并解析 NASDAQ Trader 管道分隔文件；服务端返回 304 时为 None。"""
+    cached = _read_universe_meta().get("validators", {}).get(url, {})
     try:
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
+        listing = get_market_data_provider().fetch_listing(url, validators=cached)
     except Exception as e:
         logger.warning(f"Failed to fetch universe source {url}: {e}")
         return []
+    if listing is None:
+        return None
 
-    lines = [line.strip() for line in resp.text.splitlines() if line.strip()]
+    _fresh_validators[url] = listing.validators
+    lines = [line.strip() for line in listing.text.splitlines() if line.strip()]
     if len(lines) < 2:
         return []
 
@@ -255,21 +538,3 @@ def _normalize_symbol(symbol: str) -> str:
         symbol = symbol.replace(".", "-")
     return symbol
 
-
-def _to_yf_symbol(symbol: str) -> str:
-    return symbol.replace(".", "-").upper()
-
-
-def _extract_hist(raw, ysym: str):
-    if raw is None or getattr(raw, "empty", True):
-        return None
-
-    # Multi ticker: level 0 is ticker when group_by=ticker
-    if hasattr(raw, "columns") and getattr(raw.columns, "nlevels", 1) > 1:
-        level0 = set(raw.columns.get_level_values(0))
-        if ysym in level0:
-            return raw[ysym]
-        return None
-
-    # Single ticker fallback
-    return raw
@@ -165,6 +165,16 @@ class Database:
                 )
             """)
 
+            # 增量技术指标状态表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS indicator_states (
+                    symbol TEXT PRIMARY KEY,
+                    last_date TEXT,
+                    state TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
             # 创建索引
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_prices_symbol ON stock_prices(symbol)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_prices_time ON stock_prices(fetched_at)")
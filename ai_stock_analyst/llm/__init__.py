@@ -5,7 +5,23 @@ LLM包初始化
 """
 from .base import BaseLLM
 from .bailian import BailianLLM
+from .cache import LLMResponseCache, get_llm_cache
 from .gemini import GeminiLLM
-from .router import LLMRouter, get_llm_router
+from .limiter import LLMBudgetExceeded, LLMRateLimiter, get_llm_limiter
+from .router import LLMRouter, get_llm_router, set_llm_router
+from .stub import StubLLMRouter
 
-__all__ = ["BaseLLM", "BailianLLM", "GeminiLLM", "LLMRouter", "get_llm_router"]
+__all__ = [
+    "BaseLLM",
+    "BailianLLM",
+    "GeminiLLM",
+    "LLMBudgetExceeded",
+    "LLMRateLimiter",
+    "LLMResponseCache",
+    "LLMRouter",
+    "StubLLMRouter",
+    "get_llm_cache",
+    "get_llm_limiter",
+    "get_llm_router",
+    "set_llm_router",
+]
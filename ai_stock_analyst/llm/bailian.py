@@ -27,11 +27,12 @@ class BailianLLM(BaseLLM):
         self.base_url = self.ENDPOINTS.get(self.region, self.ENDPOINTS["singapore"])
         self.available = bool(self.api_key)
         self._client = None
+        self._configure_limits("bailian")
         
         if self.available:
             try:
                 from openai import OpenAI
-                self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+                self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=self.timeout)
                 logger.info(f"Bailian initialized: {self.model} @ {self.region}")
             except Exception as e:
                 logger.error(f"Failed to init Bailian: {e}")
@@ -52,16 +53,57 @@ class BailianLLM(BaseLLM):
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            
-            return {
-                "content": response.choices[0].message.content,
-                "model": self.model,
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            }
+            return self._to_result(response)
         except Exception as e:
             logger.error(f"Bailian API error: {e}")
             raise
+
+    async def _achat(self, messages: List[Dict], temperature: float = 0.3,
+                     max_tokens: int = 2000) -> Dict:
+        if not self.is_available():
+            raise Exception("Bailian not available")
+
+        state = self._loop_state()
+        if "client" not in state:
+            state["client"] = self._create_async_client()
+        try:
+            response = await state["client"].chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return self._to_result(response)
+        except Exception as e:
+            logger.error(f"Bailian async API error: {e}")
+            raise
+
+    def _create_async_client(self):
+        """AsyncOpenAI + 长连接池，连接数与并发上限一致"""
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http_client=DefaultAsyncHttpxClient(limits=limits, timeout=self.timeout),
+        )
+
+    async def _close_async_client(self, client) -> None:
+        await client.close()
+
+    def _to_result(self, response) -> Dict:
+        return {
+            "content": response.choices[0].message.content,
+            "model": self.model,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens
+            }
+        }
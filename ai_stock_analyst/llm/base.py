@@ -1,19 +1,67 @@
 """
 LLM基类定义
 """
+import asyncio
+import os
+import weakref
 from abc import ABC, abstractmethod
 from typing import Dict, List
 
+# 异步调用时每个提供商同时在途的请求上限与单次请求超时（秒），可按提供商用 <名称>_MAX_CONCURRENCY 覆盖
+LLM_MAX_CONCURRENCY = 8
+LLM_TIMEOUT = 60.0
+
 
 class BaseLLM(ABC):
     """LLM基类 - 定义通用接口"""
-    
+
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+    timeout: float = LLM_TIMEOUT
+
     @abstractmethod
     def chat(self, messages: List[Dict], **kwargs) -> Dict:
         """发送对话请求并返回结果"""
         pass
-    
+
     @abstractmethod
     def is_available(self) -> bool:
         """检查LLM是否可用"""
         pass
+
+    async def achat(self, messages: List[Dict], **kwargs) -> Dict:
+        """异步对话：受本提供商的并发信号量限制，超过 timeout 抛 asyncio.TimeoutError"""
+        async with self._loop_state()["semaphore"]:
+            return await asyncio.wait_for(self._achat(messages, **kwargs), self.timeout)
+
+    async def _achat(self, messages: List[Dict], **kwargs) -> Dict:
+        """默认在线程中执行同步 chat；有原生异步客户端的子类覆盖"""
+        return await asyncio.to_thread(self.chat, messages, **kwargs)
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环上的异步客户端（连接池）"""
+        client = self._loop_state().pop("client", None)
+        if client is not None:
+            await self._close_async_client(client)
+
+    async def _close_async_client(self, client) -> None:
+        pass
+
+    def _configure_limits(self, name: str) -> None:
+        """从环境变量读取并发上限与超时"""
+        default = os.getenv("LLM_MAX_CONCURRENCY", str(LLM_MAX_CONCURRENCY))
+        self.max_concurrency = max(1, int(os.getenv(f"{name.upper()}_MAX_CONCURRENCY", default)))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", str(LLM_TIMEOUT)))
+
+    def _loop_state(self) -> Dict:
+        """
+        当前事件循环专用的状态（信号量、异步客户端）
+
+        信号量和 HTTP 连接池都绑定创建时的事件循环，按循环分别保存，
+        多次 asyncio.run 之间不会复用已关闭循环上的对象。
+        """
+        loop = asyncio.get_running_loop()
+        states = self.__dict__.setdefault("_loop_states", weakref.WeakKeyDictionary())
+        state = states.get(loop)
+        if state is None:
+            state = states[loop] = {"semaphore": asyncio.Semaphore(self.max_concurrency)}
+        return state
@@ -0,0 +1,176 @@
+"""
+LLM 回复缓存
+
+同一只股票在同一天用相同输入重跑（工作流重试、部分失败后补跑、多个用户关注同一股票）时，
+Agent 发出的提示词完全相同。以 提供商 + 模型 + 温度 + 最大输出 + 全部消息 的哈希为键，
+把回复缓存到 SQLite：超过 TTL 视为过期，条目数超过上限时按最近使用时间淘汰最旧的。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ai_stock_analyst.config import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_TTL = 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 20000
+
+
+def fingerprint(provider: str, model: str, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+    """请求指纹；system/user 等消息按顺序全部参与哈希"""
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "messages": [[m.get("role", ""), m.get("content", "")] for m in messages],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """带 TTL 与 LRU 上限的 LLM 回复缓存"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.path = Path(path) if path else get_cache_dir() / "llm_responses.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if ttl is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL_HOURS", str(LLM_CACHE_TTL / 3600))) * 3600
+        self.ttl = ttl
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", str(LLM_CACHE_MAX_ENTRIES)))
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "saved_tokens": 0}
+        self._init_db()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """返回缓存的 {content, model, usage}；不存在或已过期时返回 None"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content, model, usage, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[3] <= self.ttl:
+                conn.execute("UPDATE llm_responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+
+        if row is None or now - row[3] > self.ttl:
+            self._count("misses")
+            return None
+
+        usage = json.loads(row[2]) if row[2] else {}
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["saved_tokens"] += int(usage.get("total_tokens", 0) or 0)
+        return {"content": row[0], "model": row[1], "usage": usage}
+
+    def put(self, key: str, provider: str, result: Dict) -> None:
+        if not result.get("content"):
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_responses (key, provider, model, content, usage, created_at, last_used, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (
+                    key,
+                    provider,
+                    result.get("model", ""),
+                    result["content"],
+                    json.dumps(result.get("usage") or {}),
+                    now,
+                    now,
+                ),
+            )
+            evicted = self._evict(conn, now)
+        with self._lock:
+            self._stats["writes"] += 1
+            self._stats["evictions"] += evicted
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        with self._connect() as conn:
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return stats
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_responses")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        """删除过期条目，再按 last_used 只保留最近的 max_entries 条"""
+        expired = conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+        overflow = conn.execute(
+            """
+            DELETE FROM llm_responses WHERE key IN (
+                SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,),
+        ).rowcount
+        return expired + overflow
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT,
+                    content TEXT NOT NULL,
+                    usage TEXT,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+# 全局实例（延迟初始化）
+_llm_cache = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """获取LLM回复缓存实例（单例）；LLM_CACHE_ENABLED=false 时返回 None"""
+    global _llm_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
@@ -17,11 +17,12 @@ class GeminiLLM(BaseLLM):
         self.model = os.getenv("GEMINI_MODEL", "gemini-3-pro-preview")
         self.available = bool(self.api_key)
         self._client = None
+        self._configure_limits("gemini")
 
         if self.available:
             try:
                 from google import genai
-                self._client = genai.Client(api_key=self.api_key)
+                self._client = genai.Client(api_key=self.api_key, http_options={"timeout": int(self.timeout * 1000)})
                 logger.info(f"Gemini initialized: {self.model}")
             except Exception as e:
                 logger.error(f"Failed to init Gemini: {e}")
@@ -47,15 +48,60 @@ class GeminiLLM(BaseLLM):
                 }
             )
 
-            return {
-                "content": response.text,
-                "model": self.model,
-                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
-            }
+            return self._to_result(response)
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
             raise
 
+    async def _achat(self, messages: List[Dict], temperature: float = 0.3,
+                     max_tokens: int = 2000) -> Dict:
+        if not self.is_available():
+            raise Exception("Gemini not available")
+
+        state = self._loop_state()
+        if "client" not in state:
+            state["client"] = self._create_async_client()
+        try:
+            response = await state["client"].aio.models.generate_content(
+                model=self.model,
+                contents=self._convert_messages(messages),
+                config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                }
+            )
+            return self._to_result(response)
+        except Exception as e:
+            logger.error(f"Gemini async API error: {e}")
+            raise
+
+    def _create_async_client(self):
+        """单独的 genai.Client，aio 接口走带连接上限的 httpx 异步连接池"""
+        import httpx
+        from google import genai
+
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        return genai.Client(
+            api_key=self.api_key,
+            http_options={
+                "timeout": int(self.timeout * 1000),
+                "httpx_async_client": httpx.AsyncClient(limits=limits, timeout=self.timeout),
+            },
+        )
+
+    async def _close_async_client(self, client) -> None:
+        await client.aio.aclose()
+
+    def _to_result(self, response) -> Dict:
+        return {
+            "content": response.text,
+            "model": self.model,
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
     def _convert_messages(self, messages: List[Dict]) -> str:
         """将消息列表转换为字符串格式"""
         parts = []
@@ -0,0 +1,235 @@
+"""
+LLM 限流与本次运行的 token 预算
+
+- 每个提供商两个令牌桶：每分钟请求数（RPM）与每分钟 token 数（TPM），容量为一分钟的额度。
+  发请求前按 提示词估算 + max_tokens 预占，桶可以透支，透支部分换算成等待时间：
+  预占在锁内按到达顺序记账，先到的请求先轮到，后到的排在其后（同步调用 sleep，异步调用 await sleep）。
+  返回后用 usage 中的实际 token 数修正预占量（没有 usage 时按回复长度估算）。
+- 预算：整个进程（一次运行）累计 token 上限，已用 + 在途预占 超出时抛 LLMBudgetExceeded，
+  Agent 捕获异常后走各自的规则兜底（_rule_based_signal / _fallback），不会中断分析。
+上限为 0 表示不限制。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBudgetExceeded(Exception):
+    """本次运行的 LLM token 预算已用完"""
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：ASCII 约 4 字符一个 token，中文等非 ASCII 字符按一字一个计"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+class TokenBucket:
+    """按分钟速率匀速补充的令牌桶，允许透支（透支量即排队长度）；非线程安全，由调用方加锁"""
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def reserve(self, amount: float) -> float:
+        """扣除 amount，返回需要等待的秒数（桶未透支时为 0）"""
+        self._refill()
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float) -> None:
+        """退回（amount 为负时补扣）预占量"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class ProviderLimiter:
+    """单个提供商的 RPM/TPM 限流"""
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, clock=time.monotonic):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm, clock) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm, clock) if tpm > 0 else None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "tokens": 0, "throttled": 0, "wait_seconds": 0.0}
+
+    def reserve(self, tokens: int) -> float:
+        """原子地预占一次请求与 tokens 个 token，返回需要等待的秒数"""
+        with self._lock:
+            wait = 0.0
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens))
+            self._stats["requests"] += 1
+            if wait > 0:
+                self._stats["throttled"] += 1
+                self._stats["wait_seconds"] += wait
+        return wait
+
+    def acquire(self, tokens: int) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(f"LLM rate limit ({self.name}): waiting {wait:.1f}s")
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(f"LLM rate limit ({self.name}): waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """用实际 token 数修正预占"""
+        with self._lock:
+            if self._tokens is not None:
+                self._tokens.refund(reserved - actual)
+            self._stats["tokens"] += actual
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 2)
+        return stats
+
+
+class TokenBudget:
+    """整次运行的 token 上限；limit <= 0 时不限制"""
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self.used = 0
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> None:
+        with self._lock:
+            if self.limit > 0 and self.used + self.pending + tokens > self.limit:
+                self.rejected += 1
+                if self.rejected == 1:
+                    logger.warning(f"LLM token budget exhausted ({self.used}/{self.limit}); agents fall back to rules")
+                raise LLMBudgetExceeded(f"LLM token budget exhausted: {self.used}/{self.limit} used")
+            self.pending += tokens
+
+    def settle(self, reserved: int, actual: int) -> None:
+        with self._lock:
+            self.pending -= reserved
+            self.used += actual
+
+    def remaining(self) -> Optional[int]:
+        with self._lock:
+            return max(self.limit - self.used - self.pending, 0) if self.limit > 0 else None
+
+
+@dataclass
+class Reservation:
+    """一次请求的预占记录：提供商名称、提示词估算、预占总量（提示词 + max_tokens）"""
+
+    provider: str
+    prompt_tokens: int
+    reserved: int
+
+
+class LLMRateLimiter:
+    """按提供商限流 + 全局预算"""
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        clock=time.monotonic,
+    ):
+        self.rpm = int(os.getenv("LLM_RPM", "0")) if rpm is None else rpm
+        self.tpm = int(os.getenv("LLM_TPM", "0")) if tpm is None else tpm
+        if token_budget is None:
+            token_budget = int(os.getenv("LLM_RUN_TOKEN_BUDGET", "0"))
+        self.budget = TokenBudget(token_budget)
+        self._clock = clock
+        self._providers: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def provider(self, name: str) -> ProviderLimiter:
+        """提供商限流器；<名称>_RPM / <名称>_TPM 覆盖全局默认值"""
+        with self._lock:
+            limiter = self._providers.get(name)
+            if limiter is None:
+                rpm = int(os.getenv(f"{name.upper()}_RPM", str(self.rpm)))
+                tpm = int(os.getenv(f"{name.upper()}_TPM", str(self.tpm)))
+                limiter = self._providers[name] = ProviderLimiter(name, rpm, tpm, self._clock)
+            return limiter
+
+    def acquire(self, name: str, messages: List[Dict], max_tokens: int) -> Reservation:
+        """预算不足时抛 LLMBudgetExceeded（不等待）；否则按限流排队后返回预占记录"""
+        reservation = self._reserve(name, messages, max_tokens)
+        self.provider(name).acquire(reservation.reserved)
+        return reservation
+
+    async def aacquire(self, name: str, messages: List[Dict], max_tokens: int) -> Reservation:
+        reservation = self._reserve(name, messages, max_tokens)
+        try:
+            await self.provider(name).aacquire(reservation.reserved)
+        except BaseException:
+            # 排队期间被取消（如 wait_for 超时）时退回预算
+            self.budget.settle(reservation.reserved, 0)
+            raise
+        return reservation
+
+    def release(self, reservation: Reservation, result: Optional[Dict] = None) -> None:
+        """请求结束后结算：result 为 None 表示请求失败，预算全部退回（限流额度按预占计，不退）"""
+        if result is None:
+            self.budget.settle(reservation.reserved, 0)
+            return
+        usage = result.get("usage") or {}
+        actual = int(usage.get("total_tokens", 0) or 0)
+        if actual <= 0:
+            actual = reservation.prompt_tokens + estimate_tokens(result.get("content") or "")
+        self.budget.settle(reservation.reserved, actual)
+        self.provider(reservation.provider).settle(reservation.reserved, actual)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            providers = dict(self._providers)
+        return {
+            "budget": self.budget.limit,
+            "used_tokens": self.budget.used,
+            "rejected": self.budget.rejected,
+            "providers": {name: limiter.stats() for name, limiter in providers.items()},
+        }
+
+    def _reserve(self, name: str, messages: List[Dict], max_tokens: int) -> Reservation:
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) + 4 for m in messages)
+        reservation = Reservation(name, prompt_tokens, prompt_tokens + int(max_tokens))
+        self.budget.reserve(reservation.reserved)
+        return reservation
+
+
+# 全局实例（延迟初始化）
+_llm_limiter = None
+
+
+def get_llm_limiter() -> LLMRateLimiter:
+    """获取LLM限流器实例（单例，预算按进程即一次运行计）"""
+    global _llm_limiter
+    if _llm_limiter is None:
+        _llm_limiter = LLMRateLimiter()
+    return _llm_limiter
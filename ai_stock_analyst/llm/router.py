@@ -1,26 +1,36 @@
 """
 LLM路由 - 智能切换多个LLM提供商
 """
+import asyncio
 import os
 import logging
-from typing import Dict, List
+import threading
+from typing import Dict, List, Optional
 from .base import BaseLLM
 from .bailian import BailianLLM
+from .cache import LLMResponseCache, fingerprint, get_llm_cache
 from .gemini import GeminiLLM
+from .limiter import LLMBudgetExceeded, LLMRateLimiter, get_llm_limiter
 
 logger = logging.getLogger(__name__)
 
+# 与各提供商 chat() 的默认参数一致，未显式传入时也参与缓存键
+DEFAULT_TEMPERATURE = 0.3
+DEFAULT_MAX_TOKENS = 2000
+
 
 class LLMRouter:
-    """LLM路由器 - 自动failover"""
+    """LLM路由器 - 自动failover，相同请求命中回复缓存时不再调用提供商，实际请求按提供商限流并计入运行预算"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMResponseCache] = None, limiter: Optional[LLMRateLimiter] = None):
         self.providers = {
             "bailian": BailianLLM(),
             "gemini": GeminiLLM(),
         }
         self.primary = os.getenv("LLM_PRIMARY", "bailian")
         self.fallback = os.getenv("LLM_FALLBACK", "gemini")
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.limiter = limiter if limiter is not None else get_llm_limiter()
     
     def chat(self, messages: List[Dict], **kwargs) -> Dict:
         """发送消息，自动failover"""
@@ -28,9 +38,9 @@ class LLMRouter:
         if primary_llm and primary_llm.is_available():
             try:
                 logger.info(f"Using primary LLM: {self.primary}")
-                result = primary_llm.chat(messages, **kwargs)
-                result["provider"] = self.primary
-                return result
+                return self._chat(self.primary, primary_llm, messages, **kwargs)
+            except LLMBudgetExceeded:
+                raise
             except Exception as e:
                 logger.warning(f"Primary LLM {self.primary} failed: {e}")
         
@@ -43,23 +53,125 @@ class LLMRouter:
         if fallback_llm and fallback_llm.is_available():
             try:
                 logger.info(f"Falling back to: {self.fallback}")
-                result = fallback_llm.chat(messages, **kwargs)
-                result["provider"] = self.fallback
-                return result
+                return self._chat(self.fallback, fallback_llm, messages, **kwargs)
             except Exception as e:
                 logger.error(f"Fallback LLM {self.fallback} failed: {e}")
                 raise
         
         raise Exception("No LLM provider available")
 
+    async def achat(self, messages: List[Dict], **kwargs) -> Dict:
+        """chat 的异步版本：同一事件循环内的大量请求并发发出，各提供商按自身信号量限流"""
+        primary_llm = self.providers.get(self.primary)
+        if primary_llm and primary_llm.is_available():
+            try:
+                logger.info(f"Using primary LLM: {self.primary}")
+                return await self._achat(self.primary, primary_llm, messages, **kwargs)
+            except LLMBudgetExceeded:
+                raise
+            except Exception as e:
+                logger.warning(f"Primary LLM {self.primary} failed: {e!r}")
+
+        if self.fallback == self.primary:
+            logger.error(f"Fallback LLM is same as primary ({self.fallback}), skipping")
+            raise Exception(f"LLM {self.primary} failed and no alternative configured")
+
+        fallback_llm = self.providers.get(self.fallback)
+        if fallback_llm and fallback_llm.is_available():
+            try:
+                logger.info(f"Falling back to: {self.fallback}")
+                return await self._achat(self.fallback, fallback_llm, messages, **kwargs)
+            except Exception as e:
+                logger.error(f"Fallback LLM {self.fallback} failed: {e!r}")
+                raise
+
+        raise Exception("No LLM provider available")
+
+    async def aclose(self) -> None:
+        """关闭各提供商在当前事件循环上的异步连接池"""
+        for llm in self.providers.values():
+            await llm.aclose()
+
+    def _chat(self, name: str, llm: BaseLLM, messages: List[Dict], **kwargs) -> Dict:
+        """
+        调用单个提供商，先查回复缓存；cached 字段标记结果是否来自缓存
+
+        缓存未命中时先向限流器预占（预算不足抛 LLMBudgetExceeded，超出 RPM/TPM 时排队等待），
+        返回后按 usage 结算。
+        """
+        key = self._cache_key(name, llm, messages, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"LLM cache hit ({name})")
+                return {**cached, "provider": name, "cached": True}
+
+        reservation = self.limiter.acquire(name, messages, kwargs.get("max_tokens", DEFAULT_MAX_TOKENS))
+        try:
+            result = llm.chat(messages, **kwargs)
+        except Exception:
+            self.limiter.release(reservation)
+            raise
+        self.limiter.release(reservation, result)
+        result["provider"] = name
+        if key is not None:
+            self.cache.put(key, name, result)
+        result["cached"] = False
+        return result
+
+    async def _achat(self, name: str, llm: BaseLLM, messages: List[Dict], **kwargs) -> Dict:
+        """_chat 的异步版本；SQLite 缓存读写放到线程中，不阻塞事件循环"""
+        key = self._cache_key(name, llm, messages, kwargs)
+        if key is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                logger.info(f"LLM cache hit ({name})")
+                return {**cached, "provider": name, "cached": True}
+
+        reservation = await self.limiter.aacquire(name, messages, kwargs.get("max_tokens", DEFAULT_MAX_TOKENS))
+        try:
+            result = await llm.achat(messages, **kwargs)
+        except BaseException:
+            self.limiter.release(reservation)
+            raise
+        self.limiter.release(reservation, result)
+        result["provider"] = name
+        if key is not None:
+            await asyncio.to_thread(self.cache.put, key, name, result)
+        result["cached"] = False
+        return result
+
+    def _cache_key(self, name: str, llm: BaseLLM, messages: List[Dict], kwargs: Dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return fingerprint(
+            name,
+            getattr(llm, "model", ""),
+            messages,
+            kwargs.get("temperature", DEFAULT_TEMPERATURE),
+            kwargs.get("max_tokens", DEFAULT_MAX_TOKENS),
+        )
+
 
 # 全局实例
 _llm_router = None
+# Agent 在线程池中并行调用时，保证只创建一个路由器（客户端）实例
+_llm_router_lock = threading.Lock()
 
 
 def get_llm_router() -> LLMRouter:
     """获取LLM路由器实例（单例）"""
     global _llm_router
     if _llm_router is None:
-        _llm_router = LLMRouter()
+        with _llm_router_lock:
+            if _llm_router is None:
+                _llm_router = LLMRouter()
     return _llm_router
+
+
+def set_llm_router(router: Optional[LLMRouter]) -> Optional[LLMRouter]:
+    """替换全局路由器（离线回放/测试注入桩实现），返回原实例便于恢复；传 None 则下次按环境变量重新创建"""
+    global _llm_router
+    previous = _llm_router
+    _llm_router = router
+    return previous
@@ -0,0 +1,32 @@
+"""
+桩 LLM 路由器
+
+离线回放与测试时替换全局路由器：不给 responder 时每次调用都抛异常，
+各 Agent 会走各自的规则兜底；给 responder 时按消息返回固定/缓存的回复。
+"""
+from typing import Callable, Dict, List, Optional
+
+Responder = Callable[[List[Dict]], str]
+
+
+class StubLLMRouter:
+    """与 LLMRouter.chat 同接口，不发起任何网络请求"""
+
+    def __init__(self, responder: Optional[Responder] = None):
+        self.responder = responder
+
+    def chat(self, messages: List[Dict], **kwargs) -> Dict:
+        if self.responder is None:
+            raise RuntimeError("LLM disabled (stub router)")
+        return {
+            "content": self.responder(messages),
+            "model": "stub",
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "provider": "stub",
+        }
+
+    async def achat(self, messages: List[Dict], **kwargs) -> Dict:
+        return self.chat(messages, **kwargs)
+
+    async def aclose(self) -> None:
+        pass
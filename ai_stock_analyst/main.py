@@ -5,17 +5,19 @@ import argparse
 import json
 import logging
 import os
-from datetime import datetime
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
 
 from ai_stock_analyst.config import get_settings
 from ai_stock_analyst.database import get_db
-from ai_stock_analyst.data import fetch_stock_price
+from ai_stock_analyst.data import fetch_stock_prices, get_fundamentals_cache
 from ai_stock_analyst.rss import fetch_news, fetch_social
 from ai_stock_analyst.agents import analyze_stock
 from ai_stock_analyst.agents.recommendation import scan_for_opportunities
 from ai_stock_analyst.agents.portfolio_analysis import analyze_portfolio, add_holding, get_holdings
 from ai_stock_analyst.broker import fetch_ibkr_positions
+from ai_stock_analyst.llm import get_llm_cache, get_llm_limiter
 from ai_stock_analyst.notification import get_notification_manager
 
 logging.basicConfig(
@@ -24,6 +26,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 默认逐只分析；GitHub Actions 等场景用 --workers / ANALYSIS_WORKERS 并发
+ANALYSIS_WORKERS = 1
+
 
 def main():
     """主函数"""
@@ -36,12 +41,24 @@ def main():
     parser.add_argument("--discover-prefilter-size", type=int, default=120, help="Discovery: prefilter size")
     parser.add_argument("--discover-final-size", type=int, default=21, help="Discovery: final recommendation size")
     parser.add_argument("--discover-max-news", type=int, default=180, help="Discovery: max news items")
+    parser.add_argument(
+        "--discover-llm",
+        action="store_true",
+        help="Discovery: score the whole shortlist with batched LLM requests (default: env DISCOVER_LLM_SCORING)",
+    )
     parser.add_argument("--portfolio", action="store_true", help="Analyze portfolio holdings")
     parser.add_argument("--add-holding", type=str, help="Add holding: SYMBOL,SHARES,COST")
     parser.add_argument("--list-holdings", action="store_true", help="List all holdings")
     parser.add_argument("--sync-ibkr-holdings", action="store_true", help="Sync holdings from IBKR TWS/Gateway")
     parser.add_argument("--ibkr-check", action="store_true", help="Check IBKR connectivity/auth and print summary")
     parser.add_argument("--strict-ibkr", action="store_true", help="Exit non-zero if IBKR sync fails")
+    parser.add_argument("--refresh-fundamentals", action="store_true", help="Bypass cached fundamentals and refetch")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Symbols analyzed concurrently (default: ANALYSIS_WORKERS or 1)",
+    )
     
     args = parser.parse_args()
     
@@ -106,6 +123,10 @@ def main():
             if not args.portfolio:
                 return
     
+    if args.refresh_fundamentals:
+        # 以下分支（发现/持仓/个股分析）才会拉取行情与基本面
+        get_fundamentals_cache().force_refresh = True
+
     if args.discover:
         logger.info("Discovering trending stocks from news...")
         universe_size = 0 if args.discover_universe_size <= 0 else max(args.discover_universe_size, 200)
@@ -114,6 +135,7 @@ def main():
             universe_size=universe_size,
             prefilter_size=max(args.discover_prefilter_size, 30),
             final_size=max(args.discover_final_size, 5),
+            llm_scoring=True if args.discover_llm else None,
         )
         
         print("\n" + "="*50)
@@ -128,6 +150,12 @@ def main():
                 f"评分: {stats.get('scored', 0)} | "
                 f"最终: {stats.get('final_count', 0)}"
             )
+            llm_stats = stats.get("llm_scoring")
+            if llm_stats:
+                print(
+                    f"LLM评分: {llm_stats['scored']} 只 | 请求: {llm_stats['requests']} 次 | "
+                    f"超预算未评: {llm_stats['skipped']} 只"
+                )
         
         if result.get("recommendations"):
             for idx, rec in enumerate(result["recommendations"], start=1):
@@ -186,58 +214,93 @@ def main():
     logger.info(f"Starting analysis for: {stocks}")
     logger.info(f"Configured notification channels: {configured_channels}")
     
-    results = []
-    
-    for symbol in stocks:
-        symbol = symbol.strip().upper()
-        logger.info(f"\nAnalyzing {symbol}...")
-        
-        try:
-            price_data = fetch_stock_price(symbol)
-            if "error" in price_data:
-                logger.error(f"Failed to fetch {symbol}: {price_data['error']}")
-                continue
-            
-            logger.info(f"  Price: ${price_data.get('current_price', 0)}")
-            
-            news = fetch_news(symbol)
-            social_data = fetch_social(symbol)
-            
-            analysis_data = {
-                'symbol': symbol,
-                'price_data': price_data,
-                'news': [
-                    {
-                        'title': n.title,
-                        'source': n.source,
-                        'summary': n.summary,
-                        'link': n.link,
-                    }
-                    for n in news[:10]
-                ],
-                'social_data': social_data
-            }
-            
-            result = analyze_stock(symbol, analysis_data)
-            results.append(result)
-            
-            signal = result['decision']['signal']
-            logger.info(f"  Signal: {signal}")
-            
-            save_price_data(price_data)
-            save_analysis_result(result)
-            
-            if not args.no_notify and configured_channels:
-                notify_mgr.send_stock_analysis(result)
-            
-        except Exception as e:
-            logger.error(f"Error: {e}")
-            continue
+    stocks = [s.strip().upper() for s in stocks if s.strip()]
+    price_map = fetch_stock_prices(stocks)
+    notify = not args.no_notify and bool(configured_channels)
+    workers = args.workers or int(os.getenv("ANALYSIS_WORKERS", str(ANALYSIS_WORKERS)))
+
+    results = analyze_symbols(stocks, price_map, notify_mgr if notify else None, workers=workers)
     
-    if not args.no_notify and len(results) > 1 and configured_channels:
+    if notify and len(results) > 1:
         notify_mgr.send_batch_analysis(results)
     
     logger.info(f"\nAnalysis complete! Processed {len(results)} stocks.")
+    logger.info(f"Fundamentals cache: {get_fundamentals_cache().stats()}")
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        logger.info(f"LLM cache: {llm_cache.stats()}")
+    logger.info(f"LLM usage: {get_llm_limiter().stats()}")
+
+
+def analyze_symbols(
+    stocks: List[str],
+    price_map: Dict[str, Dict],
+    notify_mgr=None,
+    workers: int = ANALYSIS_WORKERS,
+) -> List[Dict]:
+    """
+    逐只股票执行 抓取新闻/社媒 → 分析 → 入库 → 推送
+
+    workers > 1 时在有界线程池中并发处理，单只股票失败只记录日志、不影响其他股票；
+    返回成功的分析结果，顺序与 stocks 一致。
+    """
+    workers = max(1, min(workers, len(stocks) or 1))
+    if workers == 1:
+        outcomes = [analyze_symbol(symbol, price_map, notify_mgr) for symbol in stocks]
+    else:
+        # 在主线程初始化数据库单例（建表），避免多个线程同时创建
+        get_db()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="symbol") as pool:
+            outcomes = list(pool.map(lambda symbol: analyze_symbol(symbol, price_map, notify_mgr), stocks))
+    return [result for result in outcomes if result is not None]
+
+
+def analyze_symbol(symbol: str, price_map: Dict[str, Dict], notify_mgr=None) -> Optional[Dict]:
+    """单只股票的完整流程；任何异常都在这里捕获，返回 None"""
+    logger.info(f"Analyzing {symbol}...")
+    
+    try:
+        price_data = price_map.get(symbol, {"symbol": symbol, "error": "no data"})
+        if "error" in price_data:
+            logger.error(f"Failed to fetch {symbol}: {price_data['error']}")
+            return None
+        
+        logger.info(f"  {symbol} price: ${price_data.get('current_price', 0)}")
+        
+        news = fetch_news(symbol)
+        social_data = fetch_social(symbol)
+        
+        analysis_data = {
+            'symbol': symbol,
+            'price_data': price_data,
+            'news': [
+                {
+                    'title': n.title,
+                    'source': n.source,
+                    'summary': n.summary,
+                    'link': n.link,
+                }
+                for n in news[:10]
+            ],
+            'social_data': social_data
+        }
+        
+        result = analyze_stock(symbol, analysis_data)
+        
+        signal = result['decision']['signal']
+        logger.info(f"  {symbol} signal: {signal}")
+        
+        save_price_data(price_data)
+        save_news_items(symbol, news[:10])
+        save_analysis_result(result)
+        
+        if notify_mgr is not None:
+            notify_mgr.send_stock_analysis(result)
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error analyzing {symbol}: {e}")
+        return None
 
 
 def save_price_data(data: dict):
@@ -262,6 +325,40 @@ def save_price_data(data: dict):
         logger.error(f"Error saving data: {e}")
 
 
+def save_news_items(symbol: str, news: list):
+    """保存新闻到数据库（按 URL 去重），供历史回放按发布时间取用"""
+    try:
+        db = get_db()
+        with db.get_cursor() as cursor:
+            cursor.executemany(
+                """
+                INSERT OR IGNORE INTO news_articles (symbol, title, summary, url, source, published_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        symbol,
+                        n.title,
+                        n.summary,
+                        n.link,
+                        n.source,
+                        _utc_isoformat(n.published) if n.published else None,
+                    )
+                    for n in news
+                    if n.link
+                ],
+            )
+    except Exception as e:
+        logger.error(f"Error saving news: {e}")
+
+
+def _utc_isoformat(published: datetime) -> str:
+    """新闻发布时间存为带 +00:00 的 ISO 字符串；不带时区的按 UTC 处理（RSS 解析结果即为 UTC）"""
+    if published.tzinfo is None:
+        return published.replace(tzinfo=timezone.utc).isoformat()
+    return published.astimezone(timezone.utc).isoformat()
+
+
 def save_analysis_result(result: dict):
     """保存分析结果到数据库"""
     try:
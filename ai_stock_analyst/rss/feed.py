@@ -129,7 +129,7 @@ class RSSFetcher:
             for entry in feed.entries[:25]:
                 published = self._parse_date(entry)
 
-                if published and published < datetime.now() - timedelta(days=5):
+                if published and published < datetime.utcnow() - timedelta(days=5):
                     continue
 
                 summary_text = entry.get("summary", "")
@@ -141,7 +141,7 @@ class RSSFetcher:
                 item = NewsItem(
                     title=entry.get("title", ""),
                     link=entry.get("link", ""),
-                    published=published or datetime.now(),
+                    published=published or datetime.utcnow(),
                     summary=summary_text,
                     source=source_name,
                 )
@@ -214,18 +214,15 @@ class RSSFetcher:
         return unique_news
 
     def _parse_date(self, entry) -> Optional[datetime]:
+        """发布时间（UTC，不带时区）；feedparser 的 *_parsed 已换算为 UTC"""
         try:
             if hasattr(entry, "published_parsed") and entry.published_parsed:
-                import time
-
-                return datetime.fromtimestamp(time.mktime(entry.published_parsed))
+                return datetime(*entry.published_parsed[:6])
             if hasattr(entry, "updated_parsed") and entry.updated_parsed:
-                import time
-
-                return datetime.fromtimestamp(time.mktime(entry.updated_parsed))
+                return datetime(*entry.updated_parsed[:6])
         except Exception:
-            return datetime.now()
-        return datetime.now()
+            return datetime.utcnow()
+        return datetime.utcnow()
 
     def _clean_html(self, html: str) -> str:
         clean = re.sub("<.*?>", "", html)
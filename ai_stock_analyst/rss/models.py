@@ -7,7 +7,7 @@ from typing import Dict, Optional
 class NewsItem:
     title: str
     link: str
-    published: datetime
+    published: datetime  # UTC，不带时区
     summary: str
     source: str
     symbol: Optional[str] = None
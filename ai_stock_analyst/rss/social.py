@@ -173,14 +173,13 @@ class SocialMediaFetcher:
         }
     
     def _parse_date(self, entry) -> Optional[datetime]:
-        """解析日期"""
+        """解析日期（UTC，不带时区）"""
         try:
             if hasattr(entry, "published_parsed") and entry.published_parsed:
-                import time
-                return datetime.fromtimestamp(time.mktime(entry.published_parsed))
+                return datetime(*entry.published_parsed[:6])
         except:
             pass
-        return datetime.now()
+        return datetime.utcnow()
 
 
 # 便捷函数
@@ -7,26 +7,37 @@
 from __future__ import annotations
 
 import argparse
-import json
-from dataclasses import dataclass
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
 import pandas as pd
-import yfinance as yf
 
-from ai_stock_analyst.data.features import calculate_features
-
-
-@dataclass
-class BacktestMetrics:
-    symbol: str
-    total_return_pct: float
-    benchmark_return_pct: float
-    max_drawdown_pct: float
-    trades: int
-    hit_rate_pct: float
+from ai_stock_analyst.backtest import (
+    BacktestMetrics,
+    BacktestReportWriter,
+    PortfolioConfig,
+    WalkForwardConfig,
+    expand_grid,
+    get_backtest_cache,
+    load_news_history,
+    replay_pipeline,
+    run_backtests,
+    run_portfolio_backtest,
+    run_sweep,
+    run_vectorized_backtest,
+    run_walk_forward,
+    write_portfolio_reports,
+    write_sweep_reports,
+    write_walkforward_reports,
+)
+from ai_stock_analyst.backtest.sweep import RANK_KEYS, SWEEP_PARAMS
+from ai_stock_analyst.backtest.walkforward import OBJECTIVES
+from ai_stock_analyst.data.bar_store import get_bar_store
+from ai_stock_analyst.data.fundamentals_cache import get_fundamentals_cache
+from ai_stock_analyst.data.market_context import CORE_TICKERS
+from ai_stock_analyst.data.universe import load_us_equity_universe
 
 
 def decide_signal(features: Dict) -> int:
@@ -50,7 +61,7 @@ def decide_signal(features: Dict) -> int:
 
 
 def run_backtest(symbol: str, period: str) -> BacktestMetrics:
-    df = yf.download(symbol, period=period, interval="1d", auto_adjust=False, progress=False)
+    df = get_bar_store().load([symbol], period=period).get(symbol, pd.DataFrame())
     if df.empty or len(df) < 80:
         return BacktestMetrics(symbol, 0.0, 0.0, 0.0, 0, 0.0)
 
@@ -64,50 +75,10 @@ def run_backtest(symbol: str, period: str) -> BacktestMetrics:
         return BacktestMetrics(symbol, 0.0, 0.0, 0.0, 0, 0.0)
 
     max_len = min(len(df_norm), len(close))
-    strategy_curve = [1.0]
-    benchmark_curve = [1.0]
-    trade_results: List[float] = []
-
-    for i in range(40, max_len - 1):
-        hist = df_norm.iloc[: i + 1]
-        features = calculate_features(hist)
-        signal = decide_signal(features)
-
-        today = float(close.iloc[i])
-        nxt = float(close.iloc[i + 1])
-        next_ret = (nxt / today) - 1
-
-        strat_ret = signal * next_ret
-        strategy_curve.append(strategy_curve[-1] * (1 + strat_ret))
-        benchmark_curve.append(benchmark_curve[-1] * (1 + next_ret))
-
-        if signal != 0:
-            trade_results.append(strat_ret)
-
-    total_return_pct = (strategy_curve[-1] - 1) * 100
-    benchmark_return_pct = (benchmark_curve[-1] - 1) * 100
-
-    peak = strategy_curve[0]
-    mdd = 0.0
-    for v in strategy_curve:
-        if v > peak:
-            peak = v
-        drawdown = (v - peak) / peak
-        if drawdown < mdd:
-            mdd = drawdown
-
-    trades = len(trade_results)
-    wins = sum(1 for r in trade_results if r > 0)
-    hit_rate = (wins / trades * 100) if trades else 0.0
-
-    return BacktestMetrics(
-        symbol=symbol,
-        total_return_pct=round(total_return_pct, 2),
-        benchmark_return_pct=round(benchmark_return_pct, 2),
-        max_drawdown_pct=round(mdd * 100, 2),
-        trades=trades,
-        hit_rate_pct=round(hit_rate, 2),
-    )
+    result = run_vectorized_backtest(df_norm.iloc[:max_len])
+    if result is None:
+        return BacktestMetrics(symbol, 0.0, 0.0, 0.0, 0, 0.0)
+    return result.metrics(symbol)
 
 
 def _extract_close_series(df: pd.DataFrame) -> pd.Series:
@@ -153,31 +124,124 @@ def _normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
 
 
 def write_reports(metrics: List[BacktestMetrics], output_dir: Path) -> Path:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    md_path = output_dir / f"backtest_{ts}.md"
-    json_path = output_dir / f"backtest_{ts}.json"
-
-    lines = [
-        "# Backtest Report",
-        "",
-        f"Generated at (UTC): {datetime.utcnow().isoformat()}",
-        "",
-        "| Symbol | Strategy Return | Benchmark Return | Max Drawdown | Trades | Hit Rate |",
-        "|---|---:|---:|---:|---:|---:|",
-    ]
-
-    json_payload = []
-    for m in metrics:
-        lines.append(
-            f"| {m.symbol} | {m.total_return_pct:.2f}% | {m.benchmark_return_pct:.2f}% | "
-            f"{m.max_drawdown_pct:.2f}% | {m.trades} | {m.hit_rate_pct:.2f}% |"
+    with BacktestReportWriter(output_dir) as writer:
+        for m in metrics:
+            writer.add(m)
+    return writer.md_path
+
+
+def _parse_grid(args: argparse.Namespace) -> Dict[str, List[float]]:
+    grid = {}
+    for name in SWEEP_PARAMS:
+        raw = getattr(args, name)
+        if raw:
+            grid[name] = [float(v) for v in raw.split(",") if v.strip()]
+    return grid
+
+
+def _load_normalized(symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
+    return {symbol: _normalize_ohlcv(frame) for symbol, frame in get_bar_store().load(symbols, period=period).items()}
+
+
+def run_sweep_mode(symbols: List[str], args: argparse.Namespace, cache=None) -> None:
+    combos = expand_grid(_parse_grid(args))
+    histories = _load_normalized(symbols, args.period)
+    rows = run_sweep(histories, combos, rank_by=args.rank_by, cache=cache)
+    md_path, _ = write_sweep_reports(rows, Path(args.output_dir), rank_by=args.rank_by)
+
+    print(f"Sweep done: {len(combos)} combinations x {rows[0].symbols if rows else 0} symbols -> {md_path}")
+    for rank, row in enumerate(rows[: args.top], 1):
+        p = row.params
+        print(
+            f"#{rank} rsi_buy<{p.rsi_buy_max:g} rsi_sell>{p.rsi_sell_min:g} atr<{p.atr_pct_max:g} "
+            f"vol<{p.volatility_max:g}: mean={row.mean_return_pct:.2f}% median={row.median_return_pct:.2f}% "
+            f"mdd={row.mean_max_drawdown_pct:.2f}% trades={row.trades} hit={row.hit_rate_pct:.2f}% "
+            f"sharpe={row.mean_sharpe:.2f}"
+        )
+
+
+def run_walk_forward_mode(symbols: List[str], args: argparse.Namespace) -> None:
+    combos = expand_grid(_parse_grid(args))
+    config = WalkForwardConfig(
+        train_bars=args.train_bars,
+        test_bars=args.test_bars,
+        anchored=args.anchored,
+        objective=args.objective,
+    )
+    results = run_walk_forward(_load_normalized(symbols, args.period), combos, config)
+    report_path = write_walkforward_reports(results, Path(args.output_dir), config, bootstrap=args.bootstrap)
+
+    print(f"Walk-forward done: {len(combos)} combinations, {len(results)} symbols -> {report_path}")
+    for wf in results:
+        s = wf.summary()
+        print(
+            f"{s['symbol']}: oos={s['total_return_pct']:.2f}% benchmark={s['benchmark_return_pct']:.2f}% "
+            f"mdd={s['max_drawdown_pct']:.2f}% sharpe={s['sharpe']:.2f} folds={s['folds']} "
+            f"is={s['mean_in_sample_pct']:.2f}% oos/fold={s['mean_out_of_sample_pct']:.2f}%"
         )
-        json_payload.append(m.__dict__)
 
-    md_path.write_text("\n".join(lines), encoding="utf-8")
-    json_path.write_text(json.dumps(json_payload, ensure_ascii=False, indent=2), encoding="utf-8")
-    return md_path
+
+def run_portfolio_mode(symbols: List[str], args: argparse.Namespace) -> None:
+    if args.universe_size:
+        symbols = load_us_equity_universe(max_symbols=args.universe_size)
+    config = PortfolioConfig(
+        initial_cash=args.initial_cash,
+        max_positions=args.max_positions,
+        commission_bps=args.commission_bps,
+    )
+    store = get_bar_store()
+    histories = {symbol: _normalize_ohlcv(frame) for symbol, frame in store.load(symbols, period=args.period).items()}
+    market = {t: frame["Close"] for t, frame in store.load(list(CORE_TICKERS), period=args.period).items()}
+
+    result = run_portfolio_backtest(histories, config, market=market)
+    if result is None:
+        print("Portfolio backtest skipped: not enough history")
+        return
+    report_path = write_portfolio_reports(result, Path(args.output_dir), bootstrap=args.bootstrap)
+    m = result.metrics()
+    print(f"Portfolio backtest done: {report_path}")
+    print(
+        f"{m['symbols']} symbols {m['start']}~{m['end']}: return={m['total_return_pct']:.2f}% "
+        f"benchmark={m['benchmark_return_pct']:.2f}% mdd={m['max_drawdown_pct']:.2f}% trades={m['trades']} "
+        f"avg_positions={m['avg_positions']} exposure={m['avg_exposure_pct']:.2f}% sharpe={m['sharpe']:.2f}"
+    )
+
+
+def run_pipeline_replay_mode(symbols: List[str], args: argparse.Namespace) -> None:
+    store = get_bar_store()
+    histories = _load_normalized(symbols, args.period)
+    market = {t: frame["Close"] for t, frame in store.load(list(CORE_TICKERS), period=args.period).items()}
+    news = load_news_history(list(histories)) if args.with_news else {}
+    fundamentals = {s: get_fundamentals_cache().get(s) for s in histories} if args.with_fundamentals else {}
+
+    replays = replay_pipeline(
+        histories,
+        start=args.start or None,
+        end=args.end or None,
+        step=args.step,
+        workers=args.workers or None,
+        market=market,
+        news=news,
+        fundamentals=fundamentals,
+    )
+
+    output_dir = Path(args.output_dir)
+    with BacktestReportWriter(output_dir) as writer:
+        for replay in replays:
+            writer.add(replay.metrics())
+    decisions_path = writer.md_path.with_name(writer.md_path.stem.replace("backtest_", "pipeline_") + ".csv")
+    frames = [r.decisions.assign(symbol=r.symbol) for r in replays if not r.decisions.empty]
+    if frames:
+        pd.concat(frames).to_csv(decisions_path, index_label="date")
+
+    print(f"Pipeline replay done: {writer.md_path} (decisions: {decisions_path})")
+    for replay in replays:
+        m = replay.metrics()
+        counts = replay.signal_counts()
+        print(
+            f"{m.symbol}: strategy={m.total_return_pct:.2f}% benchmark={m.benchmark_return_pct:.2f}% "
+            f"mdd={m.max_drawdown_pct:.2f}% BUY/SELL/HOLD={counts['BUY']}/{counts['SELL']}/{counts['HOLD']}"
+        )
 
 
 def main():
@@ -185,18 +249,118 @@ def main():
     parser.add_argument("--symbols", type=str, default="SPY,QQQ")
     parser.add_argument("--period", type=str, default="2y")
     parser.add_argument("--output-dir", type=str, default="reports")
+    parser.add_argument("--workers", type=int, default=0, help="Backtest worker processes (0=CPU count)")
+    parser.add_argument("--sweep", action="store_true", help="Grid-search strategy thresholds instead of a single run")
+    for name in SWEEP_PARAMS:
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            dest=name,
+            type=str,
+            default="",
+            help=f"Comma-separated {name} values for --sweep / --walk-forward",
+        )
+    parser.add_argument("--rank-by", type=str, default="mean_return_pct", choices=RANK_KEYS)
+    parser.add_argument("--top", type=int, default=10, help="Sweep rows to print")
+    parser.add_argument(
+        "--walk-forward",
+        action="store_true",
+        help="Pick parameters from the grid on rolling train windows and report stitched out-of-sample results",
+    )
+    parser.add_argument("--train-bars", type=int, default=252)
+    parser.add_argument("--test-bars", type=int, default=63)
+    parser.add_argument("--anchored", action="store_true", help="Expanding train window instead of rolling")
+    parser.add_argument("--objective", type=str, default="return", choices=OBJECTIVES)
+    parser.add_argument(
+        "--portfolio",
+        action="store_true",
+        help="Trade all symbols as one portfolio under cash, position-count and risk-gate limits",
+    )
+    parser.add_argument("--universe-size", type=int, default=0, help="Portfolio mode: use the top N universe symbols")
+    parser.add_argument("--initial-cash", type=float, default=1_000_000.0)
+    parser.add_argument("--max-positions", type=int, default=20)
+    parser.add_argument("--commission-bps", type=float, default=5.0)
+    parser.add_argument(
+        "--replay-pipeline",
+        action="store_true",
+        help="Replay the full StockAnalyzer pipeline day by day with rule-based agent fallbacks",
+    )
+    parser.add_argument("--start", type=str, default="", help="Pipeline replay: first decision date")
+    parser.add_argument("--end", type=str, default="", help="Pipeline replay: last decision date")
+    parser.add_argument("--step", type=int, default=1, help="Pipeline replay: decide every N trading days")
+    parser.add_argument("--with-news", action="store_true", help="Pipeline replay: use stored news_articles")
+    parser.add_argument(
+        "--with-fundamentals",
+        action="store_true",
+        help="Pipeline replay: use the current fundamentals snapshot (introduces look-ahead)",
+    )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Walk-forward/portfolio: add block-bootstrap 95%% CIs from N resamples",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the backtest result cache")
+    parser.add_argument("--cache-info", action="store_true", help="Print backtest cache entries and exit")
+    parser.add_argument("--cache-evict-days", type=float, default=None, help="Evict cache entries unused for N days")
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.getenv("BACKTEST_CACHE_MAX_MB", "512")),
+        help="Evict least recently used cache entries beyond this size",
+    )
     args = parser.parse_args()
 
-    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
-    metrics = [run_backtest(symbol, args.period) for symbol in symbols]
-    report_path = write_reports(metrics, Path(args.output_dir))
+    cache = None if args.no_cache else get_backtest_cache()
+    if args.cache_info:
+        print_cache_info(get_backtest_cache(), args)
+        return
 
-    print(f"Backtest done: {report_path}")
-    for item in metrics:
-        print(
-            f"{item.symbol}: strategy={item.total_return_pct:.2f}% benchmark={item.benchmark_return_pct:.2f}% "
-            f"mdd={item.max_drawdown_pct:.2f}% trades={item.trades} hit={item.hit_rate_pct:.2f}%"
-        )
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    if args.replay_pipeline:
+        run_pipeline_replay_mode(symbols, args)
+    elif args.portfolio:
+        run_portfolio_mode(symbols, args)
+    elif args.walk_forward:
+        run_walk_forward_mode(symbols, args)
+    elif args.sweep:
+        run_sweep_mode(symbols, args, cache)
+    else:
+        with BacktestReportWriter(Path(args.output_dir)) as writer:
+            metrics = run_backtests(
+                symbols,
+                period=args.period,
+                workers=args.workers or None,
+                on_result=writer.add,
+                cache=cache,
+            )
+        report_path = writer.md_path
+
+        print(f"Backtest done: {report_path}")
+        for item in metrics:
+            print(
+                f"{item.symbol}: strategy={item.total_return_pct:.2f}% benchmark={item.benchmark_return_pct:.2f}% "
+                f"mdd={item.max_drawdown_pct:.2f}% trades={item.trades} hit={item.hit_rate_pct:.2f}%"
+            )
+
+    if cache is not None:
+        stats = cache.stats()
+        evicted = cache.evict(max_age_days=args.cache_evict_days, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        if stats["hits"] or stats["misses"] or evicted:
+            print(
+                f"Backtest cache: hits={stats['hits']} misses={stats['misses']} writes={stats['writes']} "
+                f"entries={stats['entries'] - evicted} evicted={evicted}"
+            )
+
+
+def print_cache_info(cache, args: argparse.Namespace) -> None:
+    if args.cache_evict_days is not None:
+        print(f"Evicted {cache.evict(max_age_days=args.cache_evict_days)} entries")
+    stats = cache.stats()
+    print(f"Backtest cache {cache.root}: {stats['entries']} entries, {stats['bytes'] / 1024 / 1024:.1f} MB")
+    for entry in cache.entries()[: args.top]:
+        used = datetime.fromtimestamp(entry["last_used"]).strftime("%Y-%m-%d %H:%M")
+        detail = f"cells={entry['cells']}" if "cells" in entry else f"params={entry.get('params')}"
+        print(f"  {entry['key']} {entry.get('symbol', '')} {detail} {entry['bytes'] / 1024:.1f}KB last_used={used}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("MARKET_DATA_PROVIDER", raising=False)
+
+    from ai_stock_analyst.agents import analyzer
+    from ai_stock_analyst.backtest import result_cache
+    from ai_stock_analyst.config import settings
+    from ai_stock_analyst.data import bar_store, fundamentals_cache, indicator_state, market_context, providers
+    from ai_stock_analyst.llm import cache as llm_cache, limiter, router
+
+    # 配置单例在首次读取时固定 DATA_CACHE_DIR，每个测试重新读取
+    monkeypatch.setattr(settings, "_settings", None)
+    monkeypatch.setattr(analyzer, "_stock_analyzer", None)
+    monkeypatch.setattr(bar_store, "_bar_store", None)
+    monkeypatch.setattr(providers, "_provider", None)
+    monkeypatch.setattr(fundamentals_cache, "_fundamentals_cache", None)
+    monkeypatch.setattr(indicator_state, "_indicator_engine", None)
+    monkeypatch.setattr(market_context, "_memory_cache", {"expires_at": 0.0, "tickers": (), "value": {}})
+    monkeypatch.setattr(router, "_llm_router", None)
+    monkeypatch.setattr(llm_cache, "_llm_cache", None)
+    monkeypatch.setattr(limiter, "_llm_limiter", None)
+    monkeypatch.setattr(result_cache, "_backtest_cache", None)
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_stock_analyst.backtest import run_vectorized_backtest
+from ai_stock_analyst.backtest.engine import BacktestMetrics
+from ai_stock_analyst.data.features import calculate_features
+from scripts.backtest_strategy import decide_signal
+
+
+def _ohlcv(days: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.018, days)))
+    spread = np.abs(rng.normal(0, 0.01, days)) * close
+    return pd.DataFrame(
+        {
+            "Open": close * (1 + rng.normal(0, 0.004, days)),
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.uniform(1e6, 5e6, days),
+        },
+        index=pd.bdate_range("2020-01-01", periods=days),
+    )
+
+
+def _prefix_loop_backtest(symbol: str, df: pd.DataFrame) -> BacktestMetrics:
+    """旧版逐日前缀重算实现，作为对照"""
+    close = df["Close"]
+    curve = [1.0]
+    bench = [1.0]
+    trades = []
+    for i in range(40, len(df) - 1):
+        signal = decide_signal(calculate_features(df.iloc[: i + 1]))
+        next_ret = float(close.iloc[i + 1]) / float(close.iloc[i]) - 1
+        curve.append(curve[-1] * (1 + signal * next_ret))
+        bench.append(bench[-1] * (1 + next_ret))
+        if signal != 0:
+            trades.append(signal * next_ret)
+    peak, mdd = curve[0], 0.0
+    for v in curve:
+        peak = max(peak, v)
+        mdd = min(mdd, (v - peak) / peak)
+    wins = sum(1 for r in trades if r > 0)
+    return BacktestMetrics(
+        symbol,
+        round((curve[-1] - 1) * 100, 2),
+        round((bench[-1] - 1) * 100, 2),
+        round(mdd * 100, 2),
+        len(trades),
+        round(wins / len(trades) * 100 if trades else 0.0, 2),
+    )
+
+
+def test_vectorized_backtest_matches_prefix_loop():
+    for seed in range(4):
+        df = _ohlcv(220, seed)
+        result = run_vectorized_backtest(df)
+        assert result.metrics("X") == _prefix_loop_backtest("X", df)
+        assert len(result.signals) == len(df) - 41
+
+
+@pytest.mark.benchmark
+def test_ten_year_backtest_is_fast():
+    df = _ohlcv(2520, 9)
+    started = time.perf_counter()
+    result = run_vectorized_backtest(df)
+    assert time.perf_counter() - started < 0.5
+    assert len(result.strategy_curve) == len(df) - 40
@@ -0,0 +1,151 @@
+import json
+
+import numpy as np
+import pytest
+
+from ai_stock_analyst.backtest import (
+    bootstrap_ci,
+    expand_grid,
+    performance_metrics,
+    rolling_metrics,
+    run_vectorized_backtest,
+    trade_stats,
+)
+from ai_stock_analyst.backtest.engine import BacktestResult
+from ai_stock_analyst.backtest.metrics import PROFIT_FACTOR_CAP
+from ai_stock_analyst.backtest.sweep import combo_signals, sweep_inputs, sweep_symbol
+from tests.test_backtest_engine import _ohlcv
+
+
+def _naive_metrics(r, s):
+    curve = [1.0]
+    for x in r:
+        curve.append(curve[-1] * (1 + x))
+    peak, mdd = curve[0], 0.0
+    for v in curve:
+        peak = max(peak, v)
+        mdd = min(mdd, (v - peak) / peak)
+    years = len(r) / 252
+    cagr = curve[-1] ** (1 / years) - 1
+    mean = sum(r) / len(r)
+    std = (sum((x - mean) ** 2 for x in r) / len(r)) ** 0.5
+    down = (sum(min(x, 0) ** 2 for x in r) / len(r)) ** 0.5
+    prev, changes = 0, 0
+    for x in s:
+        changes += abs(x - prev)
+        prev = x
+    return {
+        "total_return": curve[-1] - 1,
+        "cagr": cagr,
+        "sharpe": mean / std * 252**0.5,
+        "sortino": mean / down * 252**0.5,
+        "max_drawdown": mdd,
+        "calmar": cagr / -mdd,
+        "exposure": sum(1 for x in s if x) / len(s),
+        "turnover": changes / years,
+    }
+
+
+def test_performance_metrics_match_loop_and_batch_rows():
+    rng = np.random.default_rng(3)
+    signals = rng.choice([-1, 0, 1], size=(5, 600)).astype(np.int8)
+    returns = signals * rng.normal(0.0005, 0.02, size=600)
+
+    batch = performance_metrics(returns, signals)
+    for i in range(len(returns)):
+        single = performance_metrics(returns[i], signals[i])
+        expected = _naive_metrics(returns[i].tolist(), signals[i].tolist())
+        for key, value in expected.items():
+            assert single[key] == pytest.approx(value, rel=1e-9)
+            assert batch[key][i] == pytest.approx(value, rel=1e-9)
+
+
+def test_total_return_and_drawdown_match_engine():
+    result = run_vectorized_backtest(_ohlcv(500, seed=8))
+    perf = performance_metrics(result.strategy_returns, result.signals)
+    m = result.metrics("X")
+    assert round(float(perf["total_return"]) * 100, 2) == m.total_return_pct
+    assert round(float(perf["max_drawdown"]) * 100, 2) == m.max_drawdown_pct
+    assert result.performance()["exposure_pct"] == round(m.trades / len(result.signals) * 100, 2)
+
+
+def test_rolling_metrics_match_window_recompute():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0, 0.01, size=(2, 300))
+    rolled = rolling_metrics(returns, 63)
+    assert np.isnan(rolled["sharpe"][:, :62]).all()
+    for t in (62, 150, 299):
+        window = returns[:, t - 62 : t + 1]
+        expected = performance_metrics(window)
+        np.testing.assert_allclose(rolled["return"][:, t], expected["total_return"], rtol=1e-9)
+        np.testing.assert_allclose(rolled["sharpe"][:, t], expected["sharpe"], rtol=1e-6)
+        np.testing.assert_allclose(rolled["sortino"][:, t], expected["sortino"], rtol=1e-6)
+    assert rolling_metrics(returns[0], 252)["volatility"].shape == (300,)
+
+
+def test_trade_stats_groups_runs_per_row():
+    signals = np.array([[0, 1, 1, 0, -1, -1, -1, 1], [1, 1, 1, 1, 0, 0, 0, 0]])
+    returns = np.array([[0.0, 0.1, -0.05, 0.0, 0.02, 0.02, -0.01, -0.03], [0.01] * 4 + [0.0] * 4])
+
+    stats = trade_stats(signals, returns)
+    assert list(stats["round_trips"]) == [3, 1]
+    first = 1.1 * 0.95 - 1
+    second = 1.02 * 1.02 * 0.99 - 1
+    assert stats["avg_trade_return"][0] == pytest.approx((first + second - 0.03) / 3)
+    assert stats["win_rate"][0] == pytest.approx(2 / 3)
+    assert stats["avg_holding_days"][0] == pytest.approx(2.0)
+    assert stats["profit_factor"][0] == pytest.approx((first + second) / 0.03)
+    assert stats["worst_trade"][0] == pytest.approx(-0.03)
+    # 行边界处断开：第二行的首笔交易不与第一行末尾的多头合并
+    assert stats["avg_holding_days"][1] == 4.0
+    assert trade_stats(signals[1], returns[1])["round_trips"] == 1
+
+
+def test_all_winning_trades_cap_profit_factor():
+    signals = np.array([0, 1, 1, 0, 1, 0])
+    returns = np.array([0.0, 0.01, 0.02, 0.0, 0.03, 0.0])
+    stats = trade_stats(signals, returns)
+    assert stats["round_trips"] == 2 and stats["win_rate"] == 1.0
+    assert stats["profit_factor"] == PROFIT_FACTOR_CAP
+
+    result = BacktestResult(None, signals, returns, returns)
+    perf = result.performance()
+    assert perf["profit_factor"] == PROFIT_FACTOR_CAP
+    json.loads(json.dumps(perf, allow_nan=False))
+
+
+def test_bootstrap_ci_is_reproducible_and_brackets_estimate():
+    rng = np.random.default_rng(5)
+    returns = rng.normal(0.001, 0.015, size=1000)
+    ci = bootstrap_ci(returns, n_resamples=3000, block=20, seed=7)
+    assert ci == bootstrap_ci(returns, n_resamples=3000, block=20, seed=7)
+
+    point = performance_metrics(returns)
+    for name in ("sharpe", "total_return", "cagr"):
+        low, high = ci[name]
+        assert low < float(point[name]) < high
+    assert ci["max_drawdown"][1] <= 0
+
+
+def test_sweep_metrics_are_one_batched_call_per_chunk(monkeypatch):
+    from ai_stock_analyst.backtest import sweep
+
+    shapes = []
+    original = sweep.performance_metrics
+
+    def counting(returns, signals=None, periods=252):
+        shapes.append(np.shape(returns))
+        return original(returns, signals, periods)
+
+    monkeypatch.setattr(sweep, "performance_metrics", counting)
+    frame = _ohlcv(600, seed=6)
+    combos = expand_grid({"rsi_buy_max": range(50, 82, 2), "atr_pct_max": [2, 3, 4, 5], "volatility_max": [2, 3, 4]})
+    scored = sweep_symbol(frame, combos)
+
+    # 全部组合作为一个矩阵求指标，不逐组合调用
+    assert shapes == [(len(combos), len(frame) - 41)]
+    signals = combo_signals(sweep_inputs(frame), combos)
+    close = frame["Close"].to_numpy(dtype=float)
+    returns = signals * (close[41:] / close[40:-1] - 1)
+    expected = original(returns[7], signals[7])
+    assert scored["sharpe"][7] == pytest.approx(float(expected["sharpe"]))
@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_stock_analyst.backtest import PortfolioConfig, run_portfolio_backtest, write_portfolio_reports
+from ai_stock_analyst.backtest.portfolio import RISK_POSITION_CAPS, build_portfolio_panel, risk_levels
+
+
+def _universe(days: int, symbols: int, seed: int = 0, late_every: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2015-01-01", periods=days)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.018, (days, symbols)), axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (days, symbols))) * close
+    out = {}
+    for j in range(symbols):
+        start = 200 if late_every and j % late_every == 0 else 0
+        out[f"S{j:04d}"] = pd.DataFrame(
+            {
+                "Open": close[:, j],
+                "High": close[:, j] + spread[:, j],
+                "Low": close[:, j] - spread[:, j],
+                "Close": close[:, j],
+                "Volume": np.full(days, 1e6),
+            },
+            index=index,
+        ).iloc[start:]
+    return out
+
+
+def test_panel_aligns_late_listings_and_gaps():
+    histories = _universe(300, 3, late_every=3)
+    histories["S0001"] = histories["S0001"].drop(histories["S0001"].index[150])
+    panel = build_portfolio_panel(histories)
+
+    assert panel.close.shape == (300, 3)
+    assert not panel.tradable[:200, 0].any() and panel.tradable[200:, 0].all()
+    assert not panel.tradable[150, 1]
+    assert panel.close[150, 1] == panel.close[149, 1]
+
+
+def test_portfolio_respects_cash_positions_and_caps():
+    config = PortfolioConfig(initial_cash=100_000, max_positions=5, min_dollar_volume=0)
+    histories = _universe(600, 40, late_every=5)
+    result = run_portfolio_backtest(histories, config)
+
+    assert result.positions.max() <= 5
+    assert (result.cash >= -1e-6).all()
+    assert result.trades > 0
+    # 逐股盈亏（含手续费）与净值变化一致
+    assert np.isclose(result.pnl.sum(), result.equity[-1] - config.initial_cash)
+    # 建仓不超过 LOW 的 10% 上限；之后超过上限 25% 就会被减仓，单日涨幅有限，权重不会翻倍
+    final_weights = result.shares * build_portfolio_panel(histories).close[-1] / result.equity[-1]
+    assert final_weights.max() <= RISK_POSITION_CAPS[0] * 2
+
+
+def test_risk_levels_follow_trigger_counts():
+    panel = build_portfolio_panel(_universe(120, 2))
+    levels = risk_levels(panel.features)
+    assert set(np.unique(levels)) <= {0, 1, 2}
+
+    calm = pd.Series(100.0, index=panel.index)
+    fearful = {"QQQ": calm * np.linspace(1.0, 0.8, len(calm)), "^VIX": calm * 0.3}
+    stressed = risk_levels(panel.features, fearful)
+    # 市场状态只会增加触发数
+    assert (stressed >= levels).all()
+    assert (stressed[-1] >= 1).all()
+
+
+def test_blocking_triggered_entries_reduces_trading(tmp_path):
+    histories = _universe(500, 30, seed=3)
+    strict = run_portfolio_backtest(histories, PortfolioConfig(min_dollar_volume=0))
+    loose = run_portfolio_backtest(histories, PortfolioConfig(min_dollar_volume=0, block_triggered_entries=False))
+    assert loose.trades >= strict.trades
+
+    path = write_portfolio_reports(strict, tmp_path, timestamp="t")
+    assert "total_return_pct" in path.read_text(encoding="utf-8")
+    assert (tmp_path / "portfolio_t.json").exists()
+
+
+@pytest.mark.benchmark
+def test_thousand_symbols_decade_is_interactive():
+    histories = _universe(2520, 1000, late_every=7)
+    started = time.perf_counter()
+    result = run_portfolio_backtest(histories, PortfolioConfig(min_dollar_volume=0))
+    elapsed = time.perf_counter() - started
+
+    assert result.metrics()["symbols"] == 1000
+    assert elapsed < 10
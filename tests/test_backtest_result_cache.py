@@ -0,0 +1,107 @@
+import os
+import time
+
+import numpy as np
+
+from ai_stock_analyst.backtest import (
+    BacktestResultCache,
+    StrategyParams,
+    cached_backtest,
+    expand_grid,
+    run_backtests,
+    run_sweep,
+    run_vectorized_backtest,
+)
+from ai_stock_analyst.backtest.result_cache import frame_hash
+from ai_stock_analyst.backtest.sweep import sweep_symbol
+from tests.test_backtest_engine import _ohlcv
+
+
+def test_cached_backtest_hits_on_rerun(tmp_path):
+    cache = BacktestResultCache(str(tmp_path))
+    frame = _ohlcv(400, seed=2)
+    params = StrategyParams(rsi_buy_max=65)
+
+    first = cached_backtest("X", frame, params, cache=cache)
+    second = cached_backtest("X", frame, params, cache=cache)
+    expected = run_vectorized_backtest(frame, params)
+
+    assert cache.stats()["hits"] == 1 and cache.stats()["writes"] == 1
+    assert second.metrics("X") == first.metrics("X") == expected.metrics("X")
+    assert np.array_equal(second.index, expected.index)
+
+    # 参数或数据变化都会得到新键
+    cached_backtest("X", frame, StrategyParams(rsi_buy_max=70), cache=cache)
+    changed = frame.copy()
+    changed.iloc[-1, changed.columns.get_loc("Close")] *= 1.01
+    assert frame_hash(changed) != frame_hash(frame)
+    cached_backtest("X", changed, params, cache=cache)
+    assert cache.stats()["writes"] == 3
+
+
+def test_process_pool_counts_reach_the_parent_cache(tmp_path):
+    cache = BacktestResultCache(str(tmp_path))
+    histories = {f"S{i}": _ohlcv(300, seed=i) for i in range(4)}
+
+    run_backtests(list(histories), workers=2, histories=histories, cache=cache)
+    assert cache.counters() == {"hits": 0, "misses": 4, "writes": 4}
+
+    run_backtests(list(histories), workers=2, histories=histories, cache=cache)
+    assert cache.counters() == {"hits": 4, "misses": 4, "writes": 4}
+
+
+def test_sweep_computes_only_new_cells(tmp_path, monkeypatch):
+    from ai_stock_analyst.backtest import sweep
+
+    cache = BacktestResultCache(str(tmp_path))
+    frame = _ohlcv(500, seed=4)
+    grid = {"rsi_buy_max": [60, 72], "atr_pct_max": [2.5, 4.0]}
+    sweep_symbol(frame, expand_grid(grid), cache=cache, symbol="X")
+
+    computed = []
+    original = sweep._sweep_cells
+
+    def counting(f, combos, warmup):
+        computed.append(len(combos))
+        return original(f, combos, warmup)
+
+    monkeypatch.setattr(sweep, "_sweep_cells", counting)
+
+    grid["rsi_buy_max"].append(80)
+    combos = expand_grid(grid)
+    scored = sweep_symbol(frame, combos, cache=cache, symbol="X")
+    assert computed == [2]
+    assert all(len(v) == len(combos) for v in scored.values())
+    for i, params in enumerate(combos):
+        assert scored["return_pct"][i] == run_vectorized_backtest(frame, params).metrics("X").total_return_pct
+
+    # 再跑一遍完全命中
+    rows = run_sweep({"X": frame}, combos, cache=cache)
+    assert computed == [2]
+    assert len(rows) == len(combos)
+    (entry,) = cache.entries()
+    assert entry["kind"] == "sweep" and entry["cells"] == 6
+
+
+def test_entries_and_eviction(tmp_path):
+    cache = BacktestResultCache(str(tmp_path))
+    frame = _ohlcv(300, seed=1)
+    for rsi in (60, 65, 70, 75):
+        cached_backtest("X", frame, StrategyParams(rsi_buy_max=rsi), cache=cache)
+
+    entries = cache.entries()
+    assert len(entries) == 4
+    assert {e["params"]["rsi_buy_max"] for e in entries} == {60, 65, 70, 75}
+
+    # 最旧的一条超龄
+    old = tmp_path / f"{entries[-1]['key']}.npz"
+    stale = time.time() - 10 * 86400
+    os.utime(old, (stale, stale))
+    assert cache.evict(max_age_days=7) == 1
+    assert not old.exists()
+
+    size = max(e["bytes"] for e in cache.entries())
+    assert cache.evict(max_bytes=size * 2) == 1
+    assert cache.stats()["entries"] == 2
+    assert cache.clear() == 2
+    assert cache.entries() == []
@@ -0,0 +1,24 @@
+import json
+
+from ai_stock_analyst.backtest import BacktestReportWriter, run_backtests, run_vectorized_backtest
+from tests.test_backtest_engine import _ohlcv
+
+
+def test_process_pool_runner_matches_serial_and_streams_report(tmp_path):
+    histories = {f"S{i}": _ohlcv(200 + i * 7, seed=i) for i in range(12)}
+    histories["SHORT"] = _ohlcv(50, seed=99)
+    symbols = list(histories) + ["MISSING"]
+
+    with BacktestReportWriter(tmp_path, timestamp="t") as writer:
+        parallel = run_backtests(symbols, workers=3, histories=histories, on_result=writer.add)
+
+    serial = run_backtests(symbols, workers=1, histories=histories)
+    assert parallel == serial
+    assert [m.symbol for m in parallel] == symbols
+    assert parallel[0] == run_vectorized_backtest(histories["S0"]).metrics("S0")
+    assert parallel[-1].trades == 0
+
+    payload = json.loads((tmp_path / "backtest_t.json").read_text(encoding="utf-8"))
+    assert sorted(p["symbol"] for p in payload) == sorted(symbols)
+    report = (tmp_path / "backtest_t.md").read_text(encoding="utf-8")
+    assert all(f"| {s} |" in report for s in symbols)
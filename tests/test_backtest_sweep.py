@@ -0,0 +1,82 @@
+import pytest
+
+from ai_stock_analyst.backtest import StrategyParams, expand_grid, run_sweep, run_vectorized_backtest, write_sweep_reports
+from ai_stock_analyst.backtest.sweep import sweep_symbol
+from tests.test_backtest_engine import _ohlcv
+
+
+GRID = {
+    "rsi_buy_max": [60, 72, 80],
+    "rsi_sell_min": [70, 78],
+    "atr_pct_max": [2.5, 4.0],
+    "volatility_max": [1.5, 3.0],
+}
+
+
+def test_expand_grid_fills_defaults_and_rejects_unknown():
+    combos = expand_grid({"rsi_buy_max": [70, 65, 70]})
+    assert combos == [StrategyParams(rsi_buy_max=65.0), StrategyParams(rsi_buy_max=70.0)]
+    assert expand_grid({}) == [StrategyParams()]
+    with pytest.raises(ValueError):
+        expand_grid({"stop_loss": [1]})
+
+
+def test_sweep_rows_match_single_backtests():
+    frame = _ohlcv(600, seed=5)
+    combos = expand_grid(GRID)
+    scored = sweep_symbol(frame, combos)
+
+    for i, params in enumerate(combos):
+        m = run_vectorized_backtest(frame, params).metrics("X")
+        assert scored["return_pct"][i] == m.total_return_pct
+        assert scored["max_drawdown_pct"][i] == m.max_drawdown_pct
+        assert scored["benchmark_pct"][i] == m.benchmark_return_pct
+        assert scored["trades"][i] == m.trades
+    # 网格确实改变了结果
+    assert len(set(scored["return_pct"])) > 1
+
+
+def test_run_sweep_ranks_and_writes_reports(tmp_path):
+    histories = {f"S{i}": _ohlcv(500, seed=i) for i in range(4)}
+    histories["SHORT"] = _ohlcv(30, seed=9)
+    combos = expand_grid(GRID)
+
+    rows = run_sweep(histories, combos, rank_by="mean_return_pct")
+    assert len(rows) == len(combos)
+    assert all(row.symbols == 4 for row in rows)
+    returns = [row.mean_return_pct for row in rows]
+    assert returns == sorted(returns, reverse=True)
+
+    md_path, json_path = write_sweep_reports(rows, tmp_path, timestamp="t")
+    assert md_path.read_text(encoding="utf-8").count("\n| ") == len(combos) + 1  # 含表头
+    assert '"rsi_buy_max"' in json_path.read_text(encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        run_sweep(histories, combos, rank_by="sharpe")
+
+
+def test_sweep_computes_features_once_per_symbol(monkeypatch):
+    from ai_stock_analyst.backtest import sweep
+
+    calls = {"frame_features": 0, "evaluate_signals": 0}
+
+    def counted(name, fn):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(sweep, "frame_features", counted("frame_features", sweep.frame_features))
+    monkeypatch.setattr(sweep, "evaluate_signals", counted("evaluate_signals", sweep.evaluate_signals))
+    histories = {f"S{i}": _ohlcv(300, seed=i) for i in range(3)}
+    combos = expand_grid(GRID)
+
+    run_sweep(histories, combos)
+    # 每只股票指标算一次，全部组合一次广播求信号
+    assert calls == {"frame_features": 3, "evaluate_signals": 3}
+
+    monkeypatch.setattr(sweep, "COMBO_CHUNK", 10)
+    calls.update(frame_features=0, evaluate_signals=0)
+    run_sweep(histories, combos)
+    assert calls == {"frame_features": 3, "evaluate_signals": 3 * 3}
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from ai_stock_analyst.backtest import (
+    WalkForwardConfig,
+    expand_grid,
+    run_vectorized_backtest,
+    run_walk_forward,
+    walk_forward,
+    write_walkforward_reports,
+)
+from ai_stock_analyst.backtest.walkforward import fold_windows
+from tests.test_backtest_engine import _ohlcv
+
+GRID = {"rsi_buy_max": [60, 72, 80], "atr_pct_max": [2.5, 4.0], "volatility_max": [1.5, 3.0]}
+
+
+def _naive_walk_forward(frame, combos, config):
+    """逐折叠、逐组合重跑回测的对照实现"""
+    per_combo = [run_vectorized_backtest(frame, p).strategy_returns for p in combos]
+    n = len(per_combo[0])
+    stitched, chosen = [], []
+    test_start = config.train_bars
+    while test_start < n:
+        train_start = 0 if config.anchored else test_start - config.train_bars
+        scores = [np.prod(1 + r[train_start:test_start]) for r in per_combo]
+        best = int(np.argmax(scores))
+        chosen.append(combos[best])
+        stitched.append(per_combo[best][test_start : test_start + config.test_bars])
+        test_start += config.test_bars
+    return chosen, np.concatenate(stitched)
+
+
+def test_fold_windows_tile_test_periods():
+    windows = fold_windows(100, WalkForwardConfig(train_bars=40, test_bars=25))
+    assert windows.tolist() == [[0, 40, 40, 65], [25, 65, 65, 90], [50, 90, 90, 100]]
+    anchored = fold_windows(100, WalkForwardConfig(train_bars=40, test_bars=25, anchored=True))
+    assert anchored[:, 0].tolist() == [0, 0, 0]
+    assert fold_windows(30, WalkForwardConfig(train_bars=40, test_bars=25)).shape == (0, 4)
+
+
+@pytest.mark.parametrize("anchored", [False, True])
+def test_walk_forward_matches_naive_fold_loop(anchored):
+    frame = _ohlcv(900, seed=11)
+    combos = expand_grid(GRID)
+    config = WalkForwardConfig(train_bars=200, test_bars=60, anchored=anchored)
+
+    wf = walk_forward("X", frame, combos, config)
+    chosen, stitched = _naive_walk_forward(frame, combos, config)
+
+    assert [f.params for f in wf.folds] == chosen
+    np.testing.assert_array_equal(wf.result.strategy_returns, stitched)
+    assert len(wf.result.index) == len(stitched)
+    assert wf.result.index[0] == frame.index[40 + 200]
+
+
+def test_sharpe_objective_and_reports(tmp_path):
+    histories = {"A": _ohlcv(700, seed=1), "B": _ohlcv(700, seed=2), "SHORT": _ohlcv(150, seed=3)}
+    config = WalkForwardConfig(train_bars=150, test_bars=50, objective="sharpe")
+    results = run_walk_forward(histories, expand_grid(GRID), config)
+
+    assert [wf.symbol for wf in results] == ["A", "B"]
+    summary = results[0].summary()
+    assert summary["folds"] == len(results[0].folds)
+    assert summary["most_chosen_params"] is not None
+
+    path = write_walkforward_reports(results, tmp_path, config, timestamp="t")
+    assert "| A |" in path.read_text(encoding="utf-8")
+    assert (tmp_path / "walkforward_t.json").exists()
+
+    with pytest.raises(ValueError):
+        WalkForwardConfig(objective="sortino")
+
+
+def test_hundreds_of_folds_share_one_signal_pass(monkeypatch):
+    from ai_stock_analyst.backtest import walkforward
+
+    calls = {"sweep_inputs": 0, "combo_signals": 0}
+
+    def counted(name, fn):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(walkforward, "sweep_inputs", counted("sweep_inputs", walkforward.sweep_inputs))
+    monkeypatch.setattr(walkforward, "combo_signals", counted("combo_signals", walkforward.combo_signals))
+    frame = _ohlcv(2520, seed=4)
+    combos = expand_grid(GRID)
+
+    wf = walk_forward("X", frame, combos, WalkForwardConfig(train_bars=60, test_bars=5))
+
+    assert len(wf.folds) > 400
+    # 指标与全部组合的信号只算一次，不随折叠数增长
+    assert calls == {"sweep_inputs": 1, "combo_signals": 1}
@@ -0,0 +1,89 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.bar_store import BarStore, period_to_days
+
+
+def _bars(days: int, end: date, scale: float = 1.0) -> pd.DataFrame:
+    idx = pd.bdate_range(end=end, periods=days)
+    close = np.linspace(100, 120, days) * scale
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(days, 1e6)},
+        index=idx,
+    )
+
+
+class FakeDownloader:
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def __call__(self, symbols, start=None):
+        self.calls.append((list(symbols), start))
+        out = {}
+        for symbol in symbols:
+            frame = self.frames.get(symbol)
+            if frame is None:
+                continue
+            if start is not None:
+                frame = frame[frame.index >= pd.Timestamp(start)]
+            out[symbol] = frame
+        return out
+
+
+def test_period_to_days():
+    assert period_to_days("6mo") == 186
+    assert period_to_days("2y") == 732
+    assert period_to_days("max") is None
+
+
+def test_first_load_backfills_then_only_fetches_delta(tmp_path):
+    full = _bars(120, date.today())
+    downloader = FakeDownloader({"AAPL": full.iloc[:-2], "MSFT": full})
+    store = BarStore(root=str(tmp_path), downloader=downloader, refresh_seconds=0)
+
+    first = store.load(["AAPL", "MSFT"], period="6mo")
+    assert len(downloader.calls) == 1
+    assert sorted(downloader.calls[0][0]) == ["AAPL", "MSFT"]
+    assert len(first["AAPL"]) == len(full) - 2
+
+    downloader.frames["AAPL"] = full
+    second = store.load(["AAPL"], period="6mo")
+    symbols, start = downloader.calls[-1]
+    assert symbols == ["AAPL"]
+    assert start is not None and start > full.index[0].date()
+    assert len(second["AAPL"]) == len(full)
+    assert float(second["AAPL"]["Close"].iloc[-1]) == float(full["Close"].iloc[-1])
+
+
+def test_fresh_store_skips_download(tmp_path):
+    downloader = FakeDownloader({"AAPL": _bars(60, date.today())})
+    store = BarStore(root=str(tmp_path), downloader=downloader, refresh_seconds=3600)
+
+    store.load(["AAPL"], period="1mo")
+    store.load(["AAPL"], period="1mo")
+    assert len(downloader.calls) == 1
+
+
+def test_adjusted_history_triggers_full_refetch(tmp_path):
+    downloader = FakeDownloader({"AAPL": _bars(60, date.today())})
+    store = BarStore(root=str(tmp_path), downloader=downloader, refresh_seconds=0)
+    store.load(["AAPL"], period="1mo")
+
+    # 模拟 2:1 拆股后 Yahoo 返回的整段复权价格
+    downloader.frames["AAPL"] = _bars(60, date.today(), scale=0.5)
+    out = store.load(["AAPL"], period="1mo")
+
+    assert len(downloader.calls) == 3
+    assert float(out["AAPL"]["Close"].iloc[0]) < 60
+
+
+def test_cache_dir_follows_settings(tmp_path, monkeypatch):
+    from ai_stock_analyst.config import Settings, get_cache_dir, settings
+
+    # 配置来自 .env 等非环境变量来源时同样生效
+    monkeypatch.setattr(settings, "_settings", Settings(DATA_CACHE_DIR=str(tmp_path / "from_settings")))
+    assert get_cache_dir("bars") == tmp_path / "from_settings" / "bars"
+    assert (tmp_path / "from_settings" / "bars").is_dir()
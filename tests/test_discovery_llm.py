@@ -0,0 +1,100 @@
+import json
+import re
+
+from ai_stock_analyst.agents.discovery_llm import (
+    build_candidate_prompt,
+    parse_candidate_scores,
+    score_candidates,
+)
+from ai_stock_analyst.agents.recommendation import _apply_llm_scores
+from ai_stock_analyst.llm import StubLLMRouter, set_llm_router
+
+
+def _candidates(n):
+    return [
+        {
+            "symbol": f"S{i:03d}",
+            "company_name": f"Co {i}",
+            "composite_score": round(0.8 - i * 0.01, 2),
+            "trend": "BULLISH",
+            "rsi14": 55,
+            "headlines": [{"title": f"S{i:03d} wins contract", "source": "WSJ"}],
+        }
+        for i in range(n)
+    ]
+
+
+def _symbols_in(prompt):
+    return re.findall(r"^(S\d{3}) \|", prompt, re.M)
+
+
+class Recorder:
+    def __init__(self, score=70):
+        self.score = score
+        self.prompts = []
+
+    def __call__(self, messages):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        return json.dumps({s: {"score": self.score, "reason": f"{s} ok"} for s in _symbols_in(prompt)})
+
+
+def test_prompt_lists_features_and_headlines():
+    prompt = build_candidate_prompt(_candidates(2))
+    assert _symbols_in(prompt) == ["S000", "S001"]
+    assert "S000 wins contract" in prompt
+    assert "RSI14 55" in prompt
+
+
+def test_parse_clamps_scores_and_ignores_unknown_symbols():
+    text = "```json\n" + json.dumps({"s000": {"score": 130, "reason": "x"}, "S001": "40", "ZZZ": 50, "S002": {"score": "n/a"}}) + "\n```"
+    scores = parse_candidate_scores(text, ["S000", "S001", "S002"])
+    assert scores == {"S000": {"score": 100.0, "reason": "x"}, "S001": {"score": 40.0, "reason": ""}}
+
+
+def test_batches_cover_every_candidate_with_few_requests():
+    recorder = Recorder()
+    set_llm_router(StubLLMRouter(recorder))
+    result = score_candidates(_candidates(40), batch_size=15, workers=3, token_budget=10**6)
+
+    assert result["requests"] == len(recorder.prompts) == 3
+    assert sorted(result["scores"]) == [c["symbol"] for c in _candidates(40)]
+    assert result["skipped"] == [] and result["failed"] == 0
+
+
+def test_token_budget_skips_lowest_ranked_batches():
+    recorder = Recorder()
+    set_llm_router(StubLLMRouter(recorder))
+    full = score_candidates(_candidates(30), batch_size=10, token_budget=10**6)
+    per_batch = full["estimated_tokens"] / 3
+
+    limited = score_candidates(_candidates(30), batch_size=10, token_budget=int(per_batch * 2.5))
+    assert limited["requests"] == 2
+    assert limited["skipped"] == [c["symbol"] for c in _candidates(30)[20:]]
+    assert limited["estimated_tokens"] <= per_batch * 2.5
+
+
+def test_failed_batch_keeps_rule_scores():
+    def flaky(messages):
+        if "S000" in messages[-1]["content"]:
+            raise RuntimeError("provider down")
+        return Recorder(90)(messages)
+
+    set_llm_router(StubLLMRouter(flaky))
+    scored = _candidates(20)
+    for item in scored:
+        item["recommend_reason"] = "规则。"
+    before = {item["symbol"]: item["composite_score"] for item in scored}
+
+    stats = _apply_llm_scores(scored, {}, weight=0.5)
+
+    assert stats["failed"] == 1 and stats["scored"] == 5
+    by_symbol = {item["symbol"]: item for item in scored}
+    assert by_symbol["S000"]["composite_score"] == before["S000"]
+    assert "llm_score" not in by_symbol["S000"]
+    assert by_symbol["S019"]["composite_score"] == round(before["S019"] * 0.5 + 0.45, 2)
+    assert by_symbol["S019"]["llm_score"] == 90.0
+    assert "LLM评分90" in by_symbol["S019"]["recommend_reason"]
+    # LLM 分高的候选重新排到前面
+    order = [item["symbol"] for item in scored]
+    assert order.index("S015") < order.index("S014")
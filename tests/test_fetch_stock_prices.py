@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data import bar_store, fetcher
+
+
+def _history(days: int = 60) -> pd.DataFrame:
+    idx = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    close = np.linspace(50, 60, days)
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(days, 2e6)},
+        index=idx,
+    )
+
+
+def test_batch_fetch_uses_one_bulk_download_and_one_market_context(monkeypatch):
+    download_calls = []
+    context_calls = []
+
+    def fake_download(symbols, start=None):
+        download_calls.append(list(symbols))
+        return {s: _history() for s in symbols if s != "BAD"}
+
+    def fake_info(symbol):
+        if symbol == "BAD":
+            raise ValueError("not found")
+        return {"currentPrice": 60.0, "previousClose": 59.0, "longName": f"{symbol} Inc"}
+
+    def fake_context():
+        context_calls.append(1)
+        return {"qqq_risk": "LOW"}
+
+    monkeypatch.setattr(bar_store, "_bar_store", bar_store.BarStore(downloader=fake_download))
+    monkeypatch.setattr(fetcher, "_fetch_info", fake_info)
+    monkeypatch.setattr(fetcher, "fetch_market_context", fake_context)
+
+    out = fetcher.fetch_stock_prices(["AAPL", "MSFT", "BAD", "AAPL"])
+
+    assert list(out) == ["AAPL", "MSFT", "BAD"]
+    assert len(download_calls) == 1
+    assert len(context_calls) == 1
+    assert out["AAPL"]["name"] == "AAPL Inc"
+    assert out["AAPL"]["market_context"] == {"qqq_risk": "LOW"}
+    assert len(out["MSFT"]["history"]) == 60
+    assert "error" in out["BAD"]
@@ -0,0 +1,68 @@
+import time
+
+from ai_stock_analyst.data import fundamentals_cache
+from ai_stock_analyst.data.fundamentals_cache import FundamentalsCache, RATIO_TTL
+
+
+class FakeYahoo:
+    def __init__(self):
+        self.info_calls = 0
+        self.quote_calls = 0
+        self.price = 100.0
+
+    def info(self, symbol):
+        self.info_calls += 1
+        return {"longName": f"{symbol} Inc", "sector": "Tech", "trailingPE": 25.0, "currentPrice": self.price}
+
+    def quote(self, symbol):
+        self.quote_calls += 1
+        return {"currentPrice": self.price, "previousClose": self.price - 1}
+
+
+def _cache(tmp_path, yahoo, **kwargs):
+    return FundamentalsCache(
+        path=str(tmp_path / "fundamentals.db"), info_fetcher=yahoo.info, quote_fetcher=yahoo.quote, **kwargs
+    )
+
+
+def test_hit_serves_cached_fields_with_live_quote(tmp_path):
+    yahoo = FakeYahoo()
+    cache = _cache(tmp_path, yahoo)
+
+    assert cache.get("aapl")["trailingPE"] == 25.0
+    yahoo.price = 110.0
+    info = _cache(tmp_path, yahoo).get("AAPL")
+
+    assert yahoo.info_calls == 1
+    assert yahoo.quote_calls == 1
+    assert info["sector"] == "Tech"
+    assert info["currentPrice"] == 110.0
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_ratio_and_forced_refresh_refetch(tmp_path, monkeypatch):
+    yahoo = FakeYahoo()
+    cache = _cache(tmp_path, yahoo)
+    cache.get("AAPL")
+
+    now = time.time()
+    monkeypatch.setattr(fundamentals_cache.time, "time", lambda: now + RATIO_TTL + 1)
+    cache.get("AAPL")
+    assert yahoo.info_calls == 2
+
+    cache.get("AAPL", force_refresh=True)
+    assert yahoo.info_calls == 3
+    assert cache.stats() == {"hits": 0, "misses": 2, "refreshes": 1, "quote_fallbacks": 0, "hit_rate": 0.0}
+
+
+def test_empty_or_partial_info_is_not_cached(tmp_path):
+    yahoo = FakeYahoo()
+    responses = [{}, {"currentPrice": 100.0, "sector": "Tech"}]
+    yahoo.info = lambda symbol: responses.pop(0) if responses else FakeYahoo.info(yahoo, symbol)
+    cache = _cache(tmp_path, yahoo)
+
+    assert cache.get("AAPL") == {}
+    assert cache.get("AAPL")["sector"] == "Tech"
+    assert cache.get("AAPL")["longName"] == "AAPL Inc"
+    assert cache.get("AAPL")["trailingPE"] == 25.0
+    assert cache.stats()["misses"] == 3 and cache.stats()["hits"] == 1
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data.features import calculate_features
+from ai_stock_analyst.data import indicator_state
+from ai_stock_analyst.data.indicator_state import IndicatorEngine, IndicatorState, get_indicator_engine
+from ai_stock_analyst.database import Database
+
+
+def _history(days: int = 80, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, days))
+    idx = pd.bdate_range("2024-01-02", periods=days)
+    return pd.DataFrame(
+        {
+            "Open": close * (1 + rng.normal(0, 0.005, days)),
+            "High": close * 1.02,
+            "Low": close * 0.98,
+            "Close": close,
+            "Volume": rng.integers(1e5, 1e6, days).astype(float),
+        },
+        index=idx,
+    )
+
+
+def test_incremental_updates_match_batch_features_on_every_prefix():
+    history = _history()
+    state = IndicatorState(symbol="AAPL")
+    for i in range(len(history)):
+        state.update(history.iloc[i].to_dict(), history.index[i].date().isoformat())
+        assert state.snapshot() == calculate_features(history.iloc[: i + 1])
+
+
+def test_sync_only_advances_new_bars_and_survives_db_round_trip(tmp_path):
+    history = _history()
+    db = Database(f"sqlite:///{tmp_path / 'state.db'}")
+
+    engine = IndicatorEngine()
+    engine.sync("AAPL", history.iloc[:60])
+    engine.save(db)
+
+    restored = IndicatorEngine.load(db=db)
+    assert restored.states["AAPL"].bars == 60
+    preview = restored.preview("AAPL", history.iloc[60].to_dict())
+    assert restored.states["AAPL"].bars == 60
+
+    assert restored.sync("AAPL", history) == calculate_features(history)
+    assert restored.states["AAPL"].bars == len(history)
+    assert preview == calculate_features(history.iloc[:61])
+
+
+def test_revised_bars_trigger_a_rebuild():
+    history = _history()
+    engine = IndicatorEngine()
+    engine.sync("AAPL", history.iloc[:60])
+
+    # 除权后历史收盘价整体调整，已保存的状态不能继续推进
+    adjusted = history.copy()
+    adjusted[["Open", "High", "Low", "Close"]] *= 0.98
+    assert engine.sync("AAPL", adjusted) == calculate_features(adjusted)
+    assert engine.states["AAPL"].bars == len(history)
+
+
+def test_daily_fetch_advances_persisted_state(monkeypatch):
+    from ai_stock_analyst.data import fetcher
+
+    history = _history()
+    assert fetcher._sync_indicators({"AAPL": history.iloc[:79]})["AAPL"] == calculate_features(history.iloc[:79])
+
+    # 新进程：从当前数据源缓存目录下的状态库恢复，只推进新增的一根K线
+    monkeypatch.setattr(indicator_state, "_indicator_engine", None)
+    advanced = []
+    original = IndicatorState.update
+
+    def counting(self, bar, bar_date=None):
+        advanced.append(bar_date)
+        original(self, bar, bar_date)
+
+    monkeypatch.setattr(IndicatorState, "update", counting)
+
+    assert fetcher._sync_indicators({"AAPL": history})["AAPL"] == calculate_features(history)
+    assert advanced == [history.index[-1].date().isoformat()]
+    assert get_indicator_engine().states["AAPL"].bars == len(history)
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+from ai_stock_analyst.llm import BaseLLM, LLMResponseCache, LLMRouter
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class FakeAsyncLLM(BaseLLM):
+    model = "fake"
+
+    def __init__(self, reply="ok", delay=0.02, max_concurrency=2, timeout=5.0):
+        self.reply = reply
+        self.delay = delay
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    def chat(self, messages, **kwargs):
+        raise AssertionError("sync path should not be used")
+
+    def is_available(self):
+        return True
+
+    async def _achat(self, messages, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return {"content": self.reply, "model": self.model, "usage": {"total_tokens": 10}}
+
+
+class SyncOnlyLLM(BaseLLM):
+    model = "sync"
+
+    def __init__(self, parties=1):
+        self.threads = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        # 凑齐 parties 个同时在途的调用后才返回，串行执行会超时
+        self._barrier = threading.Barrier(parties, timeout=5)
+
+    def chat(self, messages, **kwargs):
+        with self._lock:
+            self.threads.append(threading.get_ident())
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            self._barrier.wait()
+        finally:
+            with self._lock:
+                self.active -= 1
+        return {"content": "sync reply", "model": self.model, "usage": {}}
+
+    def is_available(self):
+        return True
+
+
+def _router(primary, fallback=None, cache=None):
+    router = LLMRouter(cache=cache)
+    router.providers = {"primary": primary, "fallback": fallback or FakeAsyncLLM(reply="from fallback")}
+    router.primary, router.fallback = "primary", "fallback"
+    router.cache = cache
+    return router
+
+
+def test_semaphore_caps_in_flight_requests_per_provider():
+    llm = FakeAsyncLLM(max_concurrency=3)
+    router = _router(llm)
+
+    async def run():
+        return await asyncio.gather(*[router.achat([{"role": "user", "content": str(i)}]) for i in range(12)])
+
+    results = asyncio.run(run())
+    assert [r["content"] for r in results] == ["ok"] * 12
+    assert llm.calls == 12 and llm.peak == 3
+    # 信号量按事件循环分别创建，再次 asyncio.run 仍可用
+    asyncio.run(run())
+    assert llm.calls == 24
+
+
+def test_timeout_fails_over_to_fallback():
+    slow = FakeAsyncLLM(delay=1.0, timeout=0.05)
+    router = _router(slow)
+    result = asyncio.run(router.achat(MESSAGES))
+    assert result["content"] == "from fallback"
+    assert result["provider"] == "fallback"
+
+
+def test_sync_provider_runs_in_worker_threads_concurrently():
+    llm = SyncOnlyLLM(parties=4)
+    llm.max_concurrency = 4
+
+    async def run():
+        return await asyncio.gather(*[llm.achat(MESSAGES) for _ in range(4)])
+
+    results = asyncio.run(run())
+    assert [r["content"] for r in results] == ["sync reply"] * 4
+    assert threading.get_ident() not in llm.threads
+    assert llm.peak == 4
+
+
+def test_async_calls_share_the_response_cache(tmp_path):
+    llm = FakeAsyncLLM()
+    router = _router(llm, cache=LLMResponseCache(path=str(tmp_path / "llm.db")))
+
+    first = asyncio.run(router.achat(MESSAGES))
+    second = asyncio.run(router.achat(MESSAGES))
+    sync_hit = router.chat(MESSAGES)
+
+    assert first["cached"] is False
+    assert second["cached"] is True and sync_hit["cached"] is True
+    assert llm.calls == 1
+
+
+def test_no_provider_available_raises():
+    router = LLMRouter(cache=None)
+    for llm in router.providers.values():
+        llm.available = False
+    with pytest.raises(Exception, match="No LLM provider available"):
+        asyncio.run(router.achat(MESSAGES))
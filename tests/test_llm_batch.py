@@ -0,0 +1,96 @@
+import json
+
+from ai_stock_analyst.agents.analyzer import StockAnalyzer
+from ai_stock_analyst.agents.llm_batch import build_batch_prompt, parse_batch_response
+from ai_stock_analyst.llm import StubLLMRouter, set_llm_router
+
+ROLES = ["technical", "fundamental", "news", "bull", "bear"]
+
+DATA = {
+    "symbol": "AAPL",
+    "price_data": {
+        "current_price": 100,
+        "change_percent": 2,
+        "ma5": 100,
+        "ma20": 98,
+        "trend": "BULLISH",
+        "rsi14": 60,
+        "macd": 1.2,
+        "macd_signal": 1.0,
+        "macd_hist": 0.2,
+        "atr_pct": 2.1,
+        "volatility_20d": 1.5,
+        "data_quality": 1.0,
+        "pe_ratio": 30,
+        "history": None,
+    },
+    "news": [{"title": "AAPL earnings beat estimates", "source": "Test"}],
+    "social_data": {"sentiment": {"bullish_pct": 60, "bearish_pct": 40}, "total": 10},
+}
+
+
+class Recorder:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def __call__(self, messages):
+        self.prompts.append(messages[-1]["content"])
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+
+def _sections(roles, signal="HOLD"):
+    return {role: {"signal": signal, "reasoning": f"{role} view"} for role in roles}
+
+
+def _analyze(recorder):
+    set_llm_router(StubLLMRouter(recorder))
+    analyzer = StockAnalyzer(max_workers=1, batch_llm=True)
+    return {a["agent"]: a for a in analyzer.analyze("AAPL", dict(DATA))["analyses"]}
+
+
+def test_one_request_fans_out_to_each_role():
+    sections = _sections(ROLES)
+    # 信号来自 JSON 字段，理由里出现 BUY 也不会被误判
+    sections["bear"] = {"signal": "SELL", "reasoning": "Even if dip buyers BUY, downside risk dominates"}
+    recorder = Recorder("```json\n" + json.dumps(sections) + "\n```")
+
+    analyses = _analyze(recorder)
+    assert len(recorder.prompts) == 1
+    assert analyses["BearResearcher"]["signal"] == "SELL"
+    assert analyses["TechnicalAnalyst"]["reasoning"] == "technical view"
+    assert analyses["FundamentalAnalyst"]["reasoning"].startswith("fundamental view")
+    # 共享数据只出现一次
+    assert recorder.prompts[0].count("AAPL earnings beat estimates") == 1
+
+
+def test_missing_role_is_queried_separately():
+    sections = _sections([r for r in ROLES if r != "news"], signal="BUY")
+
+    def reply(messages):
+        return json.dumps(sections) if "JSON" in messages[0]["content"] else "SELL: negative tone"
+
+    recorder = Recorder(reply)
+    analyses = _analyze(recorder)
+    assert len(recorder.prompts) == 2
+    assert analyses["NewsAnalyst"]["signal"] == "SELL"
+    assert analyses["BullResearcher"]["signal"] == "BUY"
+
+
+def test_failed_batch_falls_back_to_rules_without_more_calls():
+    recorder = Recorder(RuntimeError("provider down"))
+    analyses = _analyze(recorder)
+    assert len(recorder.prompts) == 1
+    assert analyses["TechnicalAnalyst"]["reasoning"].startswith("基于规则判断")
+    assert analyses["BullResearcher"]["reasoning"].startswith("规则判断")
+
+
+def test_parse_rejects_invalid_sections():
+    text = 'Here you go: {"technical": {"signal": "buy", "reasoning": "ok"}, "bull": {"signal": "MAYBE", "reasoning": "x"}}'
+    assert parse_batch_response(text, ["technical", "bull", "bear"]) == {
+        "technical": {"signal": "BUY", "reasoning": "ok"}
+    }
+    assert parse_batch_response("not json", ROLES) == {}
+    assert "fundamental" not in build_batch_prompt("AAPL", DATA, ["technical", "bull"])
@@ -0,0 +1,83 @@
+import time
+
+from ai_stock_analyst.llm import LLMResponseCache, LLMRouter
+
+
+class FakeLLM:
+    def __init__(self, model="fake-1", fail=False):
+        self.model = model
+        self.fail = fail
+        self.calls = 0
+
+    def is_available(self):
+        return True
+
+    def chat(self, messages, temperature=0.3, max_tokens=2000):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("down")
+        return {
+            "content": f"reply to {messages[-1]['content']} @ {temperature}",
+            "model": self.model,
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+
+def _router(tmp_path, **cache_kwargs):
+    router = LLMRouter(cache=LLMResponseCache(str(tmp_path / "llm.db"), **cache_kwargs))
+    router.providers = {"bailian": FakeLLM(), "gemini": FakeLLM("fake-2")}
+    router.primary, router.fallback = "bailian", "gemini"
+    return router
+
+
+MESSAGES = [{"role": "system", "content": "analyst"}, {"role": "user", "content": "AAPL?"}]
+
+
+def test_repeat_request_is_served_from_cache(tmp_path):
+    router = _router(tmp_path)
+    first = router.chat(MESSAGES)
+    second = router.chat(MESSAGES)
+
+    assert router.providers["bailian"].calls == 1
+    assert first["cached"] is False and second["cached"] is True
+    assert second["content"] == first["content"] and second["provider"] == "bailian"
+    stats = router.cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["saved_tokens"] == 15
+
+    # 换温度、系统提示或用户提示都是新键
+    router.chat(MESSAGES, temperature=0.7)
+    router.chat([{"role": "system", "content": "trader"}, MESSAGES[1]])
+    router.chat([MESSAGES[0], {"role": "user", "content": "MSFT?"}])
+    assert router.providers["bailian"].calls == 4
+
+    # 缓存跨实例（跨进程/工作流重跑）共享
+    again = _router(tmp_path)
+    assert again.chat(MESSAGES)["cached"] is True
+    assert again.providers["bailian"].calls == 0
+
+
+def test_fallback_responses_are_cached_per_provider(tmp_path):
+    router = _router(tmp_path)
+    router.providers["bailian"].fail = True
+    router.chat(MESSAGES)
+    assert router.chat(MESSAGES)["provider"] == "gemini"
+    assert router.providers["gemini"].calls == 1
+    assert router.providers["bailian"].calls == 2
+
+
+def test_ttl_expiry_and_lru_cap(tmp_path):
+    router = _router(tmp_path, ttl=0.05)
+    router.chat(MESSAGES)
+    time.sleep(0.1)
+    assert router.chat(MESSAGES)["cached"] is False
+
+    router = _router(tmp_path / "lru", max_entries=2)
+    for question in ("A", "B"):
+        router.chat([{"role": "user", "content": question}])
+    router.chat([{"role": "user", "content": "A"}])  # A 最近使用
+    router.chat([{"role": "user", "content": "C"}])  # 淘汰 B
+    calls = router.providers["bailian"].calls
+    assert router.chat([{"role": "user", "content": "A"}])["cached"] is True
+    assert router.chat([{"role": "user", "content": "B"}])["cached"] is False
+    assert router.providers["bailian"].calls == calls + 1
+    assert router.cache.stats()["entries"] == 2
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from ai_stock_analyst.agents.technical import TechnicalAnalyst
+from ai_stock_analyst.llm import BaseLLM, LLMBudgetExceeded, LLMRateLimiter, LLMRouter, set_llm_router
+from ai_stock_analyst.llm.limiter import ProviderLimiter
+
+MESSAGES = [{"role": "user", "content": "x" * 400}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLLM(BaseLLM):
+    model = "fake"
+
+    def __init__(self, total_tokens=150):
+        self.total_tokens = total_tokens
+        self.calls = 0
+
+    def chat(self, messages, **kwargs):
+        self.calls += 1
+        return {"content": "HOLD", "model": self.model, "usage": {"total_tokens": self.total_tokens}}
+
+    def is_available(self):
+        return True
+
+
+def _router(limiter, primary=None, fallback=None):
+    router = LLMRouter(cache=None, limiter=limiter)
+    router.providers = {"primary": primary or CountingLLM(), "fallback": fallback or CountingLLM()}
+    router.primary, router.fallback = "primary", "fallback"
+    router.cache = None
+    return router
+
+
+def test_requests_queue_in_arrival_order_once_rpm_is_spent():
+    clock = FakeClock()
+    limiter = ProviderLimiter("p", rpm=2, clock=clock)
+    waits = [limiter.reserve(1) for _ in range(4)]
+    assert waits == [0.0, 0.0, 30.0, 60.0]
+
+    clock.now = 60.0
+    assert limiter.reserve(1) == 30.0
+    assert limiter.stats()["throttled"] == 3
+
+
+def test_tpm_reservation_is_corrected_by_actual_usage():
+    clock = FakeClock()
+    limiter = ProviderLimiter("p", tpm=1000, clock=clock)
+    assert limiter.reserve(900) == 0.0
+    assert limiter.reserve(200) == pytest.approx(6.0)
+    limiter.settle(reserved=900, actual=100)
+    limiter.settle(reserved=200, actual=200)
+    assert limiter.reserve(700) == 0.0
+    assert limiter.stats()["tokens"] == 300
+
+
+def test_router_settles_budget_with_reported_usage():
+    limiter = LLMRateLimiter(rpm=0, tpm=0, token_budget=10_000)
+    router = _router(limiter)
+    router.chat(MESSAGES, max_tokens=500)
+    router.chat(MESSAGES, max_tokens=500)
+    assert limiter.budget.used == 300 and limiter.budget.pending == 0
+    assert limiter.stats()["providers"]["primary"]["requests"] == 2
+
+
+def test_budget_exhaustion_does_not_fail_over():
+    primary, fallback = CountingLLM(total_tokens=800), CountingLLM()
+    limiter = LLMRateLimiter(rpm=0, tpm=0, token_budget=1000)
+    router = _router(limiter, primary, fallback)
+
+    router.chat(MESSAGES, max_tokens=200)
+    with pytest.raises(LLMBudgetExceeded):
+        router.chat(MESSAGES, max_tokens=200)
+    with pytest.raises(LLMBudgetExceeded):
+        asyncio.run(router.achat(MESSAGES, max_tokens=200))
+
+    assert primary.calls == 1 and fallback.calls == 0
+    assert limiter.stats()["rejected"] == 2
+
+
+def test_failed_request_returns_its_budget():
+    class Broken(CountingLLM):
+        def chat(self, messages, **kwargs):
+            raise RuntimeError("boom")
+
+    limiter = LLMRateLimiter(rpm=0, tpm=0, token_budget=2000)
+    router = _router(limiter, Broken(), Broken())
+    with pytest.raises(RuntimeError):
+        router.chat(MESSAGES, max_tokens=200)
+    assert limiter.budget.used == 0 and limiter.budget.pending == 0
+
+
+def test_agent_uses_rules_when_budget_is_spent():
+    llm = CountingLLM()
+    set_llm_router(_router(LLMRateLimiter(rpm=0, tpm=0, token_budget=50), llm))
+    data = {
+        "symbol": "AAPL",
+        "price_data": {"trend": "BULLISH", "change_percent": 1.5, "rsi14": 55, "macd": 1.0, "macd_signal": 0.5},
+    }
+    result = TechnicalAnalyst().analyze(data)
+    assert llm.calls == 0
+    assert result.reasoning.startswith("基于规则判断")
+    assert result.signal in ("BUY", "SELL", "HOLD")
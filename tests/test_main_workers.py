@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from ai_stock_analyst import main
+
+
+def _result(symbol):
+    return {"symbol": symbol, "decision": {"signal": "HOLD", "confidence": 50.0}}
+
+
+def _patch_pipeline(monkeypatch, delay=0.1, fail=(), barrier=None):
+    calls = []
+
+    def fake_analyze(symbol, data):
+        calls.append(threading.current_thread().name)
+        if barrier is not None:
+            # 全部股票同时在途才能通过；串行执行时超时，analyze_symbol 捕获异常后该股票无结果
+            barrier.wait()
+        time.sleep(delay)
+        if symbol in fail:
+            raise RuntimeError("boom")
+        return _result(symbol)
+
+    monkeypatch.setattr(main, "fetch_news", lambda symbol: [])
+    monkeypatch.setattr(main, "fetch_social", lambda symbol: {})
+    monkeypatch.setattr(main, "analyze_stock", fake_analyze)
+    for name in ("get_db", "save_price_data", "save_news_items", "save_analysis_result"):
+        monkeypatch.setattr(main, name, lambda *a: None)
+    return calls
+
+
+def test_analyze_symbols_concurrently_in_input_order(monkeypatch):
+    stocks = [f"S{i}" for i in range(8)]
+    _patch_pipeline(monkeypatch, delay=0, barrier=threading.Barrier(len(stocks), timeout=5))
+    price_map = {s: {"symbol": s, "current_price": 10} for s in stocks}
+
+    results = main.analyze_symbols(stocks, price_map, workers=8)
+
+    assert [r["symbol"] for r in results] == stocks
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_failures_are_isolated_per_symbol(monkeypatch, workers):
+    calls = _patch_pipeline(monkeypatch, delay=0, fail={"B"})
+    sent = []
+
+    class Notifier:
+        def send_stock_analysis(self, result):
+            sent.append(result["symbol"])
+
+    stocks = ["A", "B", "C", "D"]
+    price_map = {s: {"symbol": s} for s in stocks if s != "D"}
+    price_map["D"] = {"symbol": "D", "error": "no data"}
+
+    results = main.analyze_symbols(stocks, price_map, Notifier(), workers=workers)
+    assert [r["symbol"] for r in results] == ["A", "C"]
+    assert sorted(sent) == ["A", "C"]
+    assert len(calls) == 3
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data import bar_store, market_context
+
+
+def _closes(start: float, end: float, days: int = 40) -> pd.DataFrame:
+    idx = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    close = np.linspace(start, end, days)
+    return pd.DataFrame(
+        {"Open": close, "High": close, "Low": close, "Close": close, "Volume": np.full(days, 1e6)}, index=idx
+    )
+
+
+def test_summarize_flags_risk_and_extra_inputs():
+    context = market_context.summarize_market_context(
+        {
+            "QQQ": _closes(500, 400)["Close"],
+            "^VIX": _closes(15, 26)["Close"],
+            "TLT": _closes(90, 95)["Close"],
+        }
+    )
+    assert context["qqq_risk"] == "HIGH"
+    assert context["vix_risk"] == "HIGH"
+    assert context["vix_level"] == 26.0
+    assert context["regime_inputs"]["TLT"]["above_ma20"] is True
+
+
+def test_regime_tickers_fetched_in_one_request_and_shared_via_disk(monkeypatch):
+    calls = []
+
+    def fake_download(symbols, start=None):
+        calls.append(list(symbols))
+        return {"QQQ": _closes(400, 420), "^VIX": _closes(18, 16), "IWM": _closes(200, 210)}
+
+    monkeypatch.setenv("MARKET_REGIME_TICKERS", "IWM")
+    monkeypatch.setattr(bar_store, "_bar_store", bar_store.BarStore(downloader=fake_download))
+
+    first = market_context.fetch_market_context()
+    # 模拟另一个进程：内存缓存为空，只能读磁盘缓存
+    monkeypatch.setattr(market_context, "_memory_cache", {"expires_at": 0.0, "tickers": (), "value": {}})
+    second = market_context.fetch_market_context()
+
+    assert calls == [["QQQ", "^VIX", "IWM"]]
+    assert first == second
+    assert first["qqq_risk"] == "LOW"
+    assert "IWM" in first["regime_inputs"]
@@ -1,4 +1,12 @@
-from ai_stock_analyst.agents.analyzer import StockAnalyzer
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_stock_analyst.agents.analyzer import StockAnalyzer, analyze_stock
+from ai_stock_analyst.agents.base import AnalysisResult, BaseAgent
+from ai_stock_analyst.agents.risk_manager import RiskManager
 
 
 def test_pipeline_contains_new_roles_and_risk():
@@ -41,3 +49,93 @@ def test_analysis_has_risk_payload_and_decision_fields():
     assert "position_size" in result["decision"]
     assert "score_100" in result["decision"]
     assert any(a["agent"] == "RiskManager" for a in result["analyses"])
+
+
+
+def test_analyze_stock_reuses_one_agent_pool(monkeypatch):
+    from ai_stock_analyst.agents import analyzer as analyzer_module
+
+    pools = []
+
+    class CountingPool(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(analyzer_module, "ThreadPoolExecutor", CountingPool)
+    data = {
+        "price_data": {"current_price": 100, "previous_close": 98, "trend": "BULLISH", "rsi14": 60},
+        "news": [{"title": "AAPL earnings beat estimates", "source": "Test"}],
+    }
+    before = threading.active_count()
+    for _ in range(20):
+        analyze_stock("AAPL", dict(data))
+
+    assert len(pools) == 1
+    assert threading.active_count() <= before + analyzer_module.get_stock_analyzer().max_workers
+
+class _SleepyAgent(BaseAgent):
+    def __init__(self, name, delay=0.2, depends_on=(), barrier=None):
+        super().__init__(name)
+        self.delay = delay
+        self.depends_on = depends_on
+        self.barrier = barrier
+        self.met_peers = False
+        self.seen_upstream = None
+
+    def analyze(self, data):
+        if self.barrier is not None:
+            # 所有独立 Agent 同时在途才能通过屏障，串行执行会超时抛 BrokenBarrierError
+            self.barrier.wait()
+            self.met_peers = True
+        time.sleep(self.delay)
+        self.seen_upstream = data.get("upstream")
+        return AnalysisResult(self.name, "HOLD", 0.5, self.name, {}, [])
+
+
+def _sleepy_analyzer(max_workers, names=("a", "b", "c", "d", "e"), barrier=None):
+    analyzer = StockAnalyzer(max_workers=max_workers)
+    analyzer.agent_pipeline = []
+    for name in names:
+        analyzer.register_agent(name, _SleepyAgent(name, barrier=barrier))
+    analyzer.register_agent("risk", RiskManager())
+    return analyzer
+
+
+def test_independent_agents_run_concurrently_in_pipeline_order():
+    analyzer = _sleepy_analyzer(max_workers=6, barrier=threading.Barrier(5, timeout=5))
+    # 最先注册的 Agent 最慢，输出顺序仍按 agent_pipeline
+    analyzer.agents["a"].delay = 0.1
+
+    result = analyzer.analyze("AAPL", {"symbol": "AAPL"})
+
+    assert all(analyzer.agents[name].met_peers for name in "abcde")
+    assert [a["agent"] for a in result["analyses"]] == ["a", "b", "c", "d", "e", "RiskManager"]
+
+
+def test_serial_mode_matches_concurrent_result():
+    data = {"symbol": "AAPL"}
+    serial = _sleepy_analyzer(max_workers=1, names=("a", "b")).analyze("AAPL", data)
+    parallel = _sleepy_analyzer(max_workers=4, names=("a", "b")).analyze("AAPL", data)
+    assert serial["decision"] == parallel["decision"]
+    assert serial["analyses"] == parallel["analyses"]
+
+
+def test_dependent_agent_waits_for_upstream_results():
+    analyzer = _sleepy_analyzer(max_workers=4, names=("a", "b"))
+    analyzer.register_agent("summary", _SleepyAgent("summary", delay=0), depends_on=("a", "missing"))
+
+    result = analyzer.analyze("AAPL", {"symbol": "AAPL"})
+    upstream = analyzer.agents["summary"].seen_upstream
+    assert list(upstream) == ["a"] and upstream["a"].agent_name == "a"
+    assert analyzer.agents["a"].seen_upstream is None
+    assert [a["agent"] for a in result["analyses"]][-2:] == ["RiskManager", "summary"]
+
+
+def test_dependency_cycle_is_rejected():
+    for workers in (1, 4):
+        analyzer = _sleepy_analyzer(max_workers=workers, names=())
+        analyzer.register_agent("x", _SleepyAgent("x", delay=0), depends_on=("y",))
+        analyzer.register_agent("y", _SleepyAgent("y", delay=0), depends_on=("x",))
+        with pytest.raises(ValueError):
+            analyzer.analyze("AAPL", {"symbol": "AAPL"})
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_stock_analyst.data.features import (
+    calculate_features,
+    calculate_features_batch,
+    calculate_panel_features,
+    stack_histories,
+)
+
+
+def _histories():
+    rng = np.random.default_rng(7)
+    out = {}
+    for k, n in enumerate([4, 18, 40, 90]):
+        idx = pd.bdate_range(end="2025-06-30", periods=n)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        out[f"S{k}"] = pd.DataFrame(
+            {
+                "Open": close * (1 + rng.normal(0, 0.004, n)),
+                "High": close * 1.012,
+                "Low": close * 0.988,
+                "Close": close,
+                "Volume": rng.integers(100_000, 1_000_000, n).astype(float),
+            },
+            index=idx,
+        )
+    return out
+
+
+def _assert_same(expected, actual):
+    assert expected.keys() == actual.keys()
+    for key, value in expected.items():
+        if isinstance(value, str):
+            assert actual[key] == value
+        else:
+            assert actual[key] == pytest.approx(value, abs=1e-9)
+
+
+def test_batch_latest_matches_single_symbol_features():
+    histories = _histories()
+    batch = calculate_features_batch({**histories, "EMPTY": pd.DataFrame()})
+    for symbol, hist in histories.items():
+        _assert_same(calculate_features(hist), batch[symbol])
+    assert batch["EMPTY"]["trend"] == "NEUTRAL"
+
+
+def test_panel_rows_match_prefix_features():
+    histories = _histories()
+    symbols, panel = stack_histories(histories)
+    features = calculate_panel_features(
+        panel["Close"], panel["High"], panel["Low"], panel["Volume"], panel["Open"], symbols=symbols
+    )
+    hist = histories["S3"]
+    offset = features.close.shape[0] - len(hist)
+    for t in range(len(hist)):
+        _assert_same(calculate_features(hist.iloc[: t + 1]), features.snapshot(offset + t)["S3"])
@@ -0,0 +1,132 @@
+import calendar
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from ai_stock_analyst.agents.analyzer import StockAnalyzer
+from ai_stock_analyst.backtest import load_news_history, replay_pipeline
+from ai_stock_analyst.backtest.pipeline_replay import HISTORY_WINDOW
+from ai_stock_analyst.data.features import calculate_features
+from ai_stock_analyst.data.fetcher import _build_price_payload
+from ai_stock_analyst.database import Database
+from ai_stock_analyst.llm import StubLLMRouter, get_llm_router, set_llm_router
+from tests.test_backtest_engine import _ohlcv
+
+
+def test_replay_matches_direct_analyzer_calls():
+    frame = _ohlcv(260, seed=8)
+    replays = replay_pipeline({"AAA": frame}, start=str(frame.index[200].date()), workers=1)
+    replay = replays[0]
+
+    assert len(replay.decisions) == 259 - 200
+    assert set(replay.decisions["signal"]) <= {"BUY", "SELL", "HOLD"}
+
+    # 任取一天，用同样的时点数据直接调用 StockAnalyzer，决策一致
+    date = frame.index[230]
+    hist = frame.loc[date - HISTORY_WINDOW : date]
+    info = {
+        "currentPrice": float(frame["Close"].iloc[230]),
+        "previousClose": float(frame["Close"].iloc[229]),
+        "volume": float(frame["Volume"].iloc[230]),
+    }
+    previous = set_llm_router(StubLLMRouter())
+    try:
+        price_data = _build_price_payload("AAA", info, hist, calculate_features(hist), {})
+        expected = StockAnalyzer().analyze("AAA", {"symbol": "AAA", "price_data": price_data})["decision"]
+    finally:
+        set_llm_router(previous)
+    assert replay.decisions.loc[date, "signal"] == expected["signal"]
+    assert replay.decisions.loc[date, "score_100"] == expected["score_100"]
+
+
+def test_parallel_replay_with_step_and_news_is_point_in_time():
+    histories = {"AAA": _ohlcv(220, seed=1), "BBB": _ohlcv(220, seed=2)}
+    dates = histories["AAA"].index
+    news = {
+        "AAA": [
+            {"title": "AAA beats earnings", "source": "t", "summary": "", "link": "u1", "published_at": dates[150]},
+            {"title": "AAA future story", "source": "t", "summary": "", "link": "u2", "published_at": dates[210]},
+        ]
+    }
+    kwargs = dict(start=str(dates[100].date()), step=5, news=news)
+    parallel = replay_pipeline(histories, workers=2, **kwargs)
+    serial = replay_pipeline(histories, workers=1, **kwargs)
+
+    for p, s in zip(parallel, serial):
+        pd.testing.assert_frame_equal(p.decisions, s.decisions)
+        assert len(p.decisions) == len(range(100, 219, 5))
+        # 决策之间按上一次信号持有，逐日收益覆盖完整区间
+        assert len(p.result.strategy_returns) == 215 - 100 + 1
+    # 全局路由器已恢复
+    assert not isinstance(get_llm_router(), StubLLMRouter)
+
+
+def test_load_news_history_orders_and_skips_undated(tmp_path):
+    db = Database(f"sqlite:///{tmp_path / 'news.db'}")
+    rows = [
+        ("AAA", "second", "u2", "2024-03-02T10:00:00+00:00"),
+        ("AAA", "first", "u1", "2024-03-01T10:00:00+00:00"),
+        ("AAA", "undated", "u3", None),
+        ("BBB", "other", "u4", "2024-03-01T10:00:00"),
+    ]
+    for symbol, title, url, published in rows:
+        db.execute(
+            "INSERT INTO news_articles (symbol, title, url, published_at) VALUES (?, ?, ?, ?)",
+            (symbol, title, url, published),
+        )
+
+    news = load_news_history(["AAA", "BBB"], db=db)
+    assert [n["title"] for n in news["AAA"]] == ["first", "second"]
+    assert news["BBB"][0]["published_at"] == pd.Timestamp("2024-03-01 10:00:00")
+
+
+def test_after_close_news_only_affects_the_next_session():
+    frame = _ohlcv(220, seed=1)
+    day, next_day = frame.index[210], frame.index[211]
+    window = dict(start=str(day.date()), end=str(next_day.date()), workers=1)
+
+    def _decisions(published_at):
+        news = None
+        if published_at is not None:
+            headline = {"title": "AAA plunge lawsuit investigation downgrade miss loss", "source": "t",
+                        "summary": "", "link": "u", "published_at": published_at}
+            news = {"AAA": [headline]}
+        return replay_pipeline({"AAA": frame}, news=news, **window)[0].decisions["score_100"]
+
+    baseline = _decisions(None)
+    # 10 月为夏令时，收盘 16:00 ET = 20:00 UTC
+    before_close = _decisions(day + pd.Timedelta(hours=15))
+    after_close = _decisions(day + pd.Timedelta(hours=21))
+
+    assert before_close[day] != baseline[day]
+    assert after_close[day] == baseline[day]
+    assert after_close[next_day] == before_close[next_day] != baseline[next_day]
+
+
+@pytest.mark.parametrize("tz", ["Asia/Shanghai", "America/Los_Angeles"])
+def test_saved_news_times_are_utc_on_any_host_timezone(tmp_path, monkeypatch, tz):
+    from ai_stock_analyst import main
+    from ai_stock_analyst.rss.feed import RSSFetcher
+    from ai_stock_analyst.rss.models import NewsItem
+    from ai_stock_analyst.rss.social import SocialMediaFetcher
+
+    db = Database(f"sqlite:///{tmp_path / 'news.db'}")
+    monkeypatch.setattr(main, "get_db", lambda: db)
+    # feedparser 的 published_parsed 是 UTC 的 struct_time
+    entry = SimpleNamespace(published_parsed=time.gmtime(calendar.timegm((2024, 3, 1, 14, 30, 0, 0, 0, 0))))
+
+    monkeypatch.setenv("TZ", tz)
+    time.tzset()
+    try:
+        published = RSSFetcher()._parse_date(entry)
+        assert SocialMediaFetcher()._parse_date(entry) == published
+        main.save_news_items("AAA", [NewsItem(title="t", link="u", published=published, summary="", source="s")])
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+
+    stored = db.fetch_all("SELECT published_at FROM news_articles")[0]["published_at"]
+    assert stored == "2024-03-01T14:30:00+00:00"
+    assert load_news_history(["AAA"], db=db)["AAA"][0]["published_at"] == pd.Timestamp("2024-03-01 14:30")
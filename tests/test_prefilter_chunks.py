@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ai_stock_analyst.data import bar_store, universe
+
+
+def _history(days: int = 60, start: float = 50.0) -> pd.DataFrame:
+    idx = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    close = np.linspace(start, start * 1.2, days)
+    return pd.DataFrame(
+        {"Open": close, "High": close, "Low": close, "Close": close, "Volume": np.full(days, 1e6)},
+        index=idx,
+    )
+
+
+def test_failed_chunks_are_bisected_and_retried(monkeypatch):
+    symbols = [f"S{i:03d}" for i in range(40)]
+    lock = threading.Lock()
+    batches = []
+
+    def flaky_download(batch, start=None):
+        with lock:
+            batches.append(list(batch))
+        # 大块请求被限流，小块可以成功
+        if len(batch) > 10:
+            raise RuntimeError("rate limited")
+        return {s: _history(start=20 + int(s[1:])) for s in batch}
+
+    monkeypatch.setattr(bar_store, "_bar_store", bar_store.BarStore(downloader=flaky_download))
+
+    out, stats = universe.prefilter_universe_with_stats(symbols, top_k=100, chunk_size=40, max_workers=3)
+
+    assert sorted(r["symbol"] for r in out) == symbols
+    assert stats["failed_symbols"] == []
+    assert any(not c["ok"] for c in stats["chunks"])
+    assert sum(c["size"] for c in stats["chunks"] if c["ok"]) == len(symbols)
+    assert stats["final_chunk_size"] < 40
+    assert universe.prefilter_universe(symbols, top_k=5) == out[:5]
+
+
+def test_panel_scoring_filters_and_ranks_top_k():
+    histories = {
+        "LOW": _history(start=1.0),
+        "THIN": _history(start=50.0).assign(Volume=1e3),
+        "SHORT": _history(days=20, start=80.0),
+        "A": _history(start=40.0),
+        "B": _history(start=60.0),
+        "C": _history(start=100.0),
+    }
+    part = universe._score_prefilter_panel(histories, min_price=3.0, min_dollar_volume=20_000_000)
+    out = universe._select_top_prefiltered([part], top_k=2)
+
+    assert [r["symbol"] for r in out] == ["C", "B"]
+    close = histories["C"]["Close"]
+    assert out[0]["ret20_pct"] == round((close.iloc[-1] / close.iloc[-21] - 1) * 100, 2)
+    assert out[0]["avg_dollar_volume_20"] == round(float((close.tail(20) * 1e6).mean()), 2)
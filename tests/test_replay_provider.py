@@ -0,0 +1,62 @@
+from datetime import date
+
+import pytest
+
+from ai_stock_analyst.data import fetcher, providers, universe
+from ai_stock_analyst.data.providers import ProviderError, ReplayProvider
+
+
+def test_replay_provider_runs_pipeline_offline(monkeypatch):
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "replay")
+    monkeypatch.setenv("REPLAY_SYNTHETIC_SYMBOLS", "40")
+    monkeypatch.setenv("REPLAY_END_DATE", date.today().isoformat())
+
+    symbols, stats = universe.load_us_equity_universe_with_stats(max_symbols=0)
+    assert len(symbols) == 40
+    assert stats["source"] == "network"
+
+    out = fetcher.fetch_stock_prices(symbols[:3])
+    assert isinstance(providers.get_market_data_provider(), ReplayProvider)
+    for symbol in symbols[:3]:
+        assert "error" not in out[symbol]
+        assert out[symbol]["current_price"] > 0
+        assert out[symbol]["sector"]
+    # 合成数据按代码确定
+    again = ReplayProvider(end_date=date.today()).history([symbols[0]])[symbols[0]]
+    assert float(again["Close"].iloc[-1]) == pytest.approx(out[symbols[0]]["history"]["Close"].iloc[-1])
+
+
+def test_replay_provider_injects_errors_and_records(tmp_path):
+    failing = ReplayProvider(error_rate=1.0)
+    with pytest.raises(ProviderError):
+        failing.history(["AAPL"])
+    assert failing.calls["errors"] == 1
+
+    recorder = ReplayProvider(root=str(tmp_path), end_date=date(2024, 6, 28))
+    recorder.record_history(recorder.history(["AAPL"]))
+    replay = ReplayProvider(root=str(tmp_path), synthetic=False)
+    assert len(replay.history(["AAPL"], start=date(2024, 6, 1))["AAPL"]) == 20
+    assert replay.history(["MSFT"]) == {}
+
+
+def test_replay_caches_do_not_leak_into_live_caches(monkeypatch):
+    from ai_stock_analyst.data import bar_store, fundamentals_cache, market_context
+
+    def _paths():
+        return {
+            "bars": bar_store.BarStore().root,
+            "fundamentals": fundamentals_cache.FundamentalsCache().path,
+            "universe": universe._snapshot_paths()[0],
+            "market": market_context._cache_path(),
+        }
+
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "replay")
+    replay_paths = _paths()
+    monkeypatch.setattr(providers, "_provider", None)
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "yfinance")
+    live_paths = _paths()
+
+    for name, path in replay_paths.items():
+        assert "replay" in path.parts, name
+        assert "yfinance" in live_paths[name].parts, name
+        assert path != live_paths[name]
@@ -0,0 +1,50 @@
+from datetime import date
+
+from ai_stock_analyst.data import universe
+from ai_stock_analyst.data.providers import yfinance_provider
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+NASDAQ_TEXT = "Symbol|Security Name|Test Issue|ETF\nAAPL|Apple|N|N\nQQQ|Invesco|N|Y\nFile Creation Time: x||\n"
+OTHER_TEXT = "ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Test Issue|NASDAQ Symbol\nJPM|JPMorgan|N|JPM|N|N|JPM\n"
+
+
+def test_snapshot_reused_within_session_and_revalidated_next_day(monkeypatch):
+    calls = []
+    texts = {universe.NASDAQ_LISTED_URL: NASDAQ_TEXT, universe.OTHER_LISTED_URL: OTHER_TEXT}
+
+    def fake_get(url, timeout=15, headers=None):
+        calls.append((url, dict(headers or {})))
+        if headers and headers.get("If-None-Match") == f"v-{url}" and url == universe.NASDAQ_LISTED_URL:
+            return FakeResponse(304)
+        return FakeResponse(200, texts[url], {"ETag": f"v-{url}"})
+
+    monkeypatch.setattr(yfinance_provider.requests, "get", fake_get)
+    monkeypatch.setattr(universe, "session_date", lambda: date(2025, 3, 3))
+
+    symbols, stats = universe.load_us_equity_universe_with_stats(max_symbols=0)
+    assert symbols == ["AAPL", "JPM"]
+    assert stats["source"] == "network"
+    assert stats["raw_rows"] == 3
+
+    universe.load_us_equity_universe_with_stats(max_symbols=0)
+    assert len(calls) == 2
+
+    texts[universe.OTHER_LISTED_URL] = OTHER_TEXT + "F|Ford|A|F|N|N|F\n"
+    monkeypatch.setattr(universe, "session_date", lambda: date(2025, 3, 4))
+    symbols, stats = universe.load_us_equity_universe_with_stats(max_symbols=0, include_etf=True)
+
+    assert calls[2][1] == {"If-None-Match": f"v-{universe.NASDAQ_LISTED_URL}"}
+    assert symbols == ["AAPL", "F", "JPM", "QQQ"]
+    assert stats["listing_changes"] == {"added": ["F"], "removed": []}
+    assert stats["raw_rows"] == 4